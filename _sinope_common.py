@@ -0,0 +1,2659 @@
+"""Helpers shared by the Sinopé Technologies quirks.
+
+The quirks import it as zhaquirks.sinope._sinope_common. When used as ZHA custom
+quirks this file must be copied along with light.py, switch.py, thermostat.py and
+sensor.py. Custom quirk modules are loaded in alphabetical order as top level
+modules, so this one is always imported first and registers itself under its
+package name.
+"""
+
+import abc
+import asyncio
+import csv
+import functools
+import heapq
+import itertools
+import json
+import logging
+import math
+import os
+import random
+import sys
+import time
+import weakref
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import deque
+from datetime import datetime, timezone
+from enum import StrEnum
+from typing import Any, Iterable
+
+import zigpy.profiles.zha as zha_p
+from homeassistant.util import dt as dt_util
+from zhaquirks.const import ZHA_SEND_EVENT
+from zigpy.config import CONF_DATABASE
+from zigpy.zcl import ClusterType, foundation
+from zigpy.zcl.clusters.general import Basic, OnOff, Ota
+from zigpy.zcl.foundation import ZCLAttributeDef
+
+sys.modules.setdefault("zhaquirks.sinope._sinope_common", sys.modules[__name__])
+
+# Maximum number of reporting configuration requests in flight at the same time
+# for a single device and for the whole Zigbee network.
+REPORTING_DEVICE_CONCURRENCY = 2
+REPORTING_NETWORK_CONCURRENCY = 8
+
+# Maximum number of devices configuring their reporting at the same time on a
+# network, and upper bound of the random delay before a mains powered device starts
+# while others are already being configured.
+REPORTING_JOB_CONCURRENCY = 4
+REPORTING_JOB_JITTER = 2.0
+
+# Number of times records not accepted by a device are sent again, and delay before
+# the first retry. The delay doubles at each retry and a random jitter is applied.
+REPORTING_RETRIES = 3
+REPORTING_RETRY_DELAY = 1.0
+
+# Budget for the attribute records of a single Configure Reporting frame, keeps the
+# request under the unfragmented APS payload size with NWK security and source
+# routing overhead.
+REPORTING_FRAME_BYTES = 50
+
+# Budget for the records of a single Read Attributes response, under the same
+# limit. Values of variable size are counted as READ_VARIABLE_BYTES.
+READ_FRAME_BYTES = 50
+READ_VARIABLE_BYTES = 16
+
+# Attribute discovery: records asked per Discover Attributes Extended request, 4
+# bytes each, reporting configured on the reportable attributes while values are
+# sampled, and number of distinct values kept per attribute.
+DISCOVERY_PAGE_SIZE = READ_FRAME_BYTES // 4
+DISCOVERY_REPORTING = (10, 300, 1)
+DISCOVERY_MAX_VALUES = 10
+
+# Opt-in window in seconds during which a report repeating the last value of one of
+# the DEDUP_ATTRIBUTES of a cluster is dropped, 0 disables it. Repeated values are
+# still forwarded once per DEDUP_HEARTBEAT of the attribute max reporting interval
+# so that the heartbeat of the device is seen.
+DEDUP_WINDOW = 0.0
+DEDUP_HEARTBEAT = 0.9
+
+# Seconds before the device side timeout of a pushed display value at which it is
+# written again, and timeout assumed while the device value is not known.
+KEEPALIVE_MARGIN = 300
+KEEPALIVE_DEFAULT_TIMEOUT = 3600
+
+# Drift in seconds above which the secs_since_2k clock of a device is set, window
+# over which the clock syncs of all the devices are spread and interval between two
+# syncs of a device.
+CLOCK_DRIFT_THRESHOLD = 30
+CLOCK_SYNC_WINDOW = 600
+CLOCK_SYNC_INTERVAL = 86400
+
+# Age in seconds after which a configuration attribute served from the snapshot is
+# read again from the device. Static attributes are only read again after a
+# firmware update and telemetry is never kept in the snapshot.
+SNAPSHOT_TTL_CONFIG = 86400
+
+# Energy counters are uint32 values wrapping at ENERGY_COUNTER_MODULUS, a decrease
+# larger than half of it is a rollover and any other decrease a reset of the device
+# counter. The energy used is sent as an energy_delta event every
+# ENERGY_DELTA_INTERVAL seconds, and the counter state is saved at most every
+# ENERGY_SAVE_INTERVAL seconds unless its offset changed.
+ENERGY_COUNTER_MODULUS = 2**32
+ENERGY_DELTA_INTERVAL = 900
+ENERGY_SAVE_INTERVAL = 300
+
+# Maximum number of energy samples kept by the fleet ring buffer, about 3 days of 50
+# meters reporting every minute, and length in seconds of the windows over which the
+# peak demand is measured. The buffer grows with the samples up to that size.
+FLEET_CAPACITY = 2**18
+FLEET_DEMAND_INTERVAL = 900
+
+# Demand response events are applied DR_LEAD_TIME seconds before the peak window.
+# Devices are written in priority order DR_STAGGER seconds apart, and the values a
+# device does not confirm when read back are written again up to DR_RETRIES times.
+DR_LEAD_TIME = 300
+DR_STAGGER = 0.1
+DR_RETRIES = 2
+
+# The site load is checked every LOAD_TICK seconds. Shed devices are turned back on
+# after LOAD_ROTATION seconds so shedding rotates between them, or earlier once
+# their load fits LOAD_MARGIN below the ceiling. The last LOAD_HISTORY decisions
+# are kept.
+LOAD_TICK = 30
+LOAD_ROTATION = 900
+LOAD_MARGIN = 0.05
+LOAD_HISTORY = 1000
+
+# After an outage the loads reporting cold load pickup are held off, then turned
+# back on in waves of RESTORE_WAVE_SIZE devices every RESTORE_WAVE_INTERVAL seconds,
+# each device at a random time within its wave.
+RESTORE_WAVE_SIZE = 5
+RESTORE_WAVE_INTERVAL = 30
+
+# Maximum number of rendered unknown values kept by each attribute converter.
+CONVERTER_CACHE_SIZE = 64
+
+_LOGGER = logging.getLogger(__name__)
+
+_Y2K = datetime(2000, 1, 1)
+
+_DEVICE_LIMITS: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+_NETWORK_LIMITS: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+_SCHEDULERS: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+
+def _limit(limits: weakref.WeakKeyDictionary, key, size: int) -> asyncio.Semaphore:
+    """Return the semaphore shared by every cluster of a device or network."""
+
+    try:
+        return limits[key]
+    except KeyError:
+        limits[key] = semaphore = asyncio.Semaphore(size)
+        return semaphore
+
+
+class ReportingScheduler:
+    """Queue the reporting configuration jobs of all the devices of a network.
+
+    At most REPORTING_JOB_CONCURRENCY jobs run at the same time, waiting jobs are
+    started by priority then in arrival order. Battery powered devices have the
+    highest priority to be configured while they are awake, mains powered devices
+    are paced with a random delay when the network is busy.
+    """
+
+    BATTERY = 0
+    MAINS = 1
+
+    def __init__(self, concurrency: int) -> None:
+        """Initialize the scheduler."""
+        self.concurrency = concurrency
+        self.running = 0
+        self._waiting: list[tuple[int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+
+    @property
+    def waiting(self) -> int:
+        """Return the number of jobs waiting for a slot."""
+        return sum(not future.done() for _, _, future in self._waiting)
+
+    async def run(self, priority: int, job):
+        """Run the job coroutine function once a slot is available."""
+        if priority != self.BATTERY and (self.running or self._waiting):
+            await asyncio.sleep(random.uniform(0, REPORTING_JOB_JITTER))
+
+        if self.running >= self.concurrency or self.waiting:
+            future = asyncio.get_running_loop().create_future()
+            heapq.heappush(self._waiting, (priority, next(self._sequence), future))
+            try:
+                await future
+            except asyncio.CancelledError:
+                if future.done() and not future.cancelled():
+                    # The slot was handed over, give it to the next job
+                    self._release()
+                raise
+        else:
+            self.running += 1
+
+        try:
+            return await job()
+        finally:
+            self._release()
+
+    def _release(self) -> None:
+        """Hand the slot of a finished job over to the next waiting job."""
+        while self._waiting:
+            _, _, future = heapq.heappop(self._waiting)
+            if not future.done():
+                future.set_result(None)
+                return
+        self.running -= 1
+
+
+def _scheduler(application) -> ReportingScheduler:
+    """Return the reporting scheduler of a network."""
+    try:
+        return _SCHEDULERS[application]
+    except KeyError:
+        _SCHEDULERS[application] = scheduler = ReportingScheduler(
+            REPORTING_JOB_CONCURRENCY
+        )
+        return scheduler
+
+
+class _GroupWrite:
+    """Last value sent to a group, the latest value received and the tasks."""
+
+    def __init__(self) -> None:
+        """Initialize an empty state."""
+        self.value = None
+        self.sent = 0.0
+        self.latest = None
+        self.manufacturer: int | None = None
+        self.pending = None
+        self.task: asyncio.Task | None = None
+        self.refresh: asyncio.Task | None = None
+
+
+class GroupWriteResult(StrEnum):
+    """What became of a value written to a group."""
+
+    SENT = "sent"
+    QUEUED = "queued"
+    DROPPED = "dropped"
+
+
+class GroupAttributeWriter:
+    """Write an attribute to every member of a Zigbee group in a single multicast.
+
+    Changes smaller than threshold are dropped. Writes are at least min_interval
+    seconds apart, values received in between are coalesced and only the latest one
+    is sent. The latest value is sent again when nothing was sent for refresh
+    seconds, until the group is removed. The attribute cache of the group members is
+    updated with the value sent.
+    """
+
+    def __init__(
+        self,
+        cluster_class: type,
+        attribute,
+        *,
+        threshold: float,
+        min_interval: float,
+        refresh: float,
+    ) -> None:
+        """Initialize the writer."""
+        self.cluster_class = cluster_class
+        self.attribute = attribute
+        self.threshold = threshold
+        self.min_interval = min_interval
+        self.refresh = refresh
+        self._states: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+    async def write(
+        self, application, group_id: int, value, manufacturer
+    ) -> GroupWriteResult:
+        """Send the value to the group, subject to threshold and rate limit."""
+        state = self._states.setdefault(application, {}).setdefault(
+            group_id, _GroupWrite()
+        )
+        state.latest, state.manufacturer = value, manufacturer
+        if state.task is not None:
+            state.pending = value
+            return GroupWriteResult.QUEUED
+        if state.value is not None and abs(value - state.value) < self.threshold:
+            return GroupWriteResult.DROPPED
+
+        delay = state.sent + self.min_interval - time.monotonic()
+        if state.value is not None and delay > 0:
+            state.pending = value
+            state.task = asyncio.create_task(
+                self._write_later(application, group_id, delay)
+            )
+            return GroupWriteResult.QUEUED
+
+        if not await self._send(application, group_id, value, state):
+            return GroupWriteResult.DROPPED
+        return GroupWriteResult.SENT
+
+    async def _write_later(self, application, group_id: int, delay: float) -> None:
+        state = self._states[application][group_id]
+        try:
+            await asyncio.sleep(delay)
+            value, state.pending = state.pending, None
+            await self._send(application, group_id, value, state)
+        except Exception as e:
+            _LOGGER.warning("Write to Zigbee group 0x%04x failed: %s", group_id, e)
+        finally:
+            state.task = None
+
+    async def _refresh(self, application, group_id: int) -> None:
+        """Send the latest value again before the group members time out."""
+        state = self._states[application][group_id]
+        try:
+            while True:
+                delay = state.sent + self.refresh - time.monotonic()
+                await asyncio.sleep(max(delay, 0))
+                if group_id not in application.groups:
+                    return
+                if time.monotonic() - state.sent < self.refresh:
+                    continue
+                try:
+                    await self._send(application, group_id, state.latest, state)
+                except Exception as e:
+                    _LOGGER.warning(
+                        "Refresh of Zigbee group 0x%04x failed: %s", group_id, e
+                    )
+                    await asyncio.sleep(self.min_interval)
+        finally:
+            state.refresh = None
+
+    async def _send(
+        self, application, group_id: int, value, state: _GroupWrite
+    ) -> bool:
+        group = application.groups.get(group_id)
+        if group is None:
+            _LOGGER.warning("Zigbee group 0x%04x not found", group_id)
+            return False
+
+        attribute = self.attribute
+        command = foundation.GeneralCommand.Write_Attributes_No_Response
+        hdr = foundation.ZCLHeader.general(
+            group.get_sequence(), command, state.manufacturer
+        )
+        records = [
+            foundation.Attribute(
+                attribute.id,
+                foundation.TypeValue(attribute.zcl_type, attribute.type(value)),
+            )
+        ]
+        await group.request(
+            zha_p.PROFILE_ID,
+            self.cluster_class.cluster_id,
+            hdr.tsn,
+            hdr.serialize()
+            + foundation.GENERAL_COMMANDS[command].schema(records).serialize(),
+        )
+        state.value, state.sent = value, time.monotonic()
+        if state.refresh is None:
+            state.refresh = asyncio.create_task(self._refresh(application, group_id))
+
+        for endpoint in group.members.values():
+            member = endpoint.in_clusters.get(self.cluster_class.cluster_id)
+            if isinstance(member, self.cluster_class):
+                member._update_attribute(attribute.id, value)
+        return True
+
+
+class DisplayPusher:
+    """Push values shown on the display of a device, which it hides after a timeout.
+
+    attributes maps the id of each pushed attribute to the id of the attribute
+    holding its timeout and to the resolution used to detect changes. A value is
+    only written when it differs from the last one written once both are rounded to
+    that resolution, and the latest value is written again KEEPALIVE_MARGIN seconds
+    before the timeout runs out. The value itself is written unrounded. The keep-alive tasks
+    run on the device, so they stop when it is removed or the network shuts down.
+    """
+
+    def __init__(self, cluster, attributes: dict[int, tuple[int, int]]) -> None:
+        """Initialize the pusher of a cluster."""
+        self.cluster = cluster
+        self.attributes = attributes
+        self._values: dict[int, object] = {}
+        self._rounded: dict[int, object] = {}
+        self._manufacturer: dict[int, int | None] = {}
+        self._tasks: dict[int, asyncio.Task] = {}
+
+    def _round(self, attrid: int, value):
+        resolution = self.attributes[attrid][1]
+        if resolution > 1:
+            return round(value / resolution) * resolution
+        return value
+
+    def _timeout(self, attrid: int) -> float:
+        timeout = self.cluster.get(self.attributes[attrid][0])
+        return timeout if timeout else KEEPALIVE_DEFAULT_TIMEOUT
+
+    async def push(self, attrid: int, value, manufacturer=None) -> list:
+        """Write the value if it changed and keep it alive on the display."""
+        rounded = self._round(attrid, value)
+        if attrid in self._tasks and self._rounded.get(attrid) == rounded:
+            self.cluster.debug("Skipping unchanged display attr 0x%04x", attrid)
+            # shown the same, the keep-alive writes it and the cache follows
+            self._values[attrid] = value
+            self.cluster._update_attribute(attrid, value)
+            return [[foundation.WriteAttributesStatusRecord(foundation.Status.SUCCESS)]]
+
+        result = await self._write(attrid, value, manufacturer)
+        if isinstance(result[0], list) and all(
+            record.status == foundation.Status.SUCCESS for record in result[0]
+        ):
+            self._values[attrid] = value
+            self._rounded[attrid] = rounded
+            self._manufacturer[attrid] = manufacturer
+            task = self._tasks.pop(attrid, None)
+            if task is not None:
+                task.cancel()
+            self._tasks[attrid] = self.cluster.endpoint.device.create_task(
+                self._keep_alive(attrid), name=f"display_keep_alive_0x{attrid:04x}"
+            )
+            self._tasks[attrid].add_done_callback(
+                functools.partial(self._task_done, attrid)
+            )
+        return result
+
+    def _task_done(self, attrid: int, task: asyncio.Task) -> None:
+        if self._tasks.get(attrid) is task:
+            del self._tasks[attrid]
+
+    def _removed(self) -> bool:
+        device = self.cluster.endpoint.device
+        return device.application.devices.get(device.ieee) is not device
+
+    async def _write(self, attrid: int, value, manufacturer) -> list:
+        attribute = self.cluster.attributes[attrid]
+        return await self.cluster.write_attributes_raw(
+            [
+                foundation.Attribute(
+                    attrid,
+                    foundation.TypeValue(attribute.zcl_type, attribute.type(value)),
+                )
+            ],
+            manufacturer,
+        )
+
+    async def _keep_alive(self, attrid: int) -> None:
+        delay = max(self._timeout(attrid) - KEEPALIVE_MARGIN, KEEPALIVE_MARGIN)
+        while True:
+            await asyncio.sleep(delay)
+            if self._removed():
+                return
+            try:
+                await self._write(
+                    attrid, self._values[attrid], self._manufacturer[attrid]
+                )
+            except Exception as e:
+                # retry well before the value is hidden
+                self.cluster.warning(
+                    "Keep-alive of display attr 0x%04x failed: %s", attrid, e
+                )
+                delay = KEEPALIVE_MARGIN / 4
+            else:
+                delay = max(self._timeout(attrid) - KEEPALIVE_MARGIN, KEEPALIVE_MARGIN)
+
+
+# File name of the store, kept in the directory of the zigpy database, and number
+# of seconds changes are batched before the store is written.
+STORE_FILE = "sinope_store.json"
+STORE_SAVE_DELAY = 10.0
+
+
+class SinopeStore:
+    """JSON document persisted next to the zigpy database, keyed by device IEEE."""
+
+    def __init__(self, path: str | None = None) -> None:
+        """Initialize the store, the file is only read on first use.
+
+        Without a path, the store is kept in the directory of the zigpy database of
+        the first device loaded, the Home Assistant configuration directory.
+        """
+        self.path = path
+        self._data: dict | None = None
+        self._dirty = False
+        self._lock = asyncio.Lock()
+        self._save_task: asyncio.Task | None = None
+
+    def _locate(self, device) -> None:
+        if self.path is not None:
+            return
+        database = device.application.config.get(CONF_DATABASE)
+        if isinstance(database, str):
+            self.path = os.path.join(os.path.dirname(database), STORE_FILE)
+
+    def _read(self) -> dict:
+        if self.path is None:
+            return {}
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            _LOGGER.warning("Discarding unreadable Sinope store %s: %s", self.path, e)
+            return {}
+
+    def _write(self, path: str, data: str) -> None:
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    async def async_device(self, device) -> dict:
+        """Return the mutable document of a device, loading the file if needed."""
+        async with self._lock:
+            if self._data is None:
+                self._locate(device)
+                loop = asyncio.get_running_loop()
+                self._data = await loop.run_in_executor(None, self._read)
+        return self._data.setdefault(str(device.ieee), {})
+
+    def device(self, device) -> dict | None:
+        """Return the mutable document of a device, None until the file is loaded."""
+        if self._data is None:
+            return None
+        return self._data.setdefault(str(device.ieee), {})
+
+    async def async_save(self) -> None:
+        """Write the store to disk once the changes of STORE_SAVE_DELAY are batched."""
+        self._dirty = True
+        if self._save_task is None:
+            self._save_task = asyncio.create_task(self._delayed_save())
+
+    async def _delayed_save(self) -> None:
+        try:
+            await asyncio.sleep(STORE_SAVE_DELAY)
+        finally:
+            self._save_task = None
+        await self.async_flush()
+
+    async def async_flush(self) -> None:
+        """Write the pending changes to disk now."""
+        async with self._lock:
+            if self._data is None or not self._dirty:
+                return
+            self._dirty = False
+            if self.path is None:
+                return  # no zigpy database, the store is only kept in memory
+            path, data = self.path, json.dumps(self._data, indent=1, sort_keys=True)
+            loop = asyncio.get_running_loop()
+            try:
+                await loop.run_in_executor(None, self._write, path, data)
+            except OSError as e:
+                _LOGGER.warning("Unable to save Sinope store %s: %s", path, e)
+
+
+STORE = SinopeStore()
+
+
+class ReportingState(StrEnum):
+    """Outcome of the reporting configuration of an attribute."""
+
+    CONFIGURED = "configured"
+    FAILED = "failed"
+    UNSUPPORTED = "unsupported"
+
+
+class Volatility(StrEnum):
+    """How often the value of an attribute changes."""
+
+    STATIC = "static"  # fixed for a firmware version
+    CONFIG = "config"  # only changes when written
+    TELEMETRY = "telemetry"  # measurements and states
+
+
+class AttributeReportingStats:
+    """Outcome counters and timing of the reporting configuration of an attribute."""
+
+    def __init__(self) -> None:
+        """Initialize the counters."""
+        self.success = 0
+        self.failure = 0
+        self.last_duration: float | None = None
+        self.total_duration = 0.0
+
+    def record(self, success: bool, duration: float) -> None:
+        """Record the outcome of one configure reporting request."""
+        if success:
+            self.success += 1
+        else:
+            self.failure += 1
+        self.last_duration = duration
+        self.total_duration += duration
+
+    def __repr__(self) -> str:
+        """Return a short representation for the logs."""
+        return (
+            f"<{type(self).__name__} success={self.success} failure={self.failure}"
+            f" last_duration={self.last_duration}>"
+        )
+
+
+class ModelCapabilityMixin:
+    """Only expose the manufacturer attributes the device model supports.
+
+    CAPABILITY_ATTRIBUTES lists the attributes that only exist on the models having
+    a capability, a floor sensor or a pump for instance, and MODEL_CAPABILITIES the
+    capabilities of each model. The attributes of the capabilities a model lacks
+    are removed from the cluster, so they are never read, reported or shown.
+    Models not in MODEL_CAPABILITIES keep every attribute.
+    """
+
+    CAPABILITY_ATTRIBUTES: dict[str, tuple[int, ...]] = {}
+    MODEL_CAPABILITIES: dict[str, tuple[str, ...]] = {}
+
+    def __init__(self, *args, **kwargs):
+        """Prune the attributes of the capabilities the model lacks."""
+        super().__init__(*args, **kwargs)
+        # group endpoints have no model and keep every attribute
+        model = getattr(self.endpoint.device, "model", None)
+        capabilities = self.MODEL_CAPABILITIES.get(model)
+        if capabilities is not None:
+            self.attributes, self.attributes_by_name = _model_attributes(
+                type(self), frozenset(capabilities)
+            )
+
+
+@functools.cache
+def _model_attributes(
+    cluster: type, capabilities: frozenset[str]
+) -> tuple[dict[int, ZCLAttributeDef], dict[str, ZCLAttributeDef]]:
+    """Return the attributes of a cluster class for a set of capabilities."""
+    unsupported = {
+        attr_id
+        for capability, attr_ids in cluster.CAPABILITY_ATTRIBUTES.items()
+        if capability not in capabilities
+        for attr_id in attr_ids
+    }
+    attributes = {
+        attr_id: attr_def
+        for attr_id, attr_def in cluster.attributes.items()
+        if attr_id not in unsupported
+    }
+    return attributes, {attr_def.name: attr_def for attr_def in attributes.values()}
+
+
+class SinopeReportingMixin:
+    """Configure reporting of the manufacturer cluster attributes.
+
+    MANUFACTURER_REPORTING holds the reporting parameters of every known attribute
+    and REPORTING_PROFILES the attributes each model actually supports, so that a
+    device is never asked to report attributes it does not have. Models without a
+    profile fall back to the whole table.
+
+    The outcome of each attribute, configured, failed or unsupported, is remembered
+    in the store and sent as a reporting_state event. On the next bind configured
+    attributes are verified with batched Read Reporting Configuration requests and
+    only the attributes that differ are configured again, unsupported attributes
+    are skipped.
+
+    The reporting table is packed in as few Configure Reporting frames as the
+    payload budget allows, one group per manufacturer specific flag. Records not
+    accepted by the device are sent again up to REPORTING_RETRIES times with an
+    exponential backoff, except unsupported ones. Frames are sent concurrently,
+    bounded per device by REPORTING_DEVICE_CONCURRENCY and per network by
+    REPORTING_NETWORK_CONCURRENCY.
+
+    When DEDUP_WINDOW is set, reports of the DEDUP_ATTRIBUTES repeating the last
+    forwarded value are dropped before they reach Home Assistant.
+
+    ATTRIBUTE_VOLATILITY gives the volatility of the attributes that are static or
+    configuration, the others are telemetry. Static attributes are never reported.
+    """
+
+    ATTRIBUTE_VOLATILITY: dict[int, Volatility] = {}
+    MANUFACTURER_REPORTING: dict[int, tuple[int, int, int]] = {}
+    REPORTING_PROFILES: dict[str, tuple[int, ...]] = {}
+    BATTERY_MODELS: frozenset[str] = frozenset()
+    DEDUP_ATTRIBUTES: frozenset[int] = frozenset()
+    REPORTING_DEVICE_CONCURRENCY = REPORTING_DEVICE_CONCURRENCY
+
+    def __init__(self, *args, **kwargs):
+        """Initialize the reporting statistics."""
+        super().__init__(*args, **kwargs)
+        self.reporting_stats: dict[int, AttributeReportingStats] = {}
+        self._reporting_states: dict[str, dict] = {}
+        self._dedup_last: dict[int, tuple] = {}
+
+    def volatility(self, attr_id: int) -> Volatility:
+        """Return how often the value of an attribute changes."""
+        return self.ATTRIBUTE_VOLATILITY.get(attr_id, Volatility.TELEMETRY)
+
+    @property
+    def reporting_table(self) -> dict[int, tuple[int, int, int]]:
+        """Return the reporting table of the device model."""
+        profile = self.REPORTING_PROFILES.get(
+            self.endpoint.device.model, self.MANUFACTURER_REPORTING
+        )
+        return {
+            attr_id: self.MANUFACTURER_REPORTING[attr_id]
+            for attr_id in profile
+            if attr_id in self.attributes
+            and self.volatility(attr_id) is not Volatility.STATIC
+        }
+
+    def _update_attribute(self, attrid, value):
+        if DEDUP_WINDOW > 0 and attrid in self.DEDUP_ATTRIBUTES:
+            now = time.monotonic()
+            last = self._dedup_last.get(attrid)
+            if (
+                last is not None
+                and last[0] == value
+                and now - last[1] < self._dedup_hold(attrid)
+            ):
+                self.debug("Dropping unchanged report of attr 0x%04x", attrid)
+                return
+            self._dedup_last[attrid] = (value, now)
+        super()._update_attribute(attrid, value)
+
+    def _dedup_hold(self, attrid: int) -> float:
+        """Return for how long a repeated value of an attribute is dropped."""
+        max_interval = self.MANUFACTURER_REPORTING.get(attrid, (0, 0, 0))[1]
+        if max_interval:
+            return min(DEDUP_WINDOW, max_interval * DEDUP_HEARTBEAT)
+        return DEDUP_WINDOW
+
+    @property
+    def reporting_state(self) -> dict[int, ReportingState]:
+        """Return the persisted reporting configuration outcome of each attribute."""
+        return {
+            int(key, 16): ReportingState(entry["state"])
+            for key, entry in self._reporting_states.items()
+        }
+
+    @property
+    def battery_powered(self) -> bool:
+        """Return True if the device is battery powered."""
+        device = self.endpoint.device
+        if device.model in self.BATTERY_MODELS:
+            return True
+        return device.node_desc is not None and not device.node_desc.is_mains_powered
+
+    async def configure_reporting_all(self):
+        """Configure reporting of all configured attributes.
+
+        The job is queued in the network reporting scheduler. Attributes whose last
+        applied configuration is still current on the device, as verified with Read
+        Reporting Configuration, are not configured again.
+        """
+        scheduler = _scheduler(self.endpoint.device.application)
+        priority = (
+            ReportingScheduler.BATTERY
+            if self.battery_powered
+            else ReportingScheduler.MAINS
+        )
+        start = time.monotonic()
+
+        async def job():
+            self.debug(
+                "Reporting configuration started after %.3fs in queue",
+                time.monotonic() - start,
+            )
+            await self._configure_reporting_all()
+
+        await scheduler.run(priority, job)
+
+    async def _configure_reporting_all(self):
+        device = self.endpoint.device
+        device_limit = _limit(_DEVICE_LIMITS, device, self.REPORTING_DEVICE_CONCURRENCY)
+        network_limit = _limit(
+            _NETWORK_LIMITS, device.application, REPORTING_NETWORK_CONCURRENCY
+        )
+
+        self._reporting_states = states = (
+            (await STORE.async_device(device))
+            .setdefault("reporting", {})
+            .setdefault(f"{self.endpoint.endpoint_id}:0x{self.cluster_id:04x}", {})
+        )
+        # Attributes the device does not support are never configured again
+        table = {
+            attr_id: config
+            for attr_id, config in self.reporting_table.items()
+            if states.get(f"0x{attr_id:04x}", {}).get("state")
+            != ReportingState.UNSUPPORTED
+        }
+        unchanged = await self._unchanged_reporting(
+            {
+                attr_id: config
+                for attr_id, config in table.items()
+                if states.get(f"0x{attr_id:04x}")
+                == {"state": ReportingState.CONFIGURED, "config": list(config)}
+            },
+            device_limit,
+            network_limit,
+        )
+
+        pending = {
+            attr_id: config
+            for attr_id, config in table.items()
+            if attr_id not in unchanged
+        }
+        if not pending:
+            return
+
+        for attempt in range(REPORTING_RETRIES + 1):
+            if attempt:
+                delay = REPORTING_RETRY_DELAY * 2 ** (attempt - 1)
+                await asyncio.sleep(random.uniform(0, delay))
+
+            frames = self._reporting_frames(pending, states)
+            if attempt:
+                # rejected records are retried alone, in case the device cannot
+                # handle frames with several records
+                frames = [
+                    (manufacturer, [record])
+                    for manufacturer, records in frames
+                    for record in records
+                ]
+            results = await asyncio.gather(
+                *(
+                    self._send_reporting_frame(
+                        manufacturer, records, device_limit, network_limit, states
+                    )
+                    for manufacturer, records in frames
+                )
+            )
+            rejected = {
+                attr_id: status
+                for result in results
+                for attr_id, status in result.items()
+            }
+            pending = {
+                attr_id: config
+                for attr_id, config in pending.items()
+                if attr_id in rejected
+                and rejected[attr_id] != foundation.Status.UNSUPPORTED_ATTRIBUTE
+            }
+            if not pending:
+                break
+
+        await STORE.async_save()
+
+        event_args: dict[str, list[str]] = {state: [] for state in ReportingState}
+        for attr_id, state in self.reporting_state.items():
+            if attr_id in table:
+                event_args[state].append(self.find_attribute(attr_id).name)
+        self.listener_event(ZHA_SEND_EVENT, "reporting_state", event_args)
+
+    async def _unchanged_reporting(
+        self,
+        reporting: dict[int, tuple[int, int, int]],
+        device_limit: asyncio.Semaphore,
+        network_limit: asyncio.Semaphore,
+    ) -> set[int]:
+        """Return the attributes whose reporting configuration is current."""
+        if not reporting:
+            return set()
+
+        frames = self._reporting_frames(reporting)
+        results = await asyncio.gather(
+            *(
+                self._read_reporting_frame(
+                    manufacturer, records, device_limit, network_limit
+                )
+                for manufacturer, records in frames
+            )
+        )
+        return set().union(*results)
+
+    async def _read_reporting_frame(
+        self,
+        manufacturer: int | None,
+        records: list[foundation.AttributeReportingConfig],
+        device_limit: asyncio.Semaphore,
+        network_limit: asyncio.Semaphore,
+    ) -> set[int]:
+        """Read the reporting configuration of a frame and return what matches."""
+        async with device_limit, network_limit:
+            try:
+                rsp = await self.general_command(
+                    foundation.GeneralCommand.Read_Reporting_Configuration,
+                    [
+                        foundation.ReadReportingConfigRecord(
+                            direction=record.direction, attrid=record.attrid
+                        )
+                        for record in records
+                    ],
+                    manufacturer=manufacturer,
+                )
+            except Exception as e:
+                self.debug("Reporting configuration read fail: %s", e)
+                return set()
+
+        if not isinstance(rsp[0], list):
+            return set()
+
+        expected = {record.attrid: record.serialize() for record in records}
+        unchanged = {
+            r.config.attrid
+            for r in rsp[0]
+            if r.status == foundation.Status.SUCCESS
+            and expected.get(r.config.attrid) == r.config.serialize()
+        }
+        for attr_id in unchanged:
+            self.debug("Reporting unchanged for attr 0x%04x", attr_id)
+        return unchanged
+
+    def _reporting_frames(
+        self,
+        reporting: dict[int, tuple[int, int, int]],
+        states: dict[str, dict] | None = None,
+    ) -> list[tuple[int | None, list[foundation.AttributeReportingConfig]]]:
+        """Pack the reporting table in frames grouped by manufacturer code.
+
+        Records that cannot be serialized are left out, and marked as failed in
+        states when given.
+        """
+        groups: dict[int | None, list[foundation.AttributeReportingConfig]] = {}
+
+        for attr_id, (min_i, max_i, change) in reporting.items():
+            attr_def = self.find_attribute(attr_id)
+            record = foundation.AttributeReportingConfig()
+            record.direction = foundation.ReportingDirection.SendReports
+            record.attrid = attr_def.id
+            record.datatype = attr_def.zcl_type
+            record.min_interval = min_i
+            record.max_interval = max_i
+            record.reportable_change = change
+
+            try:
+                size = len(record.serialize())
+            except ValueError as e:
+                self.reporting_stats.setdefault(
+                    attr_id, AttributeReportingStats()
+                ).record(False, 0.0)
+                self.debug(
+                    "Reporting configuration fail for attr 0x%04x: %s", attr_id, e
+                )
+                if states is not None:
+                    states[f"0x{attr_id:04x}"] = {
+                        "state": ReportingState.FAILED,
+                        "config": [min_i, max_i, change],
+                    }
+                continue
+
+            manufacturer = (
+                self._manufacturer_id if attr_def.is_manufacturer_specific else None
+            )
+            groups.setdefault(manufacturer, []).append((record, size))
+
+        frames = []
+        for manufacturer, records in groups.items():
+            frame: list[foundation.AttributeReportingConfig] = []
+            size = 0
+            for record, record_size in records:
+                if frame and size + record_size > REPORTING_FRAME_BYTES:
+                    frames.append((manufacturer, frame))
+                    frame, size = [], 0
+                frame.append(record)
+                size += record_size
+            if frame:
+                frames.append((manufacturer, frame))
+
+        return frames
+
+    async def _send_reporting_frame(
+        self,
+        manufacturer: int | None,
+        records: list[foundation.AttributeReportingConfig],
+        device_limit: asyncio.Semaphore,
+        network_limit: asyncio.Semaphore,
+        states: dict[str, dict],
+    ) -> dict[int, foundation.Status | None]:
+        """Send one Configure Reporting frame and return the rejected records.
+
+        The outcome and configuration of every record is remembered in the store.
+        """
+        async with device_limit, network_limit:
+            start = time.monotonic()
+            try:
+                rsp = await self._configure_reporting(
+                    records, manufacturer=manufacturer
+                )
+            except Exception as e:
+                self.debug(
+                    "Reporting configuration fail for attrs %s: %s",
+                    [f"0x{record.attrid:04x}" for record in records],
+                    e,
+                )
+                rejected = dict.fromkeys((record.attrid for record in records), None)
+            else:
+                rejected = self._rejected_records(records, rsp)
+            duration = time.monotonic() - start
+
+        for record in records:
+            stats = self.reporting_stats.setdefault(
+                record.attrid, AttributeReportingStats()
+            )
+            stats.record(record.attrid not in rejected, duration)
+            config = [
+                record.min_interval,
+                record.max_interval,
+                record.reportable_change,
+            ]
+            key = f"0x{record.attrid:04x}"
+            if record.attrid in rejected:
+                if rejected[record.attrid] == foundation.Status.UNSUPPORTED_ATTRIBUTE:
+                    states[key] = {"state": ReportingState.UNSUPPORTED}
+                else:
+                    states[key] = {"state": ReportingState.FAILED, "config": config}
+                self.debug(
+                    "Reporting configuration fail for attr 0x%04x: %s",
+                    record.attrid,
+                    rejected[record.attrid],
+                )
+            else:
+                states[key] = {"state": ReportingState.CONFIGURED, "config": config}
+                self.debug(
+                    "Reporting configured for attr 0x%04x in %.3fs",
+                    record.attrid,
+                    duration,
+                )
+
+        return rejected
+
+    @staticmethod
+    def _rejected_records(
+        records: list[foundation.AttributeReportingConfig], rsp
+    ) -> dict[int, foundation.Status]:
+        """Return the status of every record not accepted by the device."""
+        if not isinstance(rsp[0], list):
+            # Default response, the status applies to the whole frame
+            status = rsp[1]
+            if status == foundation.Status.SUCCESS:
+                return {}
+            return dict.fromkeys((record.attrid for record in records), status)
+
+        # Only failed records are listed, a single SUCCESS record means all passed
+        return {
+            r.attrid: r.status
+            for r in rsp[0]
+            if r.status != foundation.Status.SUCCESS and r.attrid is not None
+        }
+
+    async def read_attributes_bulk(
+        self, attributes: Iterable[int | str] | None = None
+    ) -> tuple[dict[str, Any], dict[str, foundation.Status]]:
+        """Read attributes from the device in as few frames as possible.
+
+        Attributes default to every attribute of the cluster. They are packed in
+        Read Attributes frames within READ_FRAME_BYTES, one group per manufacturer
+        specific flag, and the frames are sent within the reporting concurrency
+        limits. Return the values, converted to their attribute type, and the
+        status of the attributes that could not be read, both keyed by name.
+        """
+        if attributes is None:
+            attributes = self.attributes
+        device = self.endpoint.device
+        device_limit = _limit(_DEVICE_LIMITS, device, self.REPORTING_DEVICE_CONCURRENCY)
+        network_limit = _limit(
+            _NETWORK_LIMITS, device.application, REPORTING_NETWORK_CONCURRENCY
+        )
+
+        success: dict[str, Any] = {}
+        failure: dict[str, foundation.Status] = {}
+        await asyncio.gather(
+            *(
+                self._read_frame(
+                    manufacturer, frame, device_limit, network_limit, success, failure
+                )
+                for manufacturer, frame in self._read_frames(attributes)
+            )
+        )
+        return success, failure
+
+    def _read_frames(
+        self, attributes: Iterable[int | str]
+    ) -> list[tuple[int | None, list[ZCLAttributeDef]]]:
+        """Pack attributes in Read Attributes frames grouped by manufacturer code."""
+        groups: dict[bool, list[ZCLAttributeDef]] = {}
+        for attribute in attributes:
+            attr_def = self.find_attribute(attribute)
+            groups.setdefault(attr_def.is_manufacturer_specific, []).append(attr_def)
+
+        frames = []
+        for specific, attr_defs in groups.items():
+            manufacturer = self._manufacturer_id if specific else None
+            # first fit decreasing, each record goes in the first frame with room
+            bins: list[list[ZCLAttributeDef]] = []
+            sizes: list[int] = []
+            for attr_def in sorted(attr_defs, key=_read_record_size, reverse=True):
+                record_size = _read_record_size(attr_def)
+                for index, size in enumerate(sizes):
+                    if size + record_size <= READ_FRAME_BYTES:
+                        break
+                else:
+                    index = len(bins)
+                    bins.append([])
+                    sizes.append(0)
+                bins[index].append(attr_def)
+                sizes[index] += record_size
+            frames.extend((manufacturer, frame) for frame in bins)
+        return frames
+
+    async def _read_frame(
+        self,
+        manufacturer: int | None,
+        attr_defs: list[ZCLAttributeDef],
+        device_limit: asyncio.Semaphore,
+        network_limit: asyncio.Semaphore,
+        success: dict[str, Any],
+        failure: dict[str, foundation.Status],
+    ) -> None:
+        """Send one Read Attributes frame and record the values it returns."""
+        async with device_limit, network_limit:
+            try:
+                rsp = await self.read_attributes_raw(
+                    [attr_def.id for attr_def in attr_defs], manufacturer=manufacturer
+                )
+            except Exception as e:
+                self.debug(
+                    "Read fail for attrs %s: %s",
+                    [f"0x{attr_def.id:04x}" for attr_def in attr_defs],
+                    e,
+                )
+                rsp = [foundation.Status.FAILURE]
+
+        if not isinstance(rsp[0], list):
+            # Default response, the status applies to the whole frame
+            for attr_def in attr_defs:
+                failure[attr_def.name] = rsp[0]
+            return
+
+        records = {record.attrid: record for record in rsp[0]}
+        for attr_def in attr_defs:
+            record = records.get(attr_def.id)
+            if record is None:
+                failure[attr_def.name] = foundation.Status.FAILURE
+            elif record.status != foundation.Status.SUCCESS:
+                if record.status == foundation.Status.UNSUPPORTED_ATTRIBUTE:
+                    self.add_unsupported_attribute(attr_def.id)
+                failure[attr_def.name] = record.status
+            else:
+                try:
+                    value = attr_def.type(record.value.value)
+                except ValueError:
+                    value = record.value.value
+                self._update_attribute(attr_def.id, value)
+                self.remove_unsupported_attribute(attr_def.id)
+                success[attr_def.name] = value
+
+    async def discover_attributes(self, sample_time: float = 0) -> dict:
+        """Discover the attributes of the device and compare them with AttributeDefs.
+
+        Manufacturer specific and standard attributes are listed with Discover
+        Attributes Extended requests, then the readable ones are read. When
+        sample_time is set, reporting is configured on the reportable attributes and
+        the reported values are sampled for that many seconds before reporting is
+        disabled again. The attribute map of the model is saved in the store under
+        discovery and returned.
+        """
+        discovered = await self._discover_attribute_records()
+        values: dict[int, list] = {attr_id: [] for attr_id in discovered}
+
+        def _sample(attr_id, value) -> None:
+            json_value = _snapshot_value(value)
+            samples = values.get(attr_id)
+            if (
+                samples is not None
+                and json_value is not None
+                and json_value not in samples
+                and len(samples) < DISCOVERY_MAX_VALUES
+            ):
+                samples.append(json_value)
+
+        class _Sampler:
+            def attribute_updated(self, attr_id, value, timestamp=None):
+                _sample(attr_id, value)
+
+        sampler = _Sampler()
+        self.add_listener(sampler)
+        try:
+            await self.read_attributes_bulk(
+                attr_id
+                for attr_id, record in discovered.items()
+                if attr_id in self.attributes
+                and record.acl & foundation.AttributeAccessControl.READ
+            )
+            if sample_time:
+                await self._sample_reports(discovered, sample_time)
+        finally:
+            self.remove_listener(sampler)
+
+        defined = self.attributes
+        attribute_map = {
+            "model": self.endpoint.device.model,
+            "attributes": {},
+            "missing": sorted(
+                attr_def.name
+                for attr_id, attr_def in defined.items()
+                if attr_id not in discovered
+            ),
+            "undefined": sorted(
+                f"0x{attr_id:04x}" for attr_id in discovered if attr_id not in defined
+            ),
+            "type_mismatch": {},
+        }
+        for attr_id, record in sorted(discovered.items()):
+            attr_def = defined.get(attr_id)
+            attribute_map["attributes"][f"0x{attr_id:04x}"] = {
+                "name": attr_def.name if attr_def else None,
+                "type": f"0x{record.datatype:02x}",
+                "access": "".join(
+                    letter
+                    for flag, letter in (
+                        (foundation.AttributeAccessControl.READ, "r"),
+                        (foundation.AttributeAccessControl.WRITE, "w"),
+                        (foundation.AttributeAccessControl.REPORT, "p"),
+                    )
+                    if record.acl & flag
+                ),
+                "values": values[attr_id],
+            }
+            if attr_def is not None and attr_def.zcl_type != record.datatype:
+                attribute_map["type_mismatch"][attr_def.name] = [
+                    f"0x{attr_def.zcl_type:02x}",
+                    f"0x{record.datatype:02x}",
+                ]
+
+        doc = await STORE.async_device(self.endpoint.device)
+        doc["discovery"] = attribute_map
+        await STORE.async_save()
+        return attribute_map
+
+    async def _discover_attribute_records(
+        self,
+    ) -> dict[int, foundation.DiscoverAttributesExtendedResponseRecord]:
+        """List the attributes of the device, manufacturer specific ones first."""
+        discovered = {}
+        for manufacturer in dict.fromkeys((self._manufacturer_id, None)):
+            start = 0
+            while True:
+                rsp = await self.general_command(
+                    foundation.GeneralCommand.Discover_Attribute_Extended,
+                    start,
+                    DISCOVERY_PAGE_SIZE,
+                    manufacturer=manufacturer,
+                )
+                records = getattr(rsp, "extended_attr_info", None)
+                if records is None:
+                    self.debug("Attribute discovery not supported: %s", rsp)
+                    break
+                for record in records:
+                    discovered.setdefault(record.attrid, record)
+                if rsp.discovery_complete or not records:
+                    break
+                start = records[-1].attrid + 1
+        return discovered
+
+    async def _sample_reports(
+        self,
+        discovered: dict[int, foundation.DiscoverAttributesExtendedResponseRecord],
+        sample_time: float,
+    ) -> None:
+        """Enable reporting on the reportable attributes while values are sampled."""
+        reporting = {
+            attr_id: DISCOVERY_REPORTING
+            for attr_id, record in discovered.items()
+            if attr_id in self.attributes
+            and record.acl & foundation.AttributeAccessControl.REPORT
+        }
+        for manufacturer, records in self._reporting_frames(reporting):
+            await self._configure_reporting(records, manufacturer=manufacturer)
+        try:
+            await asyncio.sleep(sample_time)
+        finally:
+            # back to the reporting table, reports of the other attributes are off
+            table = self.reporting_table
+            restore = {
+                attr_id: table.get(attr_id, (min_i, 0xFFFF, change))
+                for attr_id, (min_i, _, change) in reporting.items()
+            }
+            for manufacturer, records in self._reporting_frames(restore):
+                await self._configure_reporting(records, manufacturer=manufacturer)
+
+
+def _read_record_size(attr_def: ZCLAttributeDef) -> int:
+    """Return the size of the Read Attributes response record of an attribute."""
+    # attribute id, status and data type, then the value
+    return 4 + getattr(attr_def.type, "_size", READ_VARIABLE_BYTES)
+
+
+def _snapshot_value(value):
+    """Return the JSON value of an attribute value, None when it has none."""
+    if isinstance(value, (bool, float)):
+        return value
+    if isinstance(value, int):
+        return int(value)
+    if isinstance(value, str):
+        return str(value)
+    return None
+
+
+class AttributeSnapshotMixin:
+    """Serve static and configuration attributes from a snapshot in the store.
+
+    Used with SinopeReportingMixin, which holds the volatility of the attributes.
+    Reads allowing the cache are answered from the snapshot, so that the entities of
+    a device are available right after a restart without waiting for the device.
+    Other reads go to the device and update the snapshot. Configuration values
+    older than SNAPSHOT_TTL_CONFIG are refreshed in the background. Static values
+    are only read again when the firmware version of the device changes. Values
+    read, reported or written keep the snapshot current.
+    """
+
+    def __init__(self, *args, **kwargs):
+        """Initialize the snapshot, it is loaded on first read."""
+        super().__init__(*args, **kwargs)
+        self._snapshot: dict | None = None
+        self._snapshot_refresh: asyncio.Task | None = None
+        self._snapshot_save: asyncio.Task | None = None
+        self._snapshot_dirty = False
+
+    def _snapshot_ttl(self, attr_id: int) -> float | None:
+        """Return the age after which a snapshot value is read again, None if never."""
+        volatility = self.volatility(attr_id)
+        if volatility is Volatility.STATIC:
+            return math.inf
+        if volatility is Volatility.CONFIG:
+            return SNAPSHOT_TTL_CONFIG
+        return None
+
+    def _firmware_version(self):
+        """Return the firmware version known by zigpy, None when not read yet."""
+        device = self.endpoint.device
+        for cluster_id, cluster_type, attr_id in (
+            (
+                Ota.cluster_id,
+                ClusterType.Client,
+                Ota.AttributeDefs.current_file_version,
+            ),
+            (Basic.cluster_id, ClusterType.Server, Basic.AttributeDefs.sw_build_id),
+        ):
+            try:
+                value = device.find_cluster(cluster_id, cluster_type).get(attr_id.id)
+            except ValueError:
+                continue
+            if value is not None:
+                return _snapshot_value(value)
+        return None
+
+    async def _load_snapshot(self) -> dict:
+        if self._snapshot is None:
+            doc = await STORE.async_device(self.endpoint.device)
+            key = f"{self.endpoint.endpoint_id}:0x{self.cluster_id:04x}"
+            self._snapshot = doc.setdefault("snapshot", {}).setdefault(key, {})
+
+        firmware = self._firmware_version()
+        if firmware is not None and self._snapshot.get("firmware") != firmware:
+            if "firmware" in self._snapshot:
+                self.debug("Firmware changed, dropping the static attributes")
+                for key in [
+                    key
+                    for key in self._snapshot
+                    if key.startswith("0x")
+                    and self.volatility(int(key, 16)) is Volatility.STATIC
+                ]:
+                    del self._snapshot[key]
+            self._snapshot["firmware"] = firmware
+        return self._snapshot
+
+    def _update_attribute(self, attrid, value):
+        super()._update_attribute(attrid, value)
+        if self._snapshot is None or self._snapshot_ttl(attrid) is None:
+            return
+        json_value = _snapshot_value(value)
+        key = f"0x{attrid:04x}"
+        entry = self._snapshot.get(key)
+        if json_value is None or (entry is not None and entry[0] == json_value):
+            return
+        self._snapshot[key] = [json_value, time.time()]
+        self._snapshot_dirty = True
+        if self._snapshot_save is None:
+            self._snapshot_save = asyncio.create_task(self._save_snapshot())
+
+    async def _save_snapshot(self) -> None:
+        try:
+            while self._snapshot_dirty:
+                self._snapshot_dirty = False
+                await STORE.async_save()
+        finally:
+            self._snapshot_save = None
+
+    async def read_attributes(
+        self,
+        attributes,
+        allow_cache=False,
+        only_cache=False,
+        manufacturer=None,
+        **kwargs,
+    ):
+        """Read attributes, answering the ones found in the snapshot from it."""
+        if only_cache or not self.ATTRIBUTE_VOLATILITY:
+            return await super().read_attributes(
+                attributes, allow_cache, only_cache, manufacturer, **kwargs
+            )
+
+        snapshot = await self._load_snapshot()
+        if not allow_cache:
+            return await self._read_to_snapshot(
+                attributes, allow_cache, manufacturer, **kwargs
+            )
+
+        now = time.time()
+        success, failure = {}, {}
+        to_read, missing, stale = [], [], []
+        for attribute in attributes:
+            if isinstance(attribute, str):
+                attr_def = self.attributes_by_name.get(attribute)
+            else:
+                attr_def = self.attributes.get(attribute)
+            ttl = self._snapshot_ttl(attr_def.id) if attr_def else None
+            entry = snapshot.get(f"0x{attr_def.id:04x}") if ttl else None
+            try:
+                value = attr_def.type(entry[0]) if entry else None
+            except (TypeError, ValueError):
+                value = None
+            if value is None:
+                (missing if ttl else to_read).append(attribute)
+                continue
+
+            self._update_attribute(attr_def.id, value)
+            success[attribute] = value
+            if now - entry[1] > ttl:
+                stale.append(attr_def.id)
+
+        # values missing from the snapshot, like the static ones dropped after a
+        # firmware update, are read from the device instead of the zigpy cache
+        for batch, cache in ((to_read, allow_cache), (missing, False)):
+            if batch:
+                read_success, read_failure = await self._read_to_snapshot(
+                    batch, cache, manufacturer, **kwargs
+                )
+                success.update(read_success)
+                failure.update(read_failure)
+
+        if stale and self._snapshot_refresh is None:
+            self.debug("Refreshing %d snapshot attributes", len(stale))
+            self._snapshot_refresh = asyncio.create_task(
+                self._refresh_snapshot(stale, manufacturer)
+            )
+        return success, failure
+
+    async def _read_to_snapshot(self, attributes, allow_cache, manufacturer, **kwargs):
+        """Read attributes from the device and record them in the snapshot."""
+        success, failure = await super().read_attributes(
+            attributes, allow_cache, False, manufacturer, **kwargs
+        )
+        now = time.time()
+        recorded = False
+        for attribute, value in success.items():
+            attr_id = self.find_attribute(attribute).id
+            json_value = _snapshot_value(value)
+            if self._snapshot_ttl(attr_id) is not None and json_value is not None:
+                self._snapshot[f"0x{attr_id:04x}"] = [json_value, now]
+                recorded = True
+        if recorded:
+            await STORE.async_save()
+        return success, failure
+
+    async def _refresh_snapshot(self, attr_ids: list[int], manufacturer) -> None:
+        try:
+            await self._read_to_snapshot(attr_ids, False, manufacturer)
+        except Exception as e:
+            self.debug("Snapshot refresh failed: %s", e)
+        finally:
+            self._snapshot_refresh = None
+
+
+def secs_since_2k() -> int:
+    """Return the local time in seconds since 2000, as kept by the device clocks."""
+    return int((dt_util.now().replace(tzinfo=None) - _Y2K).total_seconds())
+
+
+class ClockDriftStats:
+    """Drift of the clock of a device measured at each sync."""
+
+    def __init__(self) -> None:
+        """Initialize the counters."""
+        self.syncs = 0
+        self.corrections = 0
+        self.last_drift: float | None = None
+        self.max_drift = 0.0
+        self.total_drift = 0.0
+
+    def record(self, drift: float, corrected: bool) -> None:
+        """Record the drift measured by one sync."""
+        self.syncs += 1
+        self.corrections += corrected
+        self.last_drift = drift
+        self.max_drift = max(self.max_drift, abs(drift))
+        self.total_drift += abs(drift)
+
+    @property
+    def mean_drift(self) -> float | None:
+        """Return the mean absolute drift."""
+        return self.total_drift / self.syncs if self.syncs else None
+
+    def as_dict(self) -> dict:
+        """Return the statistics as event arguments."""
+        return {
+            "syncs": self.syncs,
+            "corrections": self.corrections,
+            "last_drift": self.last_drift,
+            "max_drift": self.max_drift,
+            "mean_drift": self.mean_drift,
+        }
+
+    def __repr__(self) -> str:
+        """Return a short representation for the logs."""
+        return (
+            f"<{type(self).__name__} syncs={self.syncs}"
+            f" corrections={self.corrections} last_drift={self.last_drift}>"
+        )
+
+
+class ClockSyncMixin:
+    """Keep the secs_since_2k clock of a device on time.
+
+    The clock is read once and its drift measured against the local time, less
+    half the round trip of the read. It is only written when the drift exceeds
+    CLOCK_DRIFT_THRESHOLD. Each device is synced at a random time within
+    CLOCK_SYNC_WINDOW once it is first heard from after the quirks are loaded and
+    when it announces itself after a power loss, then every CLOCK_SYNC_INTERVAL.
+    The drift statistics are kept in clock_stats and sent as a clock_drift event.
+    """
+
+    CLOCK_ATTRIBUTE = "secs_since_2k"
+
+    def __init__(self, *args, **kwargs):
+        """Initialize the drift statistics and listen to device announcements."""
+        super().__init__(*args, **kwargs)
+        self.clock_stats = ClockDriftStats()
+        self._clock_task: asyncio.Task | None = None
+        zdo = getattr(self.endpoint.device, "zdo", None)
+        if zdo is not None:  # not on the endpoint of a group
+            zdo.add_listener(self)
+
+    def handle_cluster_general_request(self, hdr, args, *, dst_addressing=None):
+        """Start syncing the clock when the device is first heard from."""
+        if self._clock_task is None:
+            self.schedule_clock_sync()
+        super().handle_cluster_general_request(hdr, args, dst_addressing=dst_addressing)
+
+    def device_announce(self, device) -> None:
+        """Sync the clock of a device that joined again, usually after a power loss."""
+        self.schedule_clock_sync()
+
+    def schedule_clock_sync(self) -> None:
+        """Sync the clock at a random time within CLOCK_SYNC_WINDOW."""
+        if self._clock_task is not None:
+            self._clock_task.cancel()
+        self._clock_task = asyncio.create_task(
+            self._clock_sync_loop(random.uniform(0, CLOCK_SYNC_WINDOW))
+        )
+
+    async def _clock_sync_loop(self, delay: float) -> None:
+        while True:
+            await asyncio.sleep(delay)
+            try:
+                await self.sync_clock()
+            except Exception as e:
+                self.warning("Clock sync failed: %s", e)
+            delay = CLOCK_SYNC_INTERVAL + random.uniform(0, CLOCK_SYNC_WINDOW)
+
+    async def sync_clock(self) -> float | None:
+        """Measure the drift of the device clock and set it when above the threshold."""
+        attr_id = self.find_attribute(self.CLOCK_ATTRIBUTE).id
+        start = time.monotonic()
+        success, _ = await self.read_attributes([attr_id], allow_cache=False)
+        if attr_id not in success:
+            self.debug("Unable to read the device clock")
+            return None
+
+        half_round_trip = (time.monotonic() - start) / 2
+        drift = success[attr_id] - (secs_since_2k() - half_round_trip)
+        corrected = abs(drift) > CLOCK_DRIFT_THRESHOLD
+        if corrected:
+            self.debug("Setting the device clock, drift %.1f s", drift)
+            await self.write_attributes({attr_id: secs_since_2k()})
+
+        self.clock_stats.record(drift, corrected)
+        self.listener_event(ZHA_SEND_EVENT, "clock_drift", self.clock_stats.as_dict())
+        return drift
+
+
+class FleetEnergy:
+    """Columnar ring buffer of the energy totals of a fleet of meters.
+
+    A circuit is one energy counter of one device, identified by the IEEE address,
+    endpoint, attribute name and model. Each sample is a time, a circuit index and
+    a total in kWh, stored in three typed arrays that grow with the samples up to
+    capacity; the oldest samples are then overwritten. Rollups walk the columns once
+    and give the energy used per circuit and by the whole fleet, and the peak demand
+    over FLEET_DEMAND_INTERVAL windows. Samples are exported to CSV, or to Parquet
+    when pyarrow is installed.
+    """
+
+    FIELDS = ("time", "ieee", "endpoint", "attribute", "model", "kwh", "delta_kwh")
+
+    def __init__(self, capacity: int = FLEET_CAPACITY) -> None:
+        """Initialize empty columns."""
+        self.capacity = capacity
+        self.circuits: list[tuple[str, int, str, str]] = []
+        self._circuit_ids: dict[tuple[str, int, str, str], int] = {}
+        self._time = array("d")
+        self._circuit = array("I")
+        self._kwh = array("d")
+        self._next = 0
+        self.size = 0
+
+    def record(
+        self, circuit: tuple[str, int, str, str], timestamp: float, kwh: float
+    ) -> None:
+        """Append the total of a circuit."""
+        index = self._circuit_ids.get(circuit)
+        if index is None:
+            index = self._circuit_ids[circuit] = len(self.circuits)
+            self.circuits.append(circuit)
+        i = self._next
+        if self.size < self.capacity:
+            self._time.append(timestamp)
+            self._circuit.append(index)
+            self._kwh.append(kwh)
+            self.size += 1
+        else:
+            self._time[i] = timestamp
+            self._circuit[i] = index
+            self._kwh[i] = kwh
+        self._next = (i + 1) % self.capacity
+
+    def columns(
+        self, start: float | None = None, end: float | None = None
+    ) -> tuple[array, array, array]:
+        """Return the time, circuit and kWh columns, oldest sample first."""
+        first = (self._next - self.size) % self.capacity
+        if first + self.size <= self.capacity:
+            cut = slice(first, first + self.size)
+            columns = [column[cut] for column in (self._time, self._circuit, self._kwh)]
+        else:
+            columns = [
+                column[first:] + column[: self._next]
+                for column in (self._time, self._circuit, self._kwh)
+            ]
+        times = columns[0]
+        lo = 0 if start is None else bisect_left(times, start)
+        hi = len(times) if end is None else bisect_right(times, end)
+        if (lo, hi) != (0, len(times)):
+            columns = [column[lo:hi] for column in columns]
+        return tuple(columns)
+
+    def rollup(self, start: float | None = None, end: float | None = None) -> dict:
+        """Return the energy used and the peak demand of the fleet and each circuit.
+
+        The energy of a circuit between two samples is spread evenly over the
+        demand windows they cover.
+        """
+        return self._rollup(self.columns(start, end), list(self.circuits))
+
+    async def async_rollup(
+        self, start: float | None = None, end: float | None = None
+    ) -> dict:
+        """Roll up a copy of the columns from the executor."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None, self._rollup, self.columns(start, end), list(self.circuits)
+        )
+
+    @staticmethod
+    def _rollup(columns: tuple[array, array, array], circuit_names: list) -> dict:
+        times, circuits, kwh = columns
+        interval = FLEET_DEMAND_INTERVAL
+        last: dict[int, tuple[float, float]] = {}
+        used = [0.0] * len(circuit_names)
+        fleet_windows: dict[int, float] = {}
+        circuit_windows: dict[tuple[int, int], float] = {}
+
+        for timestamp, circuit, total in zip(times, circuits, kwh):
+            previous = last.get(circuit)
+            last[circuit] = (timestamp, total)
+            if previous is None or total <= previous[1]:
+                continue
+            since, delta = previous[0], total - previous[1]
+            used[circuit] += delta
+            if timestamp <= since:
+                shares = [(int(timestamp // interval), delta)]
+            else:
+                rate = delta / (timestamp - since)
+                window = int(since // interval)
+                shares = []
+                while True:
+                    window_end = min((window + 1) * interval, timestamp)
+                    shares.append((window, rate * (window_end - since)))
+                    if window_end >= timestamp:
+                        break
+                    since = window_end
+                    window += 1
+            for window, energy in shares:
+                fleet_windows[window] = fleet_windows.get(window, 0.0) + energy
+                key = (circuit, window)
+                circuit_windows[key] = circuit_windows.get(key, 0.0) + energy
+
+        hours = interval / 3600
+        peaks = [0.0] * len(circuit_names)
+        for (circuit, _), energy in circuit_windows.items():
+            peaks[circuit] = max(peaks[circuit], energy / hours)
+        peak_window = max(fleet_windows, key=fleet_windows.get, default=None)
+        return {
+            "start": times[0] if times else None,
+            "end": times[-1] if times else None,
+            "total_kwh": sum(used),
+            "peak_kw": (
+                0.0 if peak_window is None else fleet_windows[peak_window] / hours
+            ),
+            "peak_start": None if peak_window is None else peak_window * interval,
+            "circuits": {
+                f"{ieee}:{endpoint}:{attribute}": {
+                    "model": model,
+                    "kwh": used[circuit],
+                    "peak_kw": peaks[circuit],
+                }
+                for circuit, (ieee, endpoint, attribute, model) in enumerate(
+                    circuit_names
+                )
+                if circuit in last
+            },
+        }
+
+    def rows(self, start: float | None = None, end: float | None = None):
+        """Yield the samples with the energy used since the previous one."""
+        last: dict[int, float] = {}
+        for timestamp, circuit, total in zip(*self.columns(start, end)):
+            previous = last.get(circuit)
+            last[circuit] = total
+            yield (
+                datetime.fromtimestamp(timestamp, timezone.utc).isoformat(),
+                *self.circuits[circuit],
+                total,
+                None if previous is None else max(total - previous, 0.0),
+            )
+
+    def export(
+        self, path: str, start: float | None = None, end: float | None = None
+    ) -> int:
+        """Write the samples to a Parquet file if path ends in .parquet, else CSV.
+
+        Returns the number of samples written.
+        """
+        rows = list(self.rows(start, end))
+        if path.endswith(".parquet"):
+            try:
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+            except ImportError as e:
+                raise ImportError("Parquet export requires pyarrow") from e
+            table = pa.table(
+                {field: [row[i] for row in rows] for i, field in enumerate(self.FIELDS)}
+            )
+            pq.write_table(table, path)
+        else:
+            with open(path, "w", encoding="utf-8", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(self.FIELDS)
+                writer.writerows(rows)
+        return len(rows)
+
+    async def async_export(
+        self, path: str, start: float | None = None, end: float | None = None
+    ) -> int:
+        """Export the samples from the executor."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.export, path, start, end)
+
+
+FLEET = FleetEnergy()
+
+
+class EnergyAccumulatorMixin:
+    """Turn the energy counters of the device into monotonic totals.
+
+    ENERGY_COUNTERS maps the attribute of each energy counter to the divisor of its
+    value. Device counters wrap around and restart from zero after a power loss, so
+    an offset is added to them to keep the total increasing and Home Assistant
+    never records a bogus spike. Offsets are kept in the store, reports received
+    before it is loaded are held until then. Every ENERGY_DELTA_INTERVAL the energy
+    used since the previous interval is sent as an energy_delta event.
+
+    Totals are also recorded in FLEET, in kWh using ENERGY_KWH, for the models in
+    FLEET_MODELS or all of them when it is None.
+    """
+
+    ENERGY_COUNTERS: dict[int, int] = {}
+    ENERGY_KWH = 0.001  # kWh per unit of the forwarded totals
+    FLEET_MODELS: frozenset[str] | None = None
+
+    def __init__(self, *args, **kwargs):
+        """Initialize the counters, their state is loaded on the first report."""
+        super().__init__(*args, **kwargs)
+        self._energy: dict | None = None
+        self._energy_pending: list[tuple[int, Any]] = []
+        self._energy_load: asyncio.Task | None = None
+        self._energy_save: asyncio.Task | None = None
+        self._energy_marks: dict[int, tuple[int, float]] = {}
+
+    @property
+    def _energy_key(self) -> str:
+        return f"{self.endpoint.endpoint_id}:0x{self.cluster_id:04x}"
+
+    def _update_attribute(self, attrid, value):
+        if attrid not in self.ENERGY_COUNTERS or value is None:
+            super()._update_attribute(attrid, value)
+            return
+
+        if self._energy is None:
+            doc = STORE.device(self.endpoint.device)
+            if doc is not None:
+                self._energy = doc.setdefault("energy", {}).setdefault(
+                    self._energy_key, {}
+                )
+        if self._energy is None:
+            self._energy_pending.append((attrid, value))
+            if self._energy_load is None:
+                self._energy_load = asyncio.create_task(self._load_energy())
+            return
+        self._accumulate(attrid, int(value))
+
+    async def _load_energy(self) -> None:
+        try:
+            doc = await STORE.async_device(self.endpoint.device)
+        finally:
+            self._energy_load = None
+        self._energy = doc.setdefault("energy", {}).setdefault(self._energy_key, {})
+        pending, self._energy_pending = self._energy_pending, []
+        for attrid, value in pending:
+            self._accumulate(attrid, int(value))
+
+    def _accumulate(self, attrid: int, raw: int) -> None:
+        """Forward the total of an energy counter and keep its offset current."""
+        key = f"0x{attrid:04x}"
+        offset, last = self._energy.get(key, (0, None))
+        if last is not None and raw < last:
+            if last - raw > ENERGY_COUNTER_MODULUS // 2:
+                self.debug("Energy counter 0x%04x rolled over", attrid)
+                offset += ENERGY_COUNTER_MODULUS
+            else:
+                self.debug("Energy counter 0x%04x reset from %s", attrid, last)
+                offset += last
+        if self._energy.get(key) != [offset, raw]:
+            changed = key not in self._energy or self._energy[key][0] != offset
+            self._energy[key] = [offset, raw]
+            self._schedule_energy_save(0 if changed else ENERGY_SAVE_INTERVAL)
+
+        total = offset + raw
+        divisor = self.ENERGY_COUNTERS[attrid]
+        self._energy_delta(attrid, total, divisor)
+        device = self.endpoint.device
+        if self.FLEET_MODELS is None or device.model in self.FLEET_MODELS:
+            FLEET.record(
+                (
+                    str(device.ieee),
+                    self.endpoint.endpoint_id,
+                    self.find_attribute(attrid).name,
+                    device.model,
+                ),
+                time.time(),
+                total / divisor * self.ENERGY_KWH,
+            )
+        super()._update_attribute(attrid, total if divisor == 1 else total / divisor)
+
+    def _energy_delta(self, attrid: int, total: int, divisor: int) -> None:
+        """Send the energy used once the delta interval of the counter is over."""
+        now = time.monotonic()
+        mark = self._energy_marks.get(attrid)
+        if mark is not None and now - mark[1] < ENERGY_DELTA_INTERVAL:
+            return
+        self._energy_marks[attrid] = (total, now)
+        if mark is None:
+            return
+        self.listener_event(
+            ZHA_SEND_EVENT,
+            "energy_delta",
+            {
+                "attribute": self.find_attribute(attrid).name,
+                "delta": (total - mark[0]) / divisor,
+                "total": total / divisor,
+                "interval": round(now - mark[1]),
+            },
+        )
+
+    def _schedule_energy_save(self, delay: float) -> None:
+        if self._energy_save is not None:
+            if delay:
+                return
+            self._energy_save.cancel()
+        self._energy_save = asyncio.create_task(self._save_energy(delay))
+
+    async def _save_energy(self, delay: float) -> None:
+        await asyncio.sleep(delay)
+        self._energy_save = None
+        await STORE.async_save()
+
+
+class DemandResponseMixin:
+    """Apply the settings of demand response events to the device.
+
+    DR_ATTRIBUTES maps each attribute changed during an event to its value during
+    and after the event. A value during the event of None leaves the attribute alone
+    unless the campaign sets it, a value after the event of None restores the value
+    the attribute had before it. Only the models in DR_MODELS take part, or all of
+    them when it is None, and devices of a lower DR_PRIORITY are written first.
+    """
+
+    DR_ATTRIBUTES: dict[int, tuple[Any, Any]] = {}
+    DR_MODELS: frozenset[str] | None = None
+    DR_PRIORITY = 0
+
+    def __init__(self, *args, **kwargs):
+        """Initialize the values restored after an event."""
+        super().__init__(*args, **kwargs)
+        self._dr_restore: dict[int, Any] = {}
+
+    @property
+    def dr_enabled(self) -> bool:
+        """Return True if the device takes part in demand response events."""
+        return self.DR_MODELS is None or (
+            getattr(self.endpoint.device, "model", None) in self.DR_MODELS
+        )
+
+    async def dr_apply(self, settings: dict[str, Any]) -> dict[str, list[str]]:
+        """Write the event settings, keeping the values to restore after it."""
+        values = {}
+        for attr_id, (during, _) in self.DR_ATTRIBUTES.items():
+            if attr_id not in self.attributes:
+                continue
+            value = settings.get(self.attributes[attr_id].name, during)
+            if value is not None:
+                values[attr_id] = value
+
+        restore = [
+            attr_id for attr_id in values if self.DR_ATTRIBUTES[attr_id][1] is None
+        ]
+        if missing := [attr_id for attr_id in restore if self.get(attr_id) is None]:
+            await self.read_attributes_bulk(missing)
+        self._dr_restore = {
+            attr_id: self.get(attr_id) if after is None else after
+            for attr_id, (_, after) in self.DR_ATTRIBUTES.items()
+            if attr_id in values
+        }
+        return await self._dr_write(values, "applied")
+
+    async def dr_restore(self) -> dict[str, list[str]]:
+        """Write back the values the device had before the event."""
+        values = {
+            attr_id: value
+            for attr_id, value in self._dr_restore.items()
+            if value is not None
+        }
+        self._dr_restore = {}
+        return await self._dr_write(values, "restored")
+
+    async def _dr_write(self, values: dict[int, Any], state: str):
+        """Write values until the device confirms them when read back."""
+        device = self.endpoint.device
+        device_limit = _limit(_DEVICE_LIMITS, device, self.REPORTING_DEVICE_CONCURRENCY)
+        network_limit = _limit(
+            _NETWORK_LIMITS, device.application, REPORTING_NETWORK_CONCURRENCY
+        )
+
+        pending = dict(values)
+        for attempt in range(DR_RETRIES + 1):
+            if not pending:
+                break
+            if attempt:
+                delay = REPORTING_RETRY_DELAY * 2 ** (attempt - 1)
+                await asyncio.sleep(random.uniform(0, delay))
+            try:
+                async with device_limit, network_limit:
+                    await self.write_attributes(pending)
+            except Exception as e:
+                self.debug("Demand response write failed: %s", e)
+                continue
+            success, _ = await self.read_attributes_bulk(pending)
+            pending = {
+                attr_id: value
+                for attr_id, value in pending.items()
+                if success.get(self.find_attribute(attr_id).name)
+                != self.find_attribute(attr_id).type(value)
+            }
+
+        result = {
+            "confirmed": [
+                self.find_attribute(attr_id).name
+                for attr_id in values
+                if attr_id not in pending
+            ],
+            "failed": [self.find_attribute(attr_id).name for attr_id in pending],
+        }
+        self.listener_event(
+            ZHA_SEND_EVENT, "demand_response", {"state": state, **result}
+        )
+        return result
+
+
+class DemandResponseCampaign:
+    """Roll a demand response event out to every device of a fleet.
+
+    The settings map attribute names to their value during the peak window from
+    start to end, in seconds since the epoch. The devices are written in priority
+    order and DR_STAGGER seconds apart within the reporting concurrency limits,
+    so hundreds of devices are done within the lead time of the event.
+    """
+
+    def __init__(
+        self,
+        clusters: Iterable[DemandResponseMixin],
+        start: float,
+        end: float,
+        settings: dict[str, Any] | None = None,
+    ) -> None:
+        """Initialize the campaign of the clusters taking part in events."""
+        self.clusters = sorted(
+            (cluster for cluster in clusters if cluster.dr_enabled),
+            key=lambda cluster: cluster.DR_PRIORITY,
+        )
+        self.start = start
+        self.end = end
+        self.settings = settings or {}
+        self.results: dict[str, dict] = {}
+
+    @classmethod
+    def from_application(
+        cls,
+        application,
+        start: float,
+        end: float,
+        settings: dict[str, Any] | None = None,
+    ) -> "DemandResponseCampaign":
+        """Return the campaign of every device of the network."""
+        return cls(
+            (
+                cluster
+                for device in application.devices.values()
+                for endpoint_id, endpoint in device.endpoints.items()
+                if endpoint_id
+                for cluster in endpoint.in_clusters.values()
+                if isinstance(cluster, DemandResponseMixin)
+            ),
+            start,
+            end,
+            settings,
+        )
+
+    async def run(self) -> None:
+        """Apply the event ahead of the peak window and restore it at the end."""
+        await asyncio.sleep(max(self.start - DR_LEAD_TIME - time.time(), 0))
+        await self.apply()
+        await asyncio.sleep(max(self.end - time.time(), 0))
+        await self.restore()
+
+    async def apply(self) -> dict[str, dict]:
+        """Write the settings of the event to every device."""
+        return await self._rollout(lambda cluster: cluster.dr_apply(self.settings))
+
+    async def restore(self) -> dict[str, dict]:
+        """Write back the values every device had before the event."""
+        return await self._rollout(lambda cluster: cluster.dr_restore())
+
+    async def _rollout(self, step) -> dict[str, dict]:
+        async def staggered(index: int, cluster):
+            await asyncio.sleep(index * DR_STAGGER)
+            try:
+                return await step(cluster)
+            except Exception as e:
+                cluster.warning("Demand response failed: %s", e)
+                return {"confirmed": [], "failed": [], "error": str(e)}
+
+        results = await asyncio.gather(
+            *(staggered(index, cluster) for index, cluster in enumerate(self.clusters))
+        )
+        self.results = {
+            f"{cluster.endpoint.device.ieee}:{cluster.endpoint.endpoint_id}": result
+            for cluster, result in zip(self.clusters, results)
+        }
+        return self.results
+
+
+class _Load:
+    """Entry of a device in the load table."""
+
+    __slots__ = ("key", "watts", "drawing", "actuator", "shed", "since")
+
+    def __init__(self, key, actuator) -> None:
+        """Initialize a device that is not shed."""
+        self.key = key
+        self.watts: int | None = None
+        self.drawing: bool | None = None
+        self.actuator = actuator
+        self.shed = False
+        self.since = 0.0
+
+    @property
+    def load(self) -> int:
+        """Return the load in W, the full connected load unless known to be off."""
+        if self.shed or not self.watts or self.drawing is False:
+            return 0
+        return self.watts
+
+
+class LoadManager:
+    """Keep the total load of a site under a ceiling by shedding devices in turn.
+
+    The load table is fed by the current and connected load reports of the devices.
+    Devices are kept in two queues, those on ordered by the time they were turned
+    on and those shed ordered by the time they were shed, so every tick takes a
+    single pass over the devices: the devices shed the longest are turned back on
+    first and the devices on the longest are shed first. In simulate mode the
+    decisions are only recorded in history, no device is switched.
+    """
+
+    def __init__(self, simulate: bool = False) -> None:
+        """Initialize an empty load table without ceiling."""
+        self.simulate = simulate
+        self.ceiling: float | None = None
+        self.history: deque = deque(maxlen=LOAD_HISTORY)
+        self._entries: dict[Any, _Load] = {}
+        self._on: deque[_Load] = deque()
+        self._shed: deque[_Load] = deque()
+        self._task: asyncio.Task | None = None
+
+    @property
+    def load(self) -> int:
+        """Return the current load of the site in W."""
+        return sum(entry.load for entry in self._on)
+
+    @property
+    def table(self) -> dict[Any, dict[str, Any]]:
+        """Return the load table keyed by device."""
+        return {
+            key: {"watts": entry.watts, "drawing": entry.drawing, "shed": entry.shed}
+            for key, entry in self._entries.items()
+        }
+
+    def update(self, key, watts=None, drawing=None, actuator=None) -> None:
+        """Update the connected load in W and the on state of a device.
+
+        actuator is the coroutine function called with True to shed the device and
+        False to turn it back on.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._entries[key] = _Load(key, actuator)
+            self._on.append(entry)
+        if watts is not None:
+            entry.watts = watts
+        if drawing is not None:
+            entry.drawing = drawing
+
+    def tick(self, now: float) -> list[tuple[_Load, bool]]:
+        """Decide the devices to shed and to turn back on, True when shed."""
+        if self.ceiling is None:
+            return []
+        ceiling = self.ceiling * 1000
+        load = self.load
+        changed: dict[_Load, bool] = {}
+
+        while self._shed:
+            entry = self._shed[0]
+            if now - entry.since < LOAD_ROTATION and load + (
+                entry.watts or 0
+            ) > ceiling * (1 - LOAD_MARGIN):
+                break
+            self._shed.popleft()
+            entry.shed, entry.since, entry.drawing = False, now, None
+            self._on.append(entry)
+            load += entry.load
+            changed[entry] = not changed.pop(entry, False)
+
+        for _ in range(len(self._on)):
+            if load <= ceiling:
+                break
+            entry = self._on.popleft()
+            if not entry.load:
+                self._on.append(entry)  # shedding it would not lower the load
+                continue
+            load -= entry.load
+            entry.shed, entry.since = True, now
+            self._shed.append(entry)
+            changed[entry] = not changed.pop(entry, False)
+
+        # a device turned back on then shed again in the same tick did not change
+        changes = [(entry, entry.shed) for entry, flip in changed.items() if flip]
+        for entry, shed in changes:
+            self.history.append((time.time(), entry.key, shed, load))
+        return changes
+
+    async def apply(self, changes: list[tuple[_Load, bool]]) -> None:
+        """Switch the devices, and put back in their queue those that failed."""
+        if self.simulate:
+            return
+        results = await asyncio.gather(
+            *(entry.actuator(shed) for entry, shed in changes if entry.actuator),
+            return_exceptions=True,
+        )
+        changes = [(entry, shed) for entry, shed in changes if entry.actuator]
+        for (entry, shed), result in zip(changes, results):
+            if not isinstance(result, Exception):
+                continue
+            _LOGGER.warning("Load shedding of %s failed: %s", entry.key, result)
+            (self._shed if shed else self._on).remove(entry)
+            entry.shed = not shed
+            (self._shed if entry.shed else self._on).append(entry)
+
+    def start(self, ceiling: float) -> None:
+        """Enforce a ceiling in kW on the total load of the site."""
+        self.ceiling = ceiling
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop enforcing the ceiling and turn every shed device back on."""
+        self.ceiling = None
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        changes = []
+        while self._shed:
+            entry = self._shed.popleft()
+            entry.shed, entry.drawing = False, None
+            self._on.append(entry)
+            changes.append((entry, False))
+        await self.apply(changes)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(LOAD_TICK)
+            await self.apply(self.tick(time.monotonic()))
+
+
+LOAD_MANAGER = LoadManager()
+
+
+class LoadHoldMixin(abc.ABC):
+    """Switch the load of the device off while LOAD_MANAGER or COLD_LOAD hold it.
+
+    Each manager holds the load for its own reason. The load is turned off by the
+    first hold and back on once every hold is released, so a manager never turns
+    back on a load another one still holds off. The holds are kept in the store,
+    after a restart those no manager resumes are released. Subclasses switch the
+    load in load_shed.
+    """
+
+    def __init__(self, *args, **kwargs):
+        """Initialize the holds, the saved ones are recovered on first use."""
+        super().__init__(*args, **kwargs)
+        self.load_holds: set[str] = set()
+        self._load_holds_recovery: asyncio.Task | None = None
+
+    @abc.abstractmethod
+    async def load_shed(self, shed: bool) -> None:
+        """Turn the load off when shed and back on when not."""
+
+    async def hold_load(self, reason: str, hold: bool) -> None:
+        """Hold the load off for a reason, or release that hold."""
+        holding = bool(self.load_holds)
+        (self.load_holds.add if hold else self.load_holds.discard)(reason)
+        try:
+            if bool(self.load_holds) != holding:
+                await self.load_shed(hold)
+        except Exception:
+            (self.load_holds.discard if hold else self.load_holds.add)(reason)
+            raise
+        (await self.load_state())["holds"] = sorted(self.load_holds)
+        await self.save_load_state()
+
+    async def load_state(self) -> dict:
+        """Return the load control state of the endpoint kept in the store."""
+        doc = await STORE.async_device(self.endpoint.device)
+        return doc.setdefault("load", {}).setdefault(str(self.endpoint.endpoint_id), {})
+
+    async def save_load_state(self) -> None:
+        """Save the load control state."""
+        await STORE.async_save()
+
+    def _recover_load_holds(self) -> None:
+        """Recover the holds saved before a restart, once."""
+        if self._load_holds_recovery is None:
+            self._load_holds_recovery = self.endpoint.device.create_task(
+                self._load_saved_holds()
+            )
+
+    async def _load_saved_holds(self) -> None:
+        saved = (await self.load_state()).get("holds", [])
+        for reason in set(saved) - self.load_holds:
+            self.load_holds.add(reason)
+            await self._resume_load_hold(reason)
+
+    async def _resume_load_hold(self, reason: str) -> None:
+        """Release a hold of a manager that does not resume it after a restart."""
+        self.debug("Releasing the %s hold kept before the restart", reason)
+        try:
+            await self.hold_load(reason, False)
+        except Exception as e:
+            self.warning("Releasing the %s hold failed: %s", reason, e)
+
+
+class LoadSheddingMixin(LoadHoldMixin):
+    """Feed the load of the device to LOAD_MANAGER and let it shed the device.
+
+    LOAD_CONNECTED is the attribute of the connected load in W and LOAD_CURRENT the
+    attribute that is non zero while the load is on. Only the models in LOAD_MODELS
+    are managed, or all of them when it is None. LOAD_MANAGER starts with no device
+    shed, so a shed hold kept over a restart is released.
+    """
+
+    LOAD_HOLD = "load_shed"
+    LOAD_CONNECTED: int | None = None
+    LOAD_CURRENT = 0x0070  # current_load
+    LOAD_MODELS: frozenset[str] | None = None
+
+    def __init__(self, *args, **kwargs):
+        """Initialize the read of the connected load."""
+        super().__init__(*args, **kwargs)
+        self._load_read: asyncio.Task | None = None
+
+    def _update_attribute(self, attrid, value):
+        super()._update_attribute(attrid, value)
+        if attrid not in (self.LOAD_CONNECTED, self.LOAD_CURRENT) or value is None:
+            return
+        device = self.endpoint.device
+        if self.LOAD_MODELS is not None and device.model not in self.LOAD_MODELS:
+            return
+
+        self._recover_load_holds()
+        watts = self.get(self.LOAD_CONNECTED)
+        current = self.get(self.LOAD_CURRENT)
+        LOAD_MANAGER.update(
+            (str(device.ieee), self.endpoint.endpoint_id),
+            watts=watts,
+            drawing=None if current is None else bool(current),
+            actuator=self._load_shed,
+        )
+        if watts is None and self._load_read is None:
+            self._load_read = asyncio.create_task(
+                self.read_attributes([self.LOAD_CONNECTED])
+            )
+
+    async def _load_shed(self, shed: bool) -> None:
+        await self.hold_load(self.LOAD_HOLD, shed)
+        self.listener_event(ZHA_SEND_EVENT, "load_shed", {"shed": shed})
+
+
+class ColdLoadRestore:
+    """Bring the loads back on in randomized waves after an outage.
+
+    Every load that was on turns back on when the power comes back, the inrush and
+    the commands of a whole neighbourhood at once. Loads reporting cold load pickup
+    are held off as their reports come in, within the network concurrency limit,
+    and a single task turns them back on in waves picked at random, among the loads
+    whose own pickup delay is over. A load that reports a fault is turned back on
+    right away, so that the device handles it.
+    """
+
+    def __init__(
+        self,
+        wave_size: int = RESTORE_WAVE_SIZE,
+        interval: float = RESTORE_WAVE_INTERVAL,
+    ) -> None:
+        """Initialize an orchestrator without outage."""
+        self.wave_size = wave_size
+        self.interval = interval
+        self.counts = {"held": 0, "restored": 0, "failed": 0, "faulted": 0}
+        self.started: float | None = None
+        self._pending: dict[Any, tuple[Any, asyncio.Task]] = {}
+        self._ready: dict[Any, float] = {}
+        self._faulted: set[asyncio.Task] = set()
+        self._task: asyncio.Task | None = None
+
+    @property
+    def progress(self) -> dict[str, Any]:
+        """Return the restore progress of the current or last outage."""
+        pending = len(self._pending)
+        now = time.monotonic()
+        return {
+            **self.counts,
+            "pending": pending,
+            "elapsed": None if self.started is None else now - self.started,
+            "remaining": max(
+                math.ceil(pending / self.wave_size) * self.interval,
+                *(ready - now for ready in self._ready.values()),
+                0,
+            ),
+        }
+
+    def hold(self, key, actuator, application, delay: float = 0) -> None:
+        """Hold a load off until its wave, actuator(False) turns it back on.
+
+        The load is not turned back on before delay seconds, the time left to its
+        own cold load pickup.
+        """
+        if key in self._pending:
+            return
+        if self._task is None:
+            self.counts = dict.fromkeys(self.counts, 0)
+            self.started = time.monotonic()
+            self._task = asyncio.create_task(self._run())
+        limit = _limit(_NETWORK_LIMITS, application, REPORTING_NETWORK_CONCURRENCY)
+        self._pending[key] = (
+            actuator,
+            asyncio.create_task(self._send(key, actuator, True, limit)),
+        )
+        self.postpone(key, delay)
+        self.counts["held"] += 1
+
+    def postpone(self, key, delay: float) -> None:
+        """Leave a held load off for at least delay more seconds."""
+        if key not in self._pending:
+            return
+        if delay > 0:
+            self._ready[key] = time.monotonic() + delay
+        else:
+            self._ready.pop(key, None)
+
+    def fault(self, key) -> bool:
+        """Turn a held load that reported a fault back on, out of its wave."""
+        pending = self._pending.pop(key, None)
+        self._ready.pop(key, None)
+        if pending is None:
+            return False
+        _LOGGER.warning("Releasing %s out of its wave, it reported a fault", key)
+        self.counts["faulted"] += 1
+        task = asyncio.create_task(self._restore(key, *pending, spread=0))
+        self._faulted.add(task)
+        task.add_done_callback(self._faulted.discard)
+        return True
+
+    async def _run(self) -> None:
+        try:
+            while self._pending:
+                start = time.monotonic()
+                ready = [
+                    key for key in self._pending if self._ready.get(key, 0) <= start
+                ]
+                if not ready:
+                    await asyncio.sleep(min(self._ready.values()) - start)
+                    continue
+                wave = random.sample(ready, min(self.wave_size, len(ready)))
+                for key in wave:
+                    self._ready.pop(key, None)
+                await asyncio.gather(
+                    *(self._restore(key, *self._pending.pop(key)) for key in wave)
+                )
+                await asyncio.sleep(max(start + self.interval - time.monotonic(), 0))
+        finally:
+            self._task = None
+
+    async def _restore(
+        self, key, actuator, held: asyncio.Task, spread: float | None = None
+    ) -> None:
+        if spread is None:
+            spread = self.interval
+        await asyncio.sleep(random.uniform(0, spread))
+        if not await held:
+            self.counts["failed"] += 1
+            return
+        await self._send(key, actuator, False, None)
+
+    async def _send(self, key, actuator, hold: bool, limit) -> bool:
+        try:
+            if limit is None:
+                await actuator(hold)
+            else:
+                async with limit:
+                    await actuator(hold)
+        except Exception as e:
+            _LOGGER.warning("Cold load pickup of %s failed: %s", key, e)
+            if not hold:
+                self.counts["failed"] += 1
+            return False
+        if not hold:
+            self.counts["restored"] += 1
+        return True
+
+
+COLD_LOAD = ColdLoadRestore()
+
+
+class ColdLoadRestoreMixin(LoadHoldMixin):
+    """Let COLD_LOAD restore the load of the device after an outage.
+
+    The load is held when COLD_LOAD_STATUS reports cold load pickup active and it
+    was on before the outage, for at least the COLD_LOAD_REMAINING seconds of its
+    own pickup. It is released as soon as DEVICE_STATUS reports one of the
+    COLD_LOAD_FAULTS bits, and not held while it does. Only the models in
+    COLD_LOAD_MODELS take part, a hold kept over a restart waits for a wave again.
+    """
+
+    COLD_LOAD_HOLD = "cold_load"
+    COLD_LOAD_STATUS = 0x0283  # cold_load_pickup_status
+    COLD_LOAD_REMAINING = 0x0284  # cold_load_pickup_remaining_time
+    COLD_LOAD_ACTIVE = 0x00
+    DEVICE_STATUS = 0x0200  # dev_status
+    COLD_LOAD_FAULTS = 0
+    COLD_LOAD_MODELS: frozenset[str] = frozenset()
+
+    def _update_attribute(self, attrid, value):
+        super()._update_attribute(attrid, value)
+        if value is None or attrid not in (
+            self.COLD_LOAD_STATUS,
+            self.COLD_LOAD_REMAINING,
+            self.DEVICE_STATUS,
+        ):
+            return
+        device = self.endpoint.device
+        if device.model not in self.COLD_LOAD_MODELS:
+            return
+
+        self._recover_load_holds()
+        key = (str(device.ieee), self.endpoint.endpoint_id)
+        if attrid == self.DEVICE_STATUS:
+            if value & self.COLD_LOAD_FAULTS and COLD_LOAD.fault(key):
+                self.listener_event(
+                    ZHA_SEND_EVENT, "cold_load_fault", {"dev_status": int(value)}
+                )
+            return
+        if attrid == self.COLD_LOAD_REMAINING:
+            COLD_LOAD.postpone(key, value)
+            return
+        on_off = self.endpoint.in_clusters.get(OnOff.cluster_id)
+        was_on = (
+            on_off is None or on_off.get(OnOff.AttributeDefs.on_off.id) is not False
+        )
+        if value == self.COLD_LOAD_ACTIVE and was_on and not self._cold_load_fault():
+            COLD_LOAD.hold(key, self._cold_load_hold, device.application)
+            device.create_task(self._read_cold_load_remaining())
+
+    async def _read_cold_load_remaining(self) -> None:
+        """Read the time left to the pickup of the device, to postpone its wave."""
+        try:
+            await self.read_attributes([self.COLD_LOAD_REMAINING])
+        except Exception as e:
+            self.debug("Reading the cold load pickup remaining time failed: %s", e)
+
+    def _cold_load_fault(self) -> bool:
+        return bool((self.get(self.DEVICE_STATUS) or 0) & self.COLD_LOAD_FAULTS)
+
+    async def _resume_load_hold(self, reason: str) -> None:
+        if reason != self.COLD_LOAD_HOLD or self._cold_load_fault():
+            await super()._resume_load_hold(reason)
+            return
+        device = self.endpoint.device
+        self.debug("Resuming the cold load hold kept before the restart")
+        COLD_LOAD.hold(
+            (str(device.ieee), self.endpoint.endpoint_id),
+            self._cold_load_hold,
+            device.application,
+        )
+
+    async def _cold_load_hold(self, hold: bool) -> None:
+        await self.hold_load(self.COLD_LOAD_HOLD, hold)
+        self.listener_event(ZHA_SEND_EVENT, "cold_load_pickup", {"held": hold})
+
+
+class ValueConverter:
+    """Render attribute values with names precomputed at import time.
+
+    The names come from a mapping of values or from the constants of a zigpy type
+    such as DeviceStatus. Unknown values are rendered as Unmapped(value) once and
+    cached.
+
+    Bitmap values are split into flags instead, so that the number of distinct
+    states stays bounded: the known bits are rendered with the name of their
+    combination or the names of their flags joined by "|", and any unknown bits
+    add a single UNKNOWN_FLAG.
+    """
+
+    UNKNOWN_FLAG = "Other"
+
+    def __init__(self, values: dict[int, str] | type, *, bitmap: bool = False):
+        """Precompute the names of the values."""
+        if isinstance(values, dict):
+            self.names = dict(values)
+        else:
+            members = getattr(values, "__members__", None)
+            if members is None:
+                # skip the limits zigpy sets on every subclass of its int types
+                inherited = set(dir(values.__base__))
+                members = {
+                    name: value
+                    for name, value in vars(values).items()
+                    if not name.startswith("_")
+                    and name not in inherited
+                    and isinstance(value, int)
+                }
+            self.names = {}
+            for name, value in members.items():
+                self.names.setdefault(int(value), name)
+
+        self.bitmap = bitmap
+        self.bits = tuple(
+            (value, name)
+            for value, name in self.names.items()
+            if bitmap and value and not value & (value - 1)
+        )
+        self.mask = sum(bit for bit, _ in self.bits)
+        self._unmapped: dict[int, str] = {}
+
+    def __call__(self, value) -> str | None:
+        """Return the name of an attribute value."""
+        if value is None:
+            return None
+        try:
+            return self.names[value]
+        except KeyError:
+            pass
+        try:
+            return self._unmapped[value]
+        except KeyError:
+            pass
+
+        value = int(value)
+        if self.bitmap:
+            known = value & self.mask
+            if known in self.names and known:
+                flags = [self.names[known]]
+            else:
+                flags = self.flags(known)
+            if value & ~self.mask:
+                flags.append(self.UNKNOWN_FLAG)
+            name = "|".join(flags)
+        else:
+            name = f"Unmapped({value})"
+        if len(self._unmapped) < CONVERTER_CACHE_SIZE:
+            self._unmapped[value] = name
+        return name
+
+    def flags(self, value: int) -> list[str]:
+        """Return the names of the known single bit flags set in a bitmap value."""
+        return [name for bit, name in self.bits if value & bit]
+
+    def flag_converter(self, name: str):
+        """Return a converter telling if a flag is set, for binary sensors."""
+        bit = next(bit for bit, flag in self.bits if flag == name)
+
+        def converter(value) -> bool | None:
+            if value is None:
+                return None
+            return bool(int(value) & bit)
+
+        return converter
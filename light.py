@@ -4,20 +4,30 @@ Supported devices SW2500ZB, SW2500ZB-G2 dimmer DM2500ZB, DM2500ZB-G2, DM2550ZB,
 DM2550ZB-G2.
 """
 
+import asyncio
 import logging
-from typing import Any, Final, Optional, Union
+import time
+from typing import (Any, Awaitable, Callable, Final, NamedTuple, Optional,
+                    Union)
 
 import zigpy.profiles.zha as zha_p
 import zigpy.types as t
 from zhaquirks import EventableCluster
-from zhaquirks.const import (ATTRIBUTE_ID, ATTRIBUTE_NAME, BUTTON,
-                             COMMAND_M_INITIAL_PRESS, COMMAND_M_LONG_RELEASE,
+from zhaquirks.const import (ARGS, ATTRIBUTE_ID, ATTRIBUTE_NAME, BUTTON,
+                             CLUSTER_ID, COMMAND, COMMAND_M_INITIAL_PRESS,
+                             COMMAND_M_LONG_PRESS, COMMAND_M_LONG_RELEASE,
                              COMMAND_M_MULTI_PRESS_COMPLETE,
-                             COMMAND_M_SHORT_RELEASE, DESCRIPTION, TURN_OFF,
-                             TURN_ON, VALUE, ZHA_SEND_EVENT)
+                             COMMAND_M_SHORT_RELEASE, COMMAND_QUAD,
+                             COMMAND_TRIPLE, DESCRIPTION, DIM_DOWN, DIM_UP,
+                             ENDPOINT_ID, QUADRUPLE_PRESS, SHORT_PRESS,
+                             TRIPLE_PRESS, TURN_OFF, TURN_ON, VALUE,
+                             ZHA_SEND_EVENT)
 from zhaquirks.sinope import (ATTRIBUTE_ACTION, LIGHT_DEVICE_TRIGGERS, SINOPE,
                               SINOPE_MANUFACTURER_CLUSTER_ID, ButtonAction,
                               CustomDeviceTemperatureCluster)
+from zhaquirks.sinope._sinope_common import (AttributeSnapshotMixin,
+                                             EnergyAccumulatorMixin,
+                                             SinopeReportingMixin, Volatility)
 from zigpy.quirks import CustomCluster
 from zigpy.quirks.v2 import QuirkBuilder, SensorDeviceClass, SensorStateClass
 from zigpy.quirks.v2.homeassistant import UnitOfEnergy, UnitOfTime
@@ -26,34 +36,16 @@ from zigpy.zcl.foundation import (ZCL_CLUSTER_REVISION_ATTR, BaseAttributeDefs,
                                   ZCLAttributeDef, ZCLCommandDef, ZCLHeader)
 
 
-class ManufacturerReportingMixin:
-    """Mixin to configure the attributes reporting in manufacturer cluster."""
-
-    MANUFACTURER_REPORTING = {
-        # attribut_id: (min_interval, max_interval, reportable_change)
-        0x0054: (0, 0, 1),  # action_report
-        0x0058: (0, 0, 1),  # double_up_full
-        0x0090: (3, 602, 1),  # current_summation_delivered
-        0x0200: (60, 43688, 1),  # status
-        # ... add other attributes
-    }
-
-    async def configure_reporting_all(self):
-        """Configure reporting of all configured attributes."""
-        for attr_id, (min_i, max_i, change) in self.MANUFACTURER_REPORTING.items():
-            try:
-                await self.configure_reporting(
-                    attribute=attr_id,
-                    min_interval=min_i,
-                    max_interval=max_i,
-                    reportable_change=change,
-                )
-                self.debug(f"Reporting configured for attr {hex(attr_id)}")
-            except Exception as e:
-                self.debug(f"Reporting configuration fail for attr {hex(attr_id)}: {e}")
+_LOGGER = logging.getLogger(__name__)
+# logger of the Cluster debug method
+_ZCL_LOGGER = logging.getLogger("zigpy.zcl")
 
+# Called with the cluster, the command and the latency in seconds from the receipt
+# of the frame to the event of each button action.
+ACTION_LATENCY_HOOK: Callable[[CustomCluster, str, float], None] | None = None
 
-_LOGGER = logging.getLogger(__name__)
+BOTH_BUTTONS = "both_buttons"
+COMMAND_CHORD = "chord"
 
 
 class KeypadLock(t.enum8):
@@ -97,7 +89,233 @@ class SinopeLightLedColors(t.enum32):
     Red = 0xFF0000
 
 
-class SinopeTechnologiesManufacturerCluster(ManufacturerReportingMixin, CustomCluster):
+# Event fired for each button action, action value: (command, event arguments)
+ACTION_EVENTS = {
+    action.value: (
+        command,
+        {
+            ATTRIBUTE_ID: 0x0054,
+            ATTRIBUTE_NAME: ATTRIBUTE_ACTION,
+            BUTTON: button,
+            DESCRIPTION: action.name,
+            VALUE: action.value,
+        },
+    )
+    for action, command, button in (
+        (ButtonAction.Pressed_off, COMMAND_M_INITIAL_PRESS, TURN_OFF),
+        (ButtonAction.Pressed_on, COMMAND_M_INITIAL_PRESS, TURN_ON),
+        (ButtonAction.Released_off, COMMAND_M_SHORT_RELEASE, TURN_OFF),
+        (ButtonAction.Released_on, COMMAND_M_SHORT_RELEASE, TURN_ON),
+        (ButtonAction.Double_off, COMMAND_M_MULTI_PRESS_COMPLETE, TURN_OFF),
+        (ButtonAction.Double_on, COMMAND_M_MULTI_PRESS_COMPLETE, TURN_ON),
+        (ButtonAction.Long_off, COMMAND_M_LONG_RELEASE, TURN_OFF),
+        (ButtonAction.Long_on, COMMAND_M_LONG_RELEASE, TURN_ON),
+    )
+}
+
+
+# Gesture step of each button action, action value: (step, button)
+ACTION_GESTURES = {
+    ButtonAction.Pressed_on.value: ("press", TURN_ON),
+    ButtonAction.Pressed_off.value: ("press", TURN_OFF),
+    ButtonAction.Double_on.value: ("double", TURN_ON),
+    ButtonAction.Double_off.value: ("double", TURN_OFF),
+    ButtonAction.Released_on.value: ("release", TURN_ON),
+    ButtonAction.Released_off.value: ("release", TURN_OFF),
+    ButtonAction.Long_on.value: ("release", TURN_ON),
+    ButtonAction.Long_off.value: ("release", TURN_OFF),
+}
+
+
+class GestureTiming(NamedTuple):
+    """Timing windows of the gestures, in seconds."""
+
+    multi_window: float = 0.6  # from a release to the next press of a multi press
+    hold_delay: float = 0.5  # from a press to the first repeat of a hold
+    repeat_interval: float = 0.25  # between the repeats of a hold
+    max_repeats: int = 40  # repeats sent if the release is lost
+    chord_window: float = 0.3  # between the presses of both buttons
+
+
+GESTURE_TIMING = GestureTiming()
+
+
+class GestureRecognizer:
+    """Recognize multi presses, holds and chords from the button actions.
+
+    The device only reports single, double and long presses. A triple or quadruple
+    press is sent when no press follows the last release within multi_window, a
+    button held past hold_delay sends a long_press with a repeat count every
+    repeat_interval until released, and both buttons pressed within chord_window
+    send a chord. Every action is a constant time step with a single pending timer.
+
+    The device reports no frame while a button is held, so a release delayed past
+    hold_delay looks like a hold. When still_pressed is given, it is awaited with
+    the button before the first repeat, and the hold is only repeated if it
+    returns True.
+    """
+
+    def __init__(
+        self,
+        emit: Callable[[str, dict], None],
+        timing=None,
+        still_pressed: Callable[[str], Awaitable[bool]] | None = None,
+    ) -> None:
+        """Initialize the recognizer sending its events with emit."""
+        self.emit = emit
+        self.timing = timing or GESTURE_TIMING
+        self.still_pressed = still_pressed
+        self._button: str | None = None
+        self._presses = 0
+        self._repeats = 0
+        self._pressed: dict[str, float] = {}
+        self._chord = False
+        self._timer: asyncio.TimerHandle | None = None
+        self._check: asyncio.Task | None = None
+
+    def action(self, value: int) -> None:
+        """Advance the recognizer with a reported action."""
+        step = ACTION_GESTURES.get(value)
+        if step is None:
+            return
+        kind, button = step
+        now = time.monotonic()
+        if kind == "press":
+            self._press(button, now)
+        elif kind == "double":
+            if self._button != button:
+                self._finish()
+                self._button = button
+            self._presses = max(self._presses, 2)
+            if button not in self._pressed:
+                self._schedule(self.timing.multi_window, self._finish)
+        else:
+            self._release(button)
+
+    def _press(self, button: str, now: float) -> None:
+        other = TURN_OFF if button == TURN_ON else TURN_ON
+        if now - self._pressed.get(other, -self.timing.chord_window) <= (
+            self.timing.chord_window
+        ):
+            self._cancel()
+            self._button, self._presses, self._chord = None, 0, True
+            self._pressed[button] = now
+            self.emit(COMMAND_CHORD, {BUTTON: BOTH_BUTTONS})
+            return
+
+        if self._button != button or self._timer is None or self._repeats:
+            self._finish()
+            self._button = button
+        self._presses += 1
+        self._pressed[button] = now
+        self._schedule(self.timing.hold_delay, self._hold)
+
+    def _release(self, button: str) -> None:
+        self._pressed.pop(button, None)
+        if self._chord:
+            self._chord = bool(self._pressed)  # until both buttons are released
+            return
+        if button != self._button:
+            return
+        if self._repeats:
+            self._cancel()
+            self._button, self._presses, self._repeats = None, 0, 0
+            return
+        self._schedule(self.timing.multi_window, self._finish)
+
+    def _hold(self) -> None:
+        self._timer = None
+        if self.still_pressed is None:
+            self._repeat()
+        elif self._button in self._pressed:
+            self._check = asyncio.create_task(self._check_hold(self._button))
+
+    async def _check_hold(self, button: str) -> None:
+        """Repeat the hold once the press is confirmed, any other action cancels."""
+        try:
+            pressed = await self.still_pressed(button)
+        except Exception:
+            pressed = False
+        self._check = None
+        if pressed:
+            self._repeat()
+
+    def _repeat(self) -> None:
+        self._timer = None
+        if self._button not in self._pressed or self._repeats >= (
+            self.timing.max_repeats
+        ):
+            return
+        self._repeats += 1
+        self._schedule(self.timing.repeat_interval, self._repeat)
+        self.emit(COMMAND_M_LONG_PRESS, {BUTTON: self._button, "repeat": self._repeats})
+
+    def _finish(self) -> None:
+        """Send the multi press ended by the window or by another gesture."""
+        self._cancel()
+        button, presses = self._button, self._presses
+        self._button, self._presses, self._repeats = None, 0, 0
+        if presses >= 3 and not self._chord:
+            self.emit(
+                COMMAND_TRIPLE if presses == 3 else COMMAND_QUAD,
+                {BUTTON: button, "press_count": presses},
+            )
+
+    def _schedule(self, delay: float, callback) -> None:
+        self._cancel()
+        self._timer = asyncio.get_running_loop().call_later(delay, callback)
+
+    def _cancel(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._check is not None:
+            self._check.cancel()
+            self._check = None
+
+
+class ActionLatencyStats:
+    """Latency from the receipt of a button action frame to its event."""
+
+    def __init__(self) -> None:
+        """Initialize the counters."""
+        self.actions = 0
+        self.last_latency: float | None = None
+        self.max_latency = 0.0
+        self.total_latency = 0.0
+
+    def record(self, latency: float) -> None:
+        """Record the latency of one action."""
+        self.actions += 1
+        self.last_latency = latency
+        self.max_latency = max(self.max_latency, latency)
+        self.total_latency += latency
+
+    @property
+    def mean_latency(self) -> float | None:
+        """Return the mean latency."""
+        return self.total_latency / self.actions if self.actions else None
+
+    def as_dict(self) -> dict:
+        """Return the statistics as event arguments."""
+        return {
+            "actions": self.actions,
+            "last_latency": self.last_latency,
+            "max_latency": self.max_latency,
+            "mean_latency": self.mean_latency,
+        }
+
+    def __repr__(self) -> str:
+        """Return a short representation for the logs."""
+        return (
+            f"<{type(self).__name__} actions={self.actions}"
+            f" last_latency={self.last_latency}>"
+        )
+
+
+class SinopeTechnologiesManufacturerCluster(
+    AttributeSnapshotMixin, SinopeReportingMixin, CustomCluster
+):
     """SinopeTechnologiesManufacturerCluster manufacturer cluster."""
 
     KeypadLock: Final = KeypadLock
@@ -110,6 +328,39 @@ class SinopeTechnologiesManufacturerCluster(ManufacturerReportingMixin, CustomCl
     name: Final = "SinopeTechnologiesManufacturerCluster"
     ep_attribute: Final = "sinope_manufacturer_specific"
 
+    MANUFACTURER_REPORTING = {
+        # attribut_id: (min_interval, max_interval, reportable_change)
+        0x0054: (0, 0, 1),  # action_report
+        0x0058: (0, 0, 1),  # double_up_full
+        0x0090: (3, 602, 1),  # current_summation_delivered
+        0x0200: (60, 43688, 1),  # status
+        # ... add other attributes
+    }
+    REPORTING_PROFILES = {
+        # model: attributes of MANUFACTURER_REPORTING supported by the device
+        "SW2500ZB": (0x0054, 0x0090, 0x0200),
+        "SW2500ZB-G2": (0x0054, 0x0090, 0x0200),
+        "DM2500ZB": (0x0054, 0x0058, 0x0090, 0x0200),
+        "DM2500ZB-G2": (0x0054, 0x0058, 0x0090, 0x0200),
+        "DM2550ZB": (0x0054, 0x0058, 0x0200),
+        "DM2550ZB-G2": (0x0054, 0x0058, 0x0200),
+    }
+    ATTRIBUTE_VOLATILITY = {
+        # attribut_id: volatility, attributes not listed are telemetry
+        0x0003: Volatility.STATIC,  # firmware_number
+        0x0004: Volatility.STATIC,  # firmware_version
+        0x0002: Volatility.CONFIG,  # keypad_lockout
+        0x0050: Volatility.CONFIG,  # on_led_color
+        0x0051: Volatility.CONFIG,  # off_led_color
+        0x0052: Volatility.CONFIG,  # on_led_intensity
+        0x0053: Volatility.CONFIG,  # off_led_intensity
+        0x0055: Volatility.CONFIG,  # min_intensity
+        0x0056: Volatility.CONFIG,  # phase_control
+        0x0058: Volatility.CONFIG,  # double_up_full
+        0x00A0: Volatility.CONFIG,  # timer
+        0x0119: Volatility.CONFIG,  # connected_load
+    }
+
     class AttributeDefs(BaseAttributeDefs):
         """Sinope Manufacturer Cluster Attributes."""
 
@@ -178,6 +429,23 @@ class SinopeTechnologiesManufacturerCluster(ManufacturerReportingMixin, CustomCl
         )
         cluster_revision: Final = ZCL_CLUSTER_REVISION_ATTR
 
+    def __init__(self, *args, **kwargs):
+        """Initialize the latency statistics of the button actions."""
+        super().__init__(*args, **kwargs)
+        self.action_stats = ActionLatencyStats()
+        self.gestures = GestureRecognizer(
+            lambda command, event_args: self.listener_event(
+                ZHA_SEND_EVENT, command, event_args
+            ),
+            still_pressed=self._still_pressed,
+        )
+
+    async def _still_pressed(self, button: str) -> bool:
+        """Read the last action back, the device answers after any release."""
+        attr_id = self.AttributeDefs.action_report.id
+        success, _ = await self.read_attributes([attr_id])
+        return ACTION_GESTURES.get(success.get(attr_id)) == ("press", button)
+
     async def bind(self):
         """Bind the cluster and configure reporting."""
         await super().bind()
@@ -201,81 +469,79 @@ class SinopeTechnologiesManufacturerCluster(ManufacturerReportingMixin, CustomCl
             Union[t.Addressing.Group, t.Addressing.IEEE, t.Addressing.NWK]
         ] = None,
     ):
-        """Handle the cluster command."""
-        self.debug(
-            "SINOPE cluster general request: hdr: %s - args: [%s]",
-            hdr,
-            args,
-        )
+        """Handle the cluster command, button actions are sent as events."""
+        debug = _ZCL_LOGGER.isEnabledFor(logging.DEBUG)
+        if debug:
+            self.debug(
+                "SINOPE cluster general request: hdr: %s - args: [%s]",
+                hdr,
+                args,
+            )
 
-        if hdr.command_id != GeneralCommand.Report_Attributes:
+        if (
+            hdr.command_id != GeneralCommand.Report_Attributes
+            or args[0][0].attrid != self.AttributeDefs.action_report.id
+        ):
             return super().handle_cluster_general_request(
                 hdr, args, dst_addressing=dst_addressing
             )
 
-        attr = args[0][0]
+        value = args[0][0].value.value
+        try:
+            command, event_args = ACTION_EVENTS[value]
+        except KeyError:
+            if debug:
+                self.debug("SINOPE unhandled action: %s", value)
+            return
 
-        if attr.attrid != self.AttributeDefs.action_report.id:
-            return super().handle_cluster_general_request(
-                hdr, args, dst_addressing=dst_addressing
+        if debug:
+            self.debug(
+                "SINOPE ZHA_SEND_EVENT command: '%s' event_args: %s",
+                command,
+                event_args,
             )
+        self.listener_event(ZHA_SEND_EVENT, command, dict(event_args))
+
+        received = self.endpoint.device.last_seen
+        if received is not None:
+            latency = time.time() - received
+            self.action_stats.record(latency)
+            if ACTION_LATENCY_HOOK is not None:
+                ACTION_LATENCY_HOOK(self, command, latency)
+        self.gestures.action(value)
+
+
+def _gesture_trigger(command: str, button: str) -> dict:
+    return {
+        ENDPOINT_ID: 1,
+        CLUSTER_ID: SINOPE_MANUFACTURER_CLUSTER_ID,
+        COMMAND: command,
+        ARGS: {BUTTON: button},
+    }
 
-        action = self.Action(attr.value.value)
-
-        command, button = self._get_command_from_action(action)
-        if not command or not button:
-            return
 
-        event_args = {
-            ATTRIBUTE_ID: 84,
-            ATTRIBUTE_NAME: ATTRIBUTE_ACTION,
-            BUTTON: button,
-            DESCRIPTION: action.name,
-            VALUE: action.value,
-        }
+LIGHT_GESTURE_TRIGGERS = {
+    **LIGHT_DEVICE_TRIGGERS,
+    (TRIPLE_PRESS, TURN_ON): _gesture_trigger(COMMAND_TRIPLE, TURN_ON),
+    (TRIPLE_PRESS, TURN_OFF): _gesture_trigger(COMMAND_TRIPLE, TURN_OFF),
+    (QUADRUPLE_PRESS, TURN_ON): _gesture_trigger(COMMAND_QUAD, TURN_ON),
+    (QUADRUPLE_PRESS, TURN_OFF): _gesture_trigger(COMMAND_QUAD, TURN_OFF),
+    (DIM_UP, TURN_ON): _gesture_trigger(COMMAND_M_LONG_PRESS, TURN_ON),
+    (DIM_DOWN, TURN_OFF): _gesture_trigger(COMMAND_M_LONG_PRESS, TURN_OFF),
+    (SHORT_PRESS, BOTH_BUTTONS): _gesture_trigger(COMMAND_CHORD, BOTH_BUTTONS),
+}
 
-        self.debug(
-            "SINOPE ZHA_SEND_EVENT command: '%s' event_args: %s",
-            command,
-            event_args,
-        )
 
-        self.listener_event(ZHA_SEND_EVENT, command, event_args)
-
-    def _get_command_from_action(
-        self, action: ButtonAction
-    ) -> tuple[str | None, str | None]:
-        # const lookup = {1: 'up_single', 2: 'up_single_released', 3: 'up_hold', 4: 'up_double',
-        #             17: 'down_single, 18: 'down_single_released', 19: 'down_hold', 20: 'down_double'};
-        match action:
-            case self.Action.Pressed_off:
-                return COMMAND_M_INITIAL_PRESS, TURN_OFF
-            case self.Action.Pressed_on:
-                return COMMAND_M_INITIAL_PRESS, TURN_ON
-            case self.Action.Released_off:
-                return COMMAND_M_SHORT_RELEASE, TURN_OFF
-            case self.Action.Released_on:
-                return COMMAND_M_SHORT_RELEASE, TURN_ON
-            case self.Action.Double_off:
-                return COMMAND_M_MULTI_PRESS_COMPLETE, TURN_OFF
-            case self.Action.Double_on:
-                return COMMAND_M_MULTI_PRESS_COMPLETE, TURN_ON
-            case self.Action.Long_off:
-                return COMMAND_M_LONG_RELEASE, TURN_OFF
-            case self.Action.Long_on:
-                return COMMAND_M_LONG_RELEASE, TURN_ON
-            case _:
-                self.debug("SINOPE unhandled action: %s", action)
-                return None, None
-
-
-class LightManufacturerCluster(EventableCluster, SinopeTechnologiesManufacturerCluster):
+class LightManufacturerCluster(
+    EnergyAccumulatorMixin, EventableCluster, SinopeTechnologiesManufacturerCluster
+):
     """LightManufacturerCluster: fire events corresponding to press type."""
 
-    def _update_attribute(self, attrid, value):
-        if attrid == self.AttributeDefs.current_summation_delivered.id:
-            value = value / 100
-        super()._update_attribute(attrid, value)
+    ENERGY_COUNTERS = {
+        # attribut_id: divisor
+        0x0090: 100,  # current_summation_delivered
+    }
+    ENERGY_KWH = 1
 
 
 (
@@ -287,7 +553,7 @@ class LightManufacturerCluster(EventableCluster, SinopeTechnologiesManufacturerC
     .replaces_endpoint(1, device_type=zha_p.DeviceType.ON_OFF_LIGHT)
     .replaces(CustomDeviceTemperatureCluster)
     .replaces(LightManufacturerCluster)
-    .device_automation_triggers(LIGHT_DEVICE_TRIGGERS)
+    .device_automation_triggers(LIGHT_GESTURE_TRIGGERS)
     .enum(  # Keypad lock
         attribute_name=LightManufacturerCluster.AttributeDefs.keypad_lockout.name,
         cluster_id=LightManufacturerCluster.cluster_id,
@@ -365,7 +631,7 @@ class LightManufacturerCluster(EventableCluster, SinopeTechnologiesManufacturerC
     .replaces_endpoint(1, device_type=zha_p.DeviceType.DIMMABLE_LIGHT)
     .replaces(CustomDeviceTemperatureCluster)
     .replaces(LightManufacturerCluster)
-    .device_automation_triggers(LIGHT_DEVICE_TRIGGERS)
+    .device_automation_triggers(LIGHT_GESTURE_TRIGGERS)
     .enum(  # Keypad lock
         attribute_name=LightManufacturerCluster.AttributeDefs.keypad_lockout.name,
         cluster_id=LightManufacturerCluster.cluster_id,
@@ -452,7 +718,7 @@ class LightManufacturerCluster(EventableCluster, SinopeTechnologiesManufacturerC
     .replaces_endpoint(1, device_type=zha_p.DeviceType.DIMMABLE_LIGHT)
     .replaces(CustomDeviceTemperatureCluster)
     .replaces(LightManufacturerCluster)
-    .device_automation_triggers(LIGHT_DEVICE_TRIGGERS)
+    .device_automation_triggers(LIGHT_GESTURE_TRIGGERS)
     .enum(  # Keypad lock
         attribute_name=LightManufacturerCluster.AttributeDefs.keypad_lockout.name,
         cluster_id=LightManufacturerCluster.cluster_id,
@@ -10,11 +10,15 @@ import zigpy.profiles.zha as zha_p
 import zigpy.types as t
 from homeassistant.components.number import NumberDeviceClass, NumberMode
 from zhaquirks.sinope import SINOPE, SINOPE_MANUFACTURER_CLUSTER_ID
+from zhaquirks.sinope._sinope_common import (AttributeSnapshotMixin,
+                                             SinopeReportingMixin,
+                                             ValueConverter, Volatility)
 from zhaquirks.sinope.switch import (EnergySource,
                                      SinopeTechnologiesBasicCluster)
 from zigpy.quirks import CustomCluster
-from zigpy.quirks.v2 import (EntityType, QuirkBuilder, ReportingConfig,
-                             SensorDeviceClass, SensorStateClass)
+from zigpy.quirks.v2 import (BinarySensorDeviceClass, EntityType, QuirkBuilder,
+                             ReportingConfig, SensorDeviceClass,
+                             SensorStateClass)
 from zigpy.quirks.v2.homeassistant import (DEGREE, UnitOfElectricPotential,
                                            UnitOfTime)
 from zigpy.zcl.clusters.general import (AnalogInput, PollControl,
@@ -48,75 +52,15 @@ ZONE_MAP = {
     0x003A: "Connector_and_low_bat",  # 58
 }
 
-STATUS_MAP = {
-    0x00000000: "Ok",  # 0
-    0x00000020: "Temp_sensor",  # 32
-}
-
 PROBE_MAP = {
     0x00: "internal probe",  # 0
     0x01: "external probe",  # 1
 }
 
 
-def sensor_status_converter(value):
-    """Convert sensor_status value to name."""
-
-    if value is None:
-        return None
-    return SENSOR_MAP.get(int(value), f"Unmapped({value})")
-
-
-def zone_status_converter(value):
-    """Convert zone_status value to name."""
-
-    if value is None:
-        return None
-    return ZONE_MAP.get(int(value), f"Unmapped({value})")
-
-
-def status_converter(value):
-    """Convert status value to name."""
-
-    if value is None:
-        return None
-    return STATUS_MAP.get(int(value), f"Unmapped({value})")
-
-
-def probe_converter(value):
-    """Convert probe type value to name."""
-
-    if value is None:
-        return None
-    return PROBE_MAP.get(int(value), f"Unmapped({value})")
-
-
-class ManufacturerReportingMixin:
-    """Mixin to configure the attributes reporting in manufacturer cluster."""
-
-    MANUFACTURER_REPORTING = {
-        # attribut_id: (min_interval, max_interval, reportable_change)
-        0x0034: (1, 43495, 1),  # device_status
-        0x0035: (1, 43655, 1),  # sensor_status
-        0x0038: (1, 43655, 1),  # probe_connected
-        0x0039: (0, 65535, 1),  # probe_type
-        0x0200: (10, 0, 1),  # status
-        # ... add other attributes
-    }
-
-    async def configure_reporting_all(self):
-        """Configure reporting of all configured attributes."""
-        for attr_id, (min_i, max_i, change) in self.MANUFACTURER_REPORTING.items():
-            try:
-                await self.configure_reporting(
-                    attribute=attr_id,
-                    min_interval=min_i,
-                    max_interval=max_i,
-                    reportable_change=change,
-                )
-                self.debug(f"Reporting configured for attr {hex(attr_id)}")
-            except Exception as e:
-                self.debug(f"Reporting configuration fail for attr {hex(attr_id)}: {e}")
+sensor_status_converter = ValueConverter(SENSOR_MAP)
+zone_status_converter = ValueConverter(ZONE_MAP)
+probe_converter = ValueConverter(PROBE_MAP)
 
 
 class LeakStatus(t.enum8):
@@ -133,6 +77,9 @@ class DeviceStatus(t.bitmap32):
     Temp_sensor = 0x00000020
 
 
+status_converter = ValueConverter(DeviceStatus, bitmap=True)
+
+
 class ProbeConnect(t.enum8):
     """External probe connected status."""
 
@@ -172,7 +119,9 @@ class BatteryStatus(t.bitmap32):
     Low = 0x00000001
 
 
-class SinopeManufacturerCluster(ManufacturerReportingMixin, CustomCluster):
+class SinopeManufacturerCluster(
+    AttributeSnapshotMixin, SinopeReportingMixin, CustomCluster
+):
     """SinopeManufacturerCluster manufacturer cluster."""
 
     DeviceStatus: Final = DeviceStatus
@@ -183,6 +132,33 @@ class SinopeManufacturerCluster(ManufacturerReportingMixin, CustomCluster):
     name: Final = "SinopeManufacturerCluster"
     ep_attribute: Final = "sinope_manufacturer_specific"
 
+    MANUFACTURER_REPORTING = {
+        # attribut_id: (min_interval, max_interval, reportable_change)
+        0x0034: (1, 43495, 1),  # device_status
+        0x0035: (1, 43655, 1),  # sensor_status
+        0x0038: (1, 43655, 1),  # probe_connected
+        0x0039: (0, 65535, 1),  # probe_type
+        0x0200: (10, 0, 1),  # status
+        # ... add other attributes
+    }
+    REPORTING_PROFILES = {
+        # model: attributes of MANUFACTURER_REPORTING supported by the device
+        "WL4200": (0x0034, 0x0035, 0x0200),
+        "WL4200S": (0x0034, 0x0035, 0x0200),
+        "WL4210": (0x0034, 0x0035, 0x0038, 0x0039, 0x0200),
+        "LM4110-ZB": (0x0034, 0x0200),
+    }
+    BATTERY_MODELS = frozenset({"WL4200", "WL4200S", "WL4210", "LM4110-ZB"})
+    ATTRIBUTE_VOLATILITY = {
+        # attribut_id: volatility, attributes not listed are telemetry
+        0x0003: Volatility.STATIC,  # firmware_number
+        0x0004: Volatility.STATIC,  # firmware_version
+        0x0032: Volatility.CONFIG,  # min_temperature_limit
+        0x0033: Volatility.CONFIG,  # max_temperature_limit
+        0x0036: Volatility.CONFIG,  # battery_type
+        0x0039: Volatility.CONFIG,  # probe_type
+    }
+
     class AttributeDefs(BaseAttributeDefs):
         """Sinope Manufacturer Cluster Attributes."""
 
@@ -463,6 +439,18 @@ class SinopeTechnologiesPowerConfigurationCluster(CustomCluster, PowerConfigurat
         translation_key="status",
         fallback_name="Device status",
     )
+    .binary_sensor(  # Temperature sensor fault
+        attribute_name=SinopeManufacturerCluster.AttributeDefs.status.name,
+        cluster_id=SinopeManufacturerCluster.cluster_id,
+        endpoint_id=1,
+        entity_type=EntityType.DIAGNOSTIC,
+        device_class=BinarySensorDeviceClass.PROBLEM,
+        initially_disabled=True,
+        attribute_converter=status_converter.flag_converter("Temp_sensor"),
+        unique_id_suffix="status_temp_sensor",
+        translation_key="temp_sensor_fault",
+        fallback_name="Temperature sensor fault",
+    )
     .add_to_registry()
 )
 
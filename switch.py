@@ -5,32 +5,52 @@ VA4200WZ, VA4201WZ, VA4200ZB, VA4201ZB, VA4220ZB, VA4221ZB and MC3100ZB,
 2nd gen VA4220ZB, VA4221ZB with flow meeter FS4220, FS4221.
 """
 
+import asyncio
+import time
+from array import array
 from enum import Enum
-from typing import Final
+from typing import Final, NamedTuple
 
 import zigpy.profiles.zha as zha_p
 import zigpy.types as t
 from homeassistant.components.number import NumberDeviceClass
+from zhaquirks import LocalDataCluster
+from zhaquirks.const import ZHA_SEND_EVENT
 from zhaquirks.sinope import (SINOPE, SINOPE_MANUFACTURER_CLUSTER_ID,
                               CustomDeviceTemperatureCluster)
+from zhaquirks.sinope._sinope_common import (AttributeSnapshotMixin,
+                                             ColdLoadRestoreMixin,
+                                             DemandResponseMixin,
+                                             EnergyAccumulatorMixin,
+                                             LoadSheddingMixin,
+                                             SinopeReportingMixin,
+                                             ValueConverter, Volatility)
 from zigpy.quirks import CustomCluster
 from zigpy.quirks.v2 import (BinarySensorDeviceClass, EntityType, QuirkBuilder,
                              ReportingConfig, SensorDeviceClass,
                              SensorStateClass)
 from zigpy.quirks.v2.homeassistant import (PERCENTAGE, UnitOfElectricPotential,
-                                           UnitOfEnergy, UnitOfTime)
-from zigpy.zcl.clusters.general import Basic, BinaryInput, PowerConfiguration
+                                           UnitOfEnergy, UnitOfTime,
+                                           UnitOfVolume, UnitOfVolumeFlowRate)
+from zigpy.zcl.clusters.general import (Basic, BinaryInput, OnOff,
+                                        PowerConfiguration)
 from zigpy.zcl.clusters.security import IasZone
 from zigpy.zcl.clusters.smartenergy import Metering
 from zigpy.zcl.foundation import (ZCL_CLUSTER_REVISION_ATTR, BaseAttributeDefs,
                                   ZCLAttributeDef)
 
-STATUS_MAP = {
-    0x00000000: "Ok",
-    0x00000040: "Leak_cable_disconected",
-    0x00000020: "Temp_cable_disconected",
-    0x00000060: "Both_cables_disconected",
-}
+# Local cluster of the flow computed from the volume reports of the valves with a
+# flow meter, it is never sent to the device.
+SINOPE_FLOW_CLUSTER_ID = 0xFF02
+
+# Water flowing is reported at least every FLOW_IDLE_TIMEOUT seconds, without a
+# report for that long the flow rate drops to 0. A leak is water flowing in every
+# one of the FLOW_LEAK_BUCKETS buckets of the last FLOW_LEAK_WINDOW seconds, or a
+# flow rate of FLOW_BURST_RATE L/min or more.
+FLOW_IDLE_TIMEOUT = 120
+FLOW_LEAK_WINDOW = 3600
+FLOW_LEAK_BUCKETS = 60
+FLOW_BURST_RATE = 20.0
 
 ZONE_MAP = {
     0x0030: "OK",
@@ -40,67 +60,7 @@ ZONE_MAP = {
     0x003A: "Connector_low_bat",
 }
 
-BATTERY_MAP = {
-    0x00000000: "Ok",
-    0x00000001: "Low",
-}
-
-
-def dev_status_converter(value):
-    """Convert dev_status value to name."""
-
-    if value is None:
-        return None
-    return STATUS_MAP.get(int(value), f"Unmapped({value})")
-
-
-def zone_status_converter(value):
-    """Convert zone_status value to name."""
-
-    if value is None:
-        return None
-    return ZONE_MAP.get(int(value), f"Unmapped({value})")
-
-
-def battery_alarm_converter(value):
-    """Convert battery_alarm_state value to name."""
-
-    if value is None:
-        return None
-    return BATTERY_MAP.get(int(value), f"Unmapped({value})")
-
-
-class ManufacturerReportingMixin:
-    """Mixin to configure the attributes reporting in manufacturer cluster."""
-
-    MANUFACTURER_REPORTING = {
-        # attribut_id: (min_interval, max_interval, reportable_change)
-        0x0010: (19, 300, 25),  # outdoor_temp
-        0x0070: (60, 3678, 1),  # current_load
-        0x0076: (0, 86400, 1),  # dr_config_water_temp_min
-        0x0077: (0, 86400, 1),  # dr_config_water_temp_time
-        0x007C: (19, 300, 25),  # min_measured_temp
-        0x007D: (19, 300, 25),  # max_measured_temp
-        0x0090: (59, 1799, 60),  # current_summation_delivered
-        0x0200: (60, 43688, 1),  # dev_status
-        0x0280: (19, 300, 25),  # max_measured_value
-        0x0283: (0, 86400, 1),  # cold_load_pickup_status
-        # ... add other attributes
-    }
-
-    async def configure_reporting_all(self):
-        """Configure reporting of all configured attributes."""
-        for attr_id, (min_i, max_i, change) in self.MANUFACTURER_REPORTING.items():
-            try:
-                await self.configure_reporting(
-                    attribute=attr_id,
-                    min_interval=min_i,
-                    max_interval=max_i,
-                    reportable_change=change,
-                )
-                self.debug(f"Reporting configured for attr {hex(attr_id)}")
-            except Exception as e:
-                self.debug(f"Reporting configuration fail for attr {hex(attr_id)}: {e}")
+zone_status_converter = ValueConverter(ZONE_MAP)
 
 
 class KeypadLock(t.enum8):
@@ -265,6 +225,9 @@ class DeviceStatus(t.bitmap32):
     Both_cables_disconected = 0x00000060
 
 
+dev_status_converter = ValueConverter(DeviceStatus, bitmap=True)
+
+
 class ZoneStatus(t.uint16_t):
     """IAS zone status."""
 
@@ -307,7 +270,18 @@ class BatteryStatus(t.bitmap32):
     Low = 0x00000001
 
 
-class SinopeManufacturerCluster(ManufacturerReportingMixin, CustomCluster):
+battery_alarm_converter = ValueConverter(BatteryStatus, bitmap=True)
+
+
+class SinopeManufacturerCluster(
+    EnergyAccumulatorMixin,
+    DemandResponseMixin,
+    LoadSheddingMixin,
+    ColdLoadRestoreMixin,
+    AttributeSnapshotMixin,
+    SinopeReportingMixin,
+    CustomCluster,
+):
     """SinopeManufacturerCluster manufacturer cluster."""
 
     KeypadLock: Final = KeypadLock
@@ -326,6 +300,84 @@ class SinopeManufacturerCluster(ManufacturerReportingMixin, CustomCluster):
     name: Final = "SinopeManufacturerCluster"
     ep_attribute: Final = "sinope_manufacturer_specific"
 
+    ENERGY_COUNTERS = {
+        # attribut_id: divisor
+        0x0090: 1,  # current_summation_delivered
+    }
+    MANUFACTURER_REPORTING = {
+        # attribut_id: (min_interval, max_interval, reportable_change)
+        0x0010: (19, 300, 25),  # outdoor_temp
+        0x0070: (60, 3678, 1),  # current_load
+        0x0076: (0, 65535, 1),  # dr_config_water_temp_min
+        0x0077: (0, 65535, 1),  # dr_config_water_temp_time
+        0x007C: (19, 300, 25),  # min_measured_temp
+        0x007D: (19, 300, 25),  # max_measured_temp
+        0x0090: (59, 1799, 60),  # current_summation_delivered
+        0x0200: (60, 43688, 1),  # dev_status
+        0x0280: (19, 300, 25),  # max_measured_value
+        0x0283: (0, 65535, 1),  # cold_load_pickup_status
+        # ... add other attributes
+    }
+    REPORTING_PROFILES = {
+        # model: attributes of MANUFACTURER_REPORTING supported by the device
+        "SP2600ZB": (0x0070, 0x0090, 0x0200),
+        "SP2610ZB": (0x0070, 0x0090, 0x0200),
+        "RM3250ZB": (0x0070, 0x0090, 0x0200),
+        "VA4200WZ": (0x0200,),
+        "VA4201WZ": (0x0200,),
+        "VA4200ZB": (0x0200,),
+        "VA4201ZB": (0x0200,),
+        "VA4220ZB": (0x0200,),
+        "VA4221ZB": (0x0200,),
+        "MC3100ZB": (0x0070, 0x0200),
+        "RM3500ZB": (
+            0x0070,
+            0x0076,
+            0x0077,
+            0x007C,
+            0x007D,
+            0x0090,
+            0x0200,
+            0x0280,
+            0x0283,
+        ),
+    }
+    BATTERY_MODELS = frozenset(
+        {"VA4200WZ", "VA4201WZ", "VA4200ZB", "VA4201ZB", "VA4220ZB", "VA4221ZB"}
+    )
+    DR_ATTRIBUTES = {
+        # attribut_id: (value during the event, value after the event)
+        0x0076: (None, None),  # dr_config_water_temp_min
+        0x0077: (None, None),  # dr_config_water_temp_time
+        0x0078: (None, None),  # dr_wt_time_on
+    }
+    # the water heaters are the largest loads, they are written first
+    DR_MODELS = frozenset({"RM3500ZB"})
+    DR_PRIORITY = 0
+    LOAD_CONNECTED = 0x0060  # connected_load
+    LOAD_MODELS = frozenset({"RM3250ZB", "RM3500ZB"})
+    COLD_LOAD_MODELS = frozenset({"RM3500ZB"})
+    # the cable bits only report a missing sensor, not a fault of the heater
+    COLD_LOAD_FAULTS = 0xFFFFFFFF & ~DeviceStatus.Both_cables_disconected
+    ATTRIBUTE_VOLATILITY = {
+        # attribut_id: volatility, attributes not listed are telemetry
+        0x0003: Volatility.STATIC,  # firmware_number
+        0x0002: Volatility.CONFIG,  # keypad_lockout
+        0x0060: Volatility.CONFIG,  # connected_load
+        0x0076: Volatility.CONFIG,  # dr_config_water_temp_min
+        0x0077: Volatility.CONFIG,  # dr_config_water_temp_time
+        0x0078: Volatility.CONFIG,  # dr_wt_time_on
+        0x007E: Volatility.CONFIG,  # water_temp_protection_type
+        0x0230: Volatility.CONFIG,  # alarm_flow_threshold
+        0x0231: Volatility.CONFIG,  # alarm_options
+        0x0250: Volatility.CONFIG,  # power_source
+        0x0251: Volatility.CONFIG,  # emergency_power_source
+        0x0252: Volatility.CONFIG,  # abnormal_flow_duration
+        0x0253: Volatility.CONFIG,  # abnormal_flow_action
+        0x02A0: Volatility.CONFIG,  # input_on_delay
+        0x02A1: Volatility.CONFIG,  # input_off_delay
+    }
+
     class AttributeDefs(BaseAttributeDefs):
         """Sinope Manufacturer Cluster Attributes."""
 
@@ -489,6 +541,11 @@ class SinopeManufacturerCluster(ManufacturerReportingMixin, CustomCluster):
         await super().bind()
         await self.configure_reporting_all()
 
+    async def load_shed(self, shed: bool) -> None:
+        """Turn the load controller off when shed and back on when not."""
+        on_off = self.endpoint.in_clusters[OnOff.cluster_id]
+        await (on_off.off() if shed else on_off.on())
+
 
 class SinopeTechnologiesBasicCluster(CustomCluster, Basic):
     """SinopetechnologiesBasicCluster custom cluster."""
@@ -534,7 +591,182 @@ class SinopeTechnologiesPowerConfigurationCluster(CustomCluster, PowerConfigurat
         )
 
 
-class SinopeTechnologiesMeteringCluster(CustomCluster, Metering):
+class FlowCalibration(NamedTuple):
+    """Calibration of a flow meter, as set in flow_meter_config."""
+
+    multiplier: int
+    offset: int
+    divisor: int
+
+    @classmethod
+    def from_config(cls, config) -> "FlowCalibration":
+        """Decode the three little endian uint32 of a FlowMeter value."""
+        data = bytes(config)
+        return cls(*(int.from_bytes(data[i:i + 4], "little") for i in (0, 4, 8)))
+
+    @property
+    def present(self) -> bool:
+        """Return whether a flow meter is connected."""
+        return self.multiplier != 0
+
+
+class FlowLeakDetector:
+    """Sliding window of the water volume used, in constant memory.
+
+    The window is split in buckets holding the volume that flowed during them. The
+    volume of a report is spread evenly over the time since the previous one.
+    """
+
+    def __init__(
+        self, window: float = FLOW_LEAK_WINDOW, buckets: int = FLOW_LEAK_BUCKETS
+    ) -> None:
+        """Initialize empty buckets."""
+        self.window = window
+        self.size = window / buckets
+        self._volumes = array("d", bytes(8 * buckets))
+        self._newest: int | None = None
+        self._since: float | None = None
+
+    def _advance(self, timestamp: float) -> None:
+        """Empty the buckets that left the window."""
+        bucket = int(timestamp // self.size)
+        if self._newest is None:
+            self._newest = bucket
+            self._since = timestamp
+            return
+        for number in range(
+            self._newest + 1, min(bucket, self._newest + len(self._volumes)) + 1
+        ):
+            self._volumes[number % len(self._volumes)] = 0.0
+        self._newest = max(self._newest, bucket)
+
+    def add(self, start: float, end: float, liters: float) -> None:
+        """Add the volume that flowed between two times."""
+        self._advance(end)
+        oldest = self._newest - len(self._volumes) + 1
+        if end <= start:
+            self._volumes[self._newest % len(self._volumes)] += liters
+            return
+        for number in range(
+            max(int(start // self.size), oldest), int(end // self.size) + 1
+        ):
+            overlap = min(end, (number + 1) * self.size) - max(
+                start, number * self.size
+            )
+            self._volumes[number % len(self._volumes)] += (
+                liters * overlap / (end - start)
+            )
+
+    def volume(self, now: float) -> float:
+        """Return the volume of the window."""
+        self._advance(now)
+        return sum(self._volumes)
+
+    def leaking(self, now: float) -> bool:
+        """Return whether water flowed during every elapsed bucket of a window."""
+        self._advance(now)
+        if now - self._since < self.window:
+            return False
+        current = self._newest % len(self._volumes)
+        return all(
+            volume > 0
+            for number, volume in enumerate(self._volumes)
+            if number != current
+        )
+
+
+class SinopeFlowCluster(LocalDataCluster):
+    """Flow rate, volume and leaks computed from the Metering volume reports."""
+
+    cluster_id: Final[t.uint16_t] = SINOPE_FLOW_CLUSTER_ID
+    name: Final = "SinopeFlowCluster"
+    ep_attribute: Final = "sinope_flow"
+
+    class AttributeDefs(BaseAttributeDefs):
+        """Sinope Flow Cluster Attributes."""
+
+        flow_rate: Final = ZCLAttributeDef(id=0x0000, type=t.Single, access="rp")
+        volume: Final = ZCLAttributeDef(id=0x0001, type=t.Single, access="rp")
+        leak: Final = ZCLAttributeDef(id=0x0002, type=t.Bool, access="rp")
+
+    def __init__(self, *args, **kwargs):
+        """Initialize the leak detector."""
+        super().__init__(*args, **kwargs)
+        self.detector = FlowLeakDetector()
+        self._last: tuple[float, float] | None = None
+        self._idle: asyncio.TimerHandle | None = None
+
+    def calibration(self) -> FlowCalibration | None:
+        """Return the calibration of the flow meter, None if not read yet."""
+        manufacturer = self.endpoint.in_clusters.get(SINOPE_MANUFACTURER_CLUSTER_ID)
+        config = None
+        if manufacturer is not None:
+            config = manufacturer.get(
+                SinopeManufacturerCluster.AttributeDefs.flow_meter_config.id
+            )
+        return None if config is None else FlowCalibration.from_config(config)
+
+    def attribute_updated(self, attrid, value, timestamp=None) -> None:
+        """Follow the volume reported by the Metering cluster of the endpoint."""
+        if attrid != Metering.AttributeDefs.current_summ_delivered.id:
+            return
+        calibration = self.calibration()
+        if value is None or (calibration is not None and not calibration.present):
+            return
+        self.volume_reported(
+            value / SinopeTechnologiesMeteringCluster._CONSTANT_ATTRIBUTES[
+                SinopeTechnologiesMeteringCluster.DIVISOR
+            ],
+            time.time(),
+        )
+
+    def volume_reported(self, liters: float, now: float) -> None:
+        """Update the flow rate, volume and leak state from the total volume."""
+        previous, self._last = self._last, (now, liters)
+        self._update_attribute(self.AttributeDefs.volume.id, liters)
+        if previous is None:
+            return
+
+        # the rate and the volume in the leak window are both spread over the whole
+        # interval, a slow leak is only reported every few minutes
+        used = max(liters - previous[1], 0.0)
+        self.detector.add(max(previous[0], now - self.detector.window), now, used)
+        rate = used * 60 / (now - previous[0]) if now > previous[0] else 0.0
+        self._update_attribute(self.AttributeDefs.flow_rate.id, rate)
+
+        if self._idle is not None:
+            self._idle.cancel()
+            self._idle = None
+        if rate > 0:
+            self._idle = asyncio.get_running_loop().call_later(
+                FLOW_IDLE_TIMEOUT, self._flow_stopped
+            )
+        self._update_leak(now, rate)
+
+    def _flow_stopped(self) -> None:
+        self._idle = None
+        self._update_attribute(self.AttributeDefs.flow_rate.id, 0.0)
+        self._update_leak(time.time(), 0.0)
+
+    def _update_leak(self, now: float, rate: float) -> None:
+        leak = rate >= FLOW_BURST_RATE or self.detector.leaking(now)
+        if leak == bool(self.get(self.AttributeDefs.leak.id)):
+            return
+        self._update_attribute(self.AttributeDefs.leak.id, leak)
+        self.listener_event(
+            ZHA_SEND_EVENT,
+            "flow_leak",
+            {
+                "leak": leak,
+                "flow_rate": rate,
+                "window_volume": self.detector.volume(now),
+            },
+        )
+
+
+class SinopeTechnologiesMeteringCluster(
+    EnergyAccumulatorMixin, CustomCluster, Metering
+):
     """SinopeTechnologiesMeteringCluster custom cluster."""
 
     ValveStatus: Final = ValveStatus
@@ -542,6 +774,12 @@ class SinopeTechnologiesMeteringCluster(CustomCluster, Metering):
 
     DIVISOR = 0x0302
     _CONSTANT_ATTRIBUTES = {DIVISOR: 1000}
+    ENERGY_COUNTERS = {
+        # attribut_id: divisor
+        0x0000: 1,  # current_summ_delivered
+    }
+    # the valves meter water, not energy
+    FLEET_MODELS = frozenset({"SP2600ZB", "SP2610ZB"})
 
     class AttributeDefs(Metering.AttributeDefs):
         """Sinope Manufacturer Metering Cluster Attributes."""
@@ -553,6 +791,13 @@ class SinopeTechnologiesMeteringCluster(CustomCluster, Metering):
             id=0x0300, type=UnitOfMeasure, access="r", is_manufacturer_specific=True
         )
 
+    def __init__(self, *args, **kwargs):
+        """Send the volume reports to the flow cluster of the valves having one."""
+        super().__init__(*args, **kwargs)
+        flow = self.endpoint.in_clusters.get(SINOPE_FLOW_CLUSTER_ID)
+        if flow is not None:
+            self.add_listener(flow)
+
 
 (
     # <SimpleDescriptor(endpoint=1, profile=260,
@@ -631,21 +876,8 @@ class SinopeTechnologiesMeteringCluster(CustomCluster, Metering):
     .add_to_registry()
 )
 
-(
-    # <SimpleDescriptor(endpoint=1, profile=260,
-    # device_type=3, device_version=0,
-    # input_clusters=[0, 1, 3, 4, 5, 6, 8, 2821, 65281]
-    # output_clusters=[3, 25]>
-    # <SimpleDescriptor(endpoint=1, profile=260,
-    # device_type=3, device_version=0,
-    # input_clusters=[0, 1, 3, 4, 5, 6, 8, 1026, 1280, 1794, 2821, 65281]
-    # output_clusters=[3, 6, 25]>
-    QuirkBuilder(SINOPE, "VA4200WZ")
-    .applies_to(SINOPE, "VA4201WZ")
-    .applies_to(SINOPE, "VA4200ZB")
-    .applies_to(SINOPE, "VA4201ZB")
-    .applies_to(SINOPE, "VA4220ZB")
-    .applies_to(SINOPE, "VA4221ZB")
+sinope_valve_quirk = (
+    QuirkBuilder()
     .replaces(SinopeTechnologiesBasicCluster)
     .replaces(SinopeTechnologiesPowerConfigurationCluster)
     .replaces(SinopeTechnologiesIasZoneCluster)
@@ -761,6 +993,55 @@ class SinopeTechnologiesMeteringCluster(CustomCluster, Metering):
         translation_key="alarm_disable_countdown",
         fallback_name="Alarm disable countdown",
     )
+)
+
+(
+    # <SimpleDescriptor(endpoint=1, profile=260,
+    # device_type=3, device_version=0,
+    # input_clusters=[0, 1, 3, 4, 5, 6, 8, 2821, 65281]
+    # output_clusters=[3, 25]>
+    sinope_valve_quirk.clone()
+    .applies_to(SINOPE, "VA4200WZ")
+    .applies_to(SINOPE, "VA4201WZ")
+    .applies_to(SINOPE, "VA4200ZB")
+    .applies_to(SINOPE, "VA4201ZB")
+    .add_to_registry()
+)
+
+(
+    # <SimpleDescriptor(endpoint=1, profile=260,
+    # device_type=3, device_version=0,
+    # input_clusters=[0, 1, 3, 4, 5, 6, 8, 1026, 1280, 1794, 2821, 65281]
+    # output_clusters=[3, 6, 25]>
+    sinope_valve_quirk.clone()
+    .applies_to(SINOPE, "VA4220ZB")
+    .applies_to(SINOPE, "VA4221ZB")
+    .adds(SinopeFlowCluster)
+    .sensor(  # Flow rate
+        attribute_name=SinopeFlowCluster.AttributeDefs.flow_rate.name,
+        cluster_id=SinopeFlowCluster.cluster_id,
+        state_class=SensorStateClass.MEASUREMENT,
+        unit=UnitOfVolumeFlowRate.LITERS_PER_MINUTE,
+        device_class=SensorDeviceClass.VOLUME_FLOW_RATE,
+        translation_key="flow_rate",
+        fallback_name="Flow rate",
+    )
+    .sensor(  # Water volume
+        attribute_name=SinopeFlowCluster.AttributeDefs.volume.name,
+        cluster_id=SinopeFlowCluster.cluster_id,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        unit=UnitOfVolume.LITERS,
+        device_class=SensorDeviceClass.WATER,
+        translation_key="water_volume",
+        fallback_name="Water volume",
+    )
+    .binary_sensor(  # Leak
+        attribute_name=SinopeFlowCluster.AttributeDefs.leak.name,
+        cluster_id=SinopeFlowCluster.cluster_id,
+        device_class=BinarySensorDeviceClass.MOISTURE,
+        translation_key="water_leak",
+        fallback_name="Water leak",
+    )
     .add_to_registry()
 )
 
@@ -962,5 +1243,29 @@ class SinopeTechnologiesMeteringCluster(CustomCluster, Metering):
         translation_key="dev_status",
         fallback_name="Device status",
     )
+    .binary_sensor(  # Leak cable disconnected
+        attribute_name=SinopeManufacturerCluster.AttributeDefs.dev_status.name,
+        cluster_id=SinopeManufacturerCluster.cluster_id,
+        endpoint_id=1,
+        entity_type=EntityType.DIAGNOSTIC,
+        device_class=BinarySensorDeviceClass.PROBLEM,
+        initially_disabled=True,
+        attribute_converter=dev_status_converter.flag_converter("Leak_cable_disconected"),
+        unique_id_suffix="dev_status_leak_cable",
+        translation_key="leak_cable_disconnected",
+        fallback_name="Leak cable disconnected",
+    )
+    .binary_sensor(  # Temperature cable disconnected
+        attribute_name=SinopeManufacturerCluster.AttributeDefs.dev_status.name,
+        cluster_id=SinopeManufacturerCluster.cluster_id,
+        endpoint_id=1,
+        entity_type=EntityType.DIAGNOSTIC,
+        device_class=BinarySensorDeviceClass.PROBLEM,
+        initially_disabled=True,
+        attribute_converter=dev_status_converter.flag_converter("Temp_cable_disconected"),
+        unique_id_suffix="dev_status_temp_cable",
+        translation_key="temp_cable_disconnected",
+        fallback_name="Temperature cable disconnected",
+    )
     .add_to_registry()
 )
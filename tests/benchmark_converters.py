@@ -0,0 +1,59 @@
+"""Microbenchmark of the Sinopé status attribute converters.
+
+Compares the former converters, an int() conversion and a dict lookup rendering
+a new Unmapped string on every miss, with the precomputed ValueConverter on a
+stream of reports where one value out of ten has unknown bits.
+
+Run with: python -m tests.benchmark_converters
+"""
+
+import timeit
+
+from zhaquirks.sinope._sinope_common import ValueConverter
+from zhaquirks.sinope.thermostat import DeviceStatus
+
+STATUS_MAP = {
+    0x00000000: "Ok",
+    0x00000020: "Floor_sensor",
+    0x00000040: "Temp_sensor",
+    0x00000060: "Both_sensor",
+}
+
+REPORTS = [DeviceStatus(value) for value in (0x00, 0x20, 0x40, 0x60, 0x00) * 2]
+REPORTS[-1] = DeviceStatus(0x81)
+
+
+def legacy_converter(value):
+    """Convert status value to name, as done before ValueConverter."""
+
+    if value is None:
+        return None
+    return STATUS_MAP.get(int(value), f"Unmapped({value})")
+
+
+def bench(converter, number: int = 20000) -> float:
+    """Return the mean cost of a report in nanoseconds."""
+
+    def run():
+        for value in REPORTS:
+            converter(value)
+
+    best = min(timeit.repeat(run, number=number, repeat=5))
+    return best / (number * len(REPORTS)) * 1e9
+
+
+def main() -> None:
+    """Print the per report cost of both converters."""
+    converter = ValueConverter(DeviceStatus, bitmap=True)
+    for value in REPORTS:
+        if value in STATUS_MAP:
+            assert converter(value) == legacy_converter(value)
+
+    legacy = bench(legacy_converter)
+    precomputed = bench(converter)
+    print(f"legacy:      {legacy:7.1f} ns/report")
+    print(f"precomputed: {precomputed:7.1f} ns/report ({legacy / precomputed:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,41 @@
 """Tests for Sinope."""
 
+import asyncio
+import time
+from array import array
+from datetime import datetime, timedelta, timezone
 from unittest import mock
 
 import pytest
 import zhaquirks
+import zigpy.group
 import zigpy.types as t
-from zhaquirks.const import (COMMAND_M_INITIAL_PRESS, COMMAND_M_LONG_RELEASE,
+from zhaquirks.const import (COMMAND_M_INITIAL_PRESS, COMMAND_M_LONG_PRESS,
+                             COMMAND_M_LONG_RELEASE,
                              COMMAND_M_MULTI_PRESS_COMPLETE,
-                             COMMAND_M_SHORT_RELEASE, TURN_OFF, TURN_ON)
-from zhaquirks.sinope import SINOPE, SINOPE_MANUFACTURER_CLUSTER_ID
-from zhaquirks.sinope.light import (LightManufacturerCluster,
+                             COMMAND_M_SHORT_RELEASE, COMMAND_QUAD,
+                             COMMAND_TRIPLE, TURN_OFF, TURN_ON)
+from zhaquirks.sinope import (LIGHT_DEVICE_TRIGGERS, SINOPE,
+                              SINOPE_MANUFACTURER_CLUSTER_ID)
+from zhaquirks.sinope._sinope_common import (REPORTING_RETRIES,
+                                             ColdLoadRestore,
+                                             DemandResponseCampaign,
+                                             FleetEnergy, LoadManager,
+                                             LoadSheddingMixin,
+                                             ReportingScheduler,
+                                             ReportingState, SinopeStore,
+                                             ValueConverter, Volatility)
+from zhaquirks.sinope.light import (BOTH_BUTTONS, COMMAND_CHORD,
+                                    LIGHT_GESTURE_TRIGGERS, GestureTiming,
+                                    LightManufacturerCluster,
                                     SinopeTechnologiesManufacturerCluster)
+from zhaquirks.sinope.switch import (SINOPE_FLOW_CLUSTER_ID, FlowCalibration,
+                                     FlowLeakDetector, FlowMeter, FlowMeterEnum)
+from zhaquirks.sinope.thermostat import CycleOutput, outdoor_temp_writer
+from zigpy.config import CONF_DATABASE
 from zigpy.zcl import foundation
-from zigpy.zcl.clusters.general import DeviceTemperature, PowerConfiguration
+from zigpy.zcl.clusters.general import (Basic, DeviceTemperature,
+                                        PowerConfiguration)
 from zigpy.zcl.clusters.smartenergy import Metering
 
 from tests.common import ClusterListener
@@ -31,6 +54,21 @@ SINOPE_MODELS = [
 ]
 
 
+@pytest.fixture(autouse=True)
+def sinope_store(tmp_path):
+    """Keep the persisted Sinope store in a temporary directory."""
+    store = SinopeStore(str(tmp_path / "sinope_store.json"))
+    with mock.patch("zhaquirks.sinope._sinope_common.STORE", store):
+        yield store
+
+
+@pytest.fixture(autouse=True)
+def no_reporting_retry_delay():
+    """Retry rejected reporting records without waiting."""
+    with mock.patch("zhaquirks.sinope._sinope_common.REPORTING_RETRY_DELAY", 0):
+        yield
+
+
 async def test_sinope_device_temp(zigpy_device_from_v2_quirk):
     """Test that device temperature is multiplied."""
     device = zigpy_device_from_v2_quirk(SINOPE, "RM3500ZB")
@@ -53,9 +91,10 @@ async def test_sinope_device_temp(zigpy_device_from_v2_quirk):
     assert dev_temp_listener.attribute_updates[1][1] == 25  # not modified
 
 
-async def test_sinope_flow_measurement(zigpy_device_from_v2_quirk):
+async def test_sinope_flow_measurement(zigpy_device_from_v2_quirk, sinope_store):
     """Test that metering values are handled correctly for Sinope valve."""
     device = zigpy_device_from_v2_quirk(SINOPE, "VA4220ZB")
+    await sinope_store.async_device(device)  # counter offsets are loaded
 
     metering_cluster = device.endpoints[1].smartenergy_metering
     metering_listener = ClusterListener(metering_cluster)
@@ -75,6 +114,98 @@ async def test_sinope_flow_measurement(zigpy_device_from_v2_quirk):
     assert metering_listener.attribute_updates[1][1] == 25  # not modified
 
 
+def test_sinope_flow_calibration():
+    """Test that the flow meter vectors are decoded."""
+    assert FlowCalibration.from_config(FlowMeter(FlowMeterEnum.FS4220.value)) == (
+        4546,
+        30600,
+        1,
+    )
+    assert FlowCalibration.from_config(FlowMeter(FlowMeterEnum.FS4221.value)).present
+    assert not FlowCalibration.from_config(
+        FlowMeter(FlowMeterEnum.No_flow_meter.value)
+    ).present
+
+
+def test_sinope_flow_leak_detector():
+    """Test that a leak needs water flowing during a whole window."""
+    detector = FlowLeakDetector(window=600, buckets=10)
+    for now in range(60, 660, 60):
+        detector.add(now - 60, now, 1.0)
+    assert not detector.leaking(600)  # not observed for a full window
+    detector.add(600, 660, 1.0)
+    assert detector.leaking(660)
+    assert detector.volume(660) == pytest.approx(9.0)
+    detector.add(660, 780, 0.0)  # the water stopped for two buckets
+    assert not detector.leaking(780)
+    assert detector.volume(780) == pytest.approx(7.0)
+
+
+async def test_sinope_flow_rate(zigpy_device_from_v2_quirk, sinope_store):
+    """Test that the volume reports give the flow rate and leaks of the valve."""
+    device = zigpy_device_from_v2_quirk(SINOPE, "VA4220ZB")
+    await sinope_store.async_device(device)
+    metering_cluster = device.endpoints[1].smartenergy_metering
+    flow_cluster = device.endpoints[1].in_clusters[SINOPE_FLOW_CLUSTER_ID]
+    manu_cluster = device.endpoints[1].in_clusters[SINOPE_MANUFACTURER_CLUSTER_ID]
+    attr_id = Metering.AttributeDefs.current_summ_delivered.id
+    flow_attrs = flow_cluster.AttributeDefs
+    events = mock.MagicMock()
+    flow_cluster.add_listener(mock.Mock(spec=["zha_send_event"], zha_send_event=events))
+
+    with mock.patch("zhaquirks.sinope._sinope_common.time.time") as now:
+        now.return_value = 1000.0
+        metering_cluster.update_attribute(attr_id, 100_000)  # mL
+        assert flow_cluster.get(flow_attrs.volume.id) == 100.0
+        assert flow_cluster.get(flow_attrs.flow_rate.id) is None
+
+        now.return_value = 1030.0
+        metering_cluster.update_attribute(attr_id, 105_000)
+        assert flow_cluster.get(flow_attrs.flow_rate.id) == pytest.approx(10.0)
+        assert not events.mock_calls
+
+        now.return_value = 1045.0
+        metering_cluster.update_attribute(attr_id, 110_000)
+        assert flow_cluster.get(flow_attrs.flow_rate.id) == pytest.approx(20.0)
+        assert flow_cluster.get(flow_attrs.leak.id)
+        assert events.mock_calls[-1].args[0] == "flow_leak"
+        assert events.mock_calls[-1].args[1]["leak"]
+
+        # the flow rate drops to 0 without reports
+        flow_cluster._idle._run()
+        assert flow_cluster.get(flow_attrs.flow_rate.id) == 0.0
+        assert not flow_cluster.get(flow_attrs.leak.id)
+        assert not events.mock_calls[-1].args[1]["leak"]
+
+        # the rate of a sparse report is averaged over the time since the last one
+        now.return_value = 2845.0
+        metering_cluster.update_attribute(attr_id, 120_000)
+        assert flow_cluster.get(flow_attrs.flow_rate.id) == pytest.approx(10 / 30)
+        assert not flow_cluster.get(flow_attrs.leak.id)
+        assert flow_cluster.detector.volume(2845.0) == pytest.approx(20.0)
+
+        # a slow leak reported every five minutes fills the whole window
+        volume = 120_000
+        for report in range(1, 13):
+            now.return_value = 2845.0 + 300 * report
+            volume += 500
+            metering_cluster.update_attribute(attr_id, volume)
+            assert flow_cluster.get(flow_attrs.flow_rate.id) == pytest.approx(0.1)
+        assert flow_cluster.get(flow_attrs.leak.id)
+
+        # nothing is computed without a flow meter
+        manu_cluster.update_attribute(
+            manu_cluster.AttributeDefs.flow_meter_config.id,
+            FlowMeter(FlowMeterEnum.No_flow_meter.value),
+        )
+        metering_cluster.update_attribute(attr_id, 130_000)
+        assert flow_cluster.get(flow_attrs.volume.id) == 126.0
+
+    # the valves without a flow meter have no flow cluster
+    device = zigpy_device_from_v2_quirk(SINOPE, "VA4200ZB")
+    assert SINOPE_FLOW_CLUSTER_ID not in device.endpoints[1].in_clusters
+
+
 def _get_packet_data(
     command: foundation.GeneralCommand,
     attr: foundation.Attribute | None = None,
@@ -155,6 +286,112 @@ async def test_sinope_light_switch(
         )
 
 
+async def test_sinope_light_switch_latency(zigpy_device_from_v2_quirk):
+    """Test that the latency from frame receipt to button event is measured."""
+    device = zigpy_device_from_v2_quirk(SINOPE, "SW2500ZB")
+    cluster = device.endpoints[1].in_clusters[SINOPE_MANUFACTURER_CLUSTER_ID]
+    attr = foundation.Attribute(
+        attrid=0x54,
+        value=foundation.TypeValue(type=t.enum8(0x30), value=ButtonAction.Pressed_on),
+    )
+    data = _get_packet_data(foundation.GeneralCommand.Report_Attributes, attr)
+    hook = mock.Mock()
+
+    with mock.patch("zhaquirks.sinope.light.ACTION_LATENCY_HOOK", hook):
+        device.packet_received(
+            t.ZigbeePacket(
+                timestamp=datetime.now(timezone.utc) - timedelta(seconds=0.5),
+                profile_id=260,
+                cluster_id=SINOPE_MANUFACTURER_CLUSTER_ID,
+                src_ep=1,
+                dst_ep=1,
+                data=t.SerializableBytes(data),
+            )
+        )
+
+    assert cluster.action_stats.actions == 1
+    assert 0.5 <= cluster.action_stats.last_latency < 5
+    assert hook.call_args.args[:2] == (cluster, COMMAND_M_INITIAL_PRESS)
+    assert hook.call_args.args[2] == cluster.action_stats.last_latency
+
+
+async def test_sinope_light_switch_gestures(zigpy_device_from_v2_quirk):
+    """Test multi press, hold and chord gestures built from the button actions."""
+    device = zigpy_device_from_v2_quirk(SINOPE, "SW2500ZB")
+    cluster = device.endpoints[1].in_clusters[SINOPE_MANUFACTURER_CLUSTER_ID]
+    cluster.gestures.timing = GestureTiming(0.05, 0.05, 0.02, 3, 0.05)
+    events = []
+    cluster.gestures.emit = lambda command, args: events.append((command, args))
+    gestures = cluster.gestures
+
+    for _ in range(3):
+        gestures.action(ButtonAction.Pressed_on)
+        gestures.action(ButtonAction.Released_on)
+    await asyncio.sleep(0.1)
+    assert events == [(COMMAND_TRIPLE, {"button": TURN_ON, "press_count": 3})]
+
+    events.clear()
+    # the device reports the second press as a double press
+    presses = (ButtonAction.Pressed_off, ButtonAction.Double_off)
+    for action in presses + (ButtonAction.Pressed_off,) * 2:
+        gestures.action(action)
+        gestures.action(ButtonAction.Released_off)
+    await asyncio.sleep(0.1)
+    assert events == [(COMMAND_QUAD, {"button": TURN_OFF, "press_count": 4})]
+
+    # a hold confirmed by the device repeats until released, at most max_repeats
+    events.clear()
+    action_id = cluster.AttributeDefs.action_report.id
+    read = mock.AsyncMock(return_value=({action_id: ButtonAction.Pressed_on}, {}))
+    with mock.patch.object(cluster, "read_attributes", read):
+        gestures.action(ButtonAction.Pressed_on)
+        await asyncio.sleep(0.2)
+        gestures.action(ButtonAction.Long_on)
+    await asyncio.sleep(0.1)
+    assert events == [
+        (COMMAND_M_LONG_PRESS, {"button": TURN_ON, "repeat": n}) for n in (1, 2, 3)
+    ]
+    assert read.mock_calls == [mock.call([action_id])]
+
+    # a release delayed past hold_delay is not a hold
+    events.clear()
+    read.return_value = ({action_id: ButtonAction.Released_on}, {})
+    with mock.patch.object(cluster, "read_attributes", read):
+        gestures.action(ButtonAction.Pressed_on)
+        await asyncio.sleep(0.1)
+        gestures.action(ButtonAction.Released_on)
+    await asyncio.sleep(0.1)
+    assert events == []
+
+    # nor when the device does not answer
+    read.side_effect = asyncio.TimeoutError
+    with mock.patch.object(cluster, "read_attributes", read):
+        gestures.action(ButtonAction.Pressed_on)
+        await asyncio.sleep(0.1)
+        gestures.action(ButtonAction.Released_on)
+    await asyncio.sleep(0.1)
+    assert events == []
+
+    events.clear()
+    gestures.action(ButtonAction.Pressed_on)
+    gestures.action(ButtonAction.Pressed_off)
+    gestures.action(ButtonAction.Released_on)
+    gestures.action(ButtonAction.Released_off)
+    await asyncio.sleep(0.1)
+    assert events == [(COMMAND_CHORD, {"button": BOTH_BUTTONS})]
+
+    # a single press is still left to the device events
+    events.clear()
+    gestures.action(ButtonAction.Pressed_on)
+    gestures.action(ButtonAction.Released_on)
+    await asyncio.sleep(0.1)
+    assert events == []
+
+    triggers = device.device_automation_triggers
+    assert triggers.items() >= LIGHT_DEVICE_TRIGGERS.items()
+    assert triggers == LIGHT_GESTURE_TRIGGERS
+
+
 async def test_sinope_light_switch_non_action_report(zigpy_device_from_v2_quirk):
     """Test commands not handled by custom handler.
 
@@ -233,11 +470,11 @@ async def test_sinope_reporting(zigpy_device_from_v2_quirk, model):
             for report in reports:
                 called_attrs.append(report.attrid)
 
-        for attr_id in manu_cluster.MANUFACTURER_REPORTING:
+        for attr_id in manu_cluster.reporting_table:
             assert attr_id in called_attrs
 
         # Check that number of call is coherent
-        assert len(request_mock.mock_calls) >= len(manu_cluster.MANUFACTURER_REPORTING)
+        assert len(request_mock.mock_calls) >= len(manu_cluster.reporting_table)
 
 
 @pytest.mark.parametrize("model", SINOPE_MODELS)
@@ -250,6 +487,1088 @@ async def test_sinope_reporting_failure(zigpy_device_from_v2_quirk, model):
         await manu_cluster.configure_reporting_all()
 
 
+def _reporting_success():
+    return [
+        [foundation.ConfigureReportingResponseRecord(status=foundation.Status.SUCCESS)]
+    ]
+
+
+async def test_sinope_reporting_concurrency(zigpy_device_from_v2_quirk):
+    """Test that reporting frames are sent concurrently within the device limit."""
+    device = zigpy_device_from_v2_quirk(SINOPE, "TH1123ZB")
+    manu_cluster = device.endpoints[1].in_clusters[SINOPE_MANUFACTURER_CLUSTER_ID]
+
+    in_flight = 0
+    max_in_flight = 0
+
+    async def request(*args, **kwargs):
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return _reporting_success()
+
+    # one attribute per frame
+    frame_patch = mock.patch("zhaquirks.sinope._sinope_common.REPORTING_FRAME_BYTES", 1)
+    request_patch = mock.patch("zigpy.zcl.Cluster.request", side_effect=request)
+
+    with frame_patch, request_patch:
+        await manu_cluster.configure_reporting_all()
+
+    assert 1 < max_in_flight <= manu_cluster.REPORTING_DEVICE_CONCURRENCY
+    assert set(manu_cluster.reporting_stats) == set(manu_cluster.reporting_table)
+    for stats in manu_cluster.reporting_stats.values():
+        assert stats.success == 1
+        assert stats.failure == 0
+        assert stats.last_duration is not None
+
+
+@pytest.mark.parametrize("model", SINOPE_MODELS)
+async def test_sinope_reporting_batched(zigpy_device_from_v2_quirk, model):
+    """Test that the reporting table is packed in multi-attribute frames."""
+    device = zigpy_device_from_v2_quirk(SINOPE, model)
+    manu_cluster = device.endpoints[1].in_clusters[SINOPE_MANUFACTURER_CLUSTER_ID]
+
+    with mock.patch("zigpy.zcl.Cluster.request", mock.AsyncMock()) as request_mock:
+        request_mock.return_value = _reporting_success()
+        await manu_cluster.configure_reporting_all()
+
+    called_attrs = [
+        report.attrid for call in request_mock.mock_calls for report in call.args[3]
+    ]
+    assert sorted(called_attrs) == sorted(manu_cluster.reporting_table)
+    assert len(request_mock.mock_calls) < len(manu_cluster.reporting_table)
+    for call in request_mock.mock_calls:
+        size = sum(len(report.serialize()) for report in call.args[3])
+        assert len(call.args[3]) == 1 or size <= 50
+
+
+async def test_sinope_reporting_rejected_retry(zigpy_device_from_v2_quirk):
+    """Test that only records rejected by the device are retried one by one."""
+    device = zigpy_device_from_v2_quirk(SINOPE, "RM3500ZB")
+    manu_cluster = device.endpoints[1].in_clusters[SINOPE_MANUFACTURER_CLUSTER_ID]
+    attrs = manu_cluster.AttributeDefs
+
+    def response(*args, **kwargs):
+        reports = args[3]
+        if len(reports) == 1:
+            return _reporting_success()
+        return [
+            [
+                foundation.ConfigureReportingResponseRecord(
+                    status=foundation.Status.INVALID_VALUE,
+                    direction=foundation.ReportingDirection.SendReports,
+                    attrid=attrs.current_load.id,
+                ),
+                foundation.ConfigureReportingResponseRecord(
+                    status=foundation.Status.UNSUPPORTED_ATTRIBUTE,
+                    direction=foundation.ReportingDirection.SendReports,
+                    attrid=attrs.cold_load_pickup_status.id,
+                ),
+            ]
+        ]
+
+    with mock.patch("zigpy.zcl.Cluster.request", side_effect=response) as request_mock:
+        await manu_cluster.configure_reporting_all()
+
+    retried = [
+        call.args[3][0].attrid
+        for call in request_mock.mock_calls
+        if len(call.args[3]) == 1
+    ]
+    assert retried == [attrs.current_load.id]
+    assert manu_cluster.reporting_stats[attrs.current_load.id].success == 1
+    assert manu_cluster.reporting_stats[attrs.current_load.id].failure == 1
+    assert manu_cluster.reporting_stats[attrs.cold_load_pickup_status.id].success == 0
+
+
+async def test_sinope_reporting_rejected_frame(
+    zigpy_device_from_v2_quirk, sinope_store
+):
+    """Test that a frame rejected as a whole is retried one record at a time."""
+    device = zigpy_device_from_v2_quirk(SINOPE, "RM3500ZB")
+    manu_cluster = device.endpoints[1].in_clusters[SINOPE_MANUFACTURER_CLUSTER_ID]
+
+    def response(*args, **kwargs):
+        if len(args[3]) == 1:
+            return _reporting_success()
+        # default response of a firmware handling a single record per frame
+        return [
+            foundation.GeneralCommand.Configure_Reporting,
+            foundation.Status.MALFORMED_COMMAND,
+        ]
+
+    with mock.patch("zigpy.zcl.Cluster.request", side_effect=response) as request_mock:
+        await manu_cluster.configure_reporting_all()
+
+    batched = [call for call in request_mock.mock_calls if len(call.args[3]) > 1]
+    assert 0 < len(batched) < len(manu_cluster.reporting_table)
+    assert set(manu_cluster.reporting_state.values()) == {ReportingState.CONFIGURED}
+    for stats in manu_cluster.reporting_stats.values():
+        assert stats.success == 1
+
+
+@pytest.mark.parametrize(
+    "model, present, absent",
+    [
+        ("TH1123ZB", [], [0x010C, 0x0115]),  # floor_limit_status, gfci_status
+        ("TH1300ZB", [0x010C, 0x0115], []),
+        ("TH1400ZB", [0x010C], [0x0070, 0x0115]),  # current_load
+        ("HP6000ZB-GE", [], [0x0070, 0x010C, 0x0115]),
+        ("DM2550ZB", [0x0058], [0x0090]),  # double_up_full, summation
+        ("VA4220ZB", [0x0200], [0x0010, 0x0070]),  # dev_status, outdoor_temp
+        ("LM4110-ZB", [0x0200], [0x0035, 0x0038, 0x0039]),
+    ],
+)
+async def test_sinope_reporting_profile(
+    zigpy_device_from_v2_quirk, model, present, absent
+):
+    """Test that only the attributes supported by the model are configured."""
+    device = zigpy_device_from_v2_quirk(SINOPE, model)
+    manu_cluster = device.endpoints[1].in_clusters[SINOPE_MANUFACTURER_CLUSTER_ID]
+
+    with mock.patch("zigpy.zcl.Cluster.request", mock.AsyncMock()) as request_mock:
+        request_mock.return_value = _reporting_success()
+        await manu_cluster.configure_reporting_all()
+
+    called_attrs = {
+        report.attrid for call in request_mock.mock_calls for report in call.args[3]
+    }
+    assert called_attrs == set(manu_cluster.reporting_table)
+    assert called_attrs <= set(manu_cluster.MANUFACTURER_REPORTING)
+    assert set(present) <= called_attrs
+    assert not set(absent) & called_attrs
+
+
+def test_sinope_reporting_profile_fallback(zigpy_device_from_v2_quirk):
+    """Test that a model without a profile configures the whole table."""
+    device = zigpy_device_from_v2_quirk(SINOPE, "TH1300ZB")
+    manu_cluster = device.endpoints[1].in_clusters[SINOPE_MANUFACTURER_CLUSTER_ID]
+
+    with mock.patch.dict(manu_cluster.REPORTING_PROFILES, clear=True):
+        assert manu_cluster.reporting_table == manu_cluster.MANUFACTURER_REPORTING
+
+
+def _read_reporting_response(manu_cluster, changed=()):
+    """Build a Read Reporting Configuration response matching the device table."""
+    configs = []
+    for attr_id, (min_i, max_i, change) in manu_cluster.reporting_table.items():
+        config = foundation.AttributeReportingConfig()
+        config.direction = foundation.ReportingDirection.SendReports
+        config.attrid = attr_id
+        config.datatype = manu_cluster.find_attribute(attr_id).zcl_type
+        config.min_interval = min_i
+        config.max_interval = max_i + 1 if attr_id in changed else max_i
+        config.reportable_change = change
+        configs.append(
+            foundation.AttributeReportingConfigWithStatus(
+                status=foundation.Status.SUCCESS, config=config
+            )
+        )
+    return [configs]
+
+
+@pytest.mark.parametrize("model", SINOPE_MODELS)
+async def test_sinope_reporting_unchanged(zigpy_device_from_v2_quirk, model):
+    """Test that reporting already applied on the device is not configured again."""
+    device = zigpy_device_from_v2_quirk(SINOPE, model)
+    manu_cluster = device.endpoints[1].in_clusters[SINOPE_MANUFACTURER_CLUSTER_ID]
+    changed_attr = next(iter(manu_cluster.reporting_table))
+
+    with mock.patch("zigpy.zcl.Cluster.request", mock.AsyncMock()) as request_mock:
+        request_mock.return_value = _reporting_success()
+        await manu_cluster.configure_reporting_all()
+
+    configure = foundation.GeneralCommand.Configure_Reporting
+    read = foundation.GeneralCommand.Read_Reporting_Configuration
+
+    def request(*args, **kwargs):
+        if args[1] == read:
+            return _read_reporting_response(manu_cluster)
+        return _reporting_success()
+
+    with mock.patch("zigpy.zcl.Cluster.request", side_effect=request) as request_mock:
+        await manu_cluster.configure_reporting_all()
+
+    assert {call.args[1] for call in request_mock.mock_calls} == {read}
+    read_attrs = [
+        record.attrid for call in request_mock.mock_calls for record in call.args[3]
+    ]
+    assert sorted(read_attrs) == sorted(manu_cluster.reporting_table)
+
+    def request(*args, **kwargs):
+        if args[1] == read:
+            return _read_reporting_response(manu_cluster, changed=[changed_attr])
+        return _reporting_success()
+
+    with mock.patch("zigpy.zcl.Cluster.request", side_effect=request) as request_mock:
+        await manu_cluster.configure_reporting_all()
+
+    configured = [
+        report.attrid
+        for call in request_mock.mock_calls
+        if call.args[1] == configure
+        for report in call.args[3]
+    ]
+    assert configured == [changed_attr]
+
+
+async def test_sinope_store(zigpy_device_from_v2_quirk, tmp_path):
+    """Test that the store is kept next to the zigpy database and writes batched."""
+    device = zigpy_device_from_v2_quirk(SINOPE, "RM3250ZB")
+    device.application.config = {CONF_DATABASE: str(tmp_path / "zigbee.db")}
+    store = SinopeStore()
+    doc = await store.async_device(device)
+    assert store.path == str(tmp_path / "sinope_store.json")
+
+    write = mock.Mock(wraps=store._write)
+    delay_patch = mock.patch("zhaquirks.sinope._sinope_common.STORE_SAVE_DELAY", 0.01)
+    with delay_patch, mock.patch.object(store, "_write", write):
+        doc["a"] = 1
+        await store.async_save()
+        doc["b"] = 2
+        await store.async_save()
+        write.assert_not_called()
+        await asyncio.sleep(0.05)
+        write.assert_called_once()
+
+        await store.async_flush()  # nothing changed
+        write.assert_called_once()
+
+    restarted_store = SinopeStore(store.path)
+    assert await restarted_store.async_device(device) == {"a": 1, "b": 2}
+
+
+async def test_sinope_reporting_unserializable(
+    zigpy_device_from_v2_quirk, sinope_store
+):
+    """Test that a record that cannot be sent is reported as failed."""
+    device = zigpy_device_from_v2_quirk(SINOPE, "RM3500ZB")
+    manu_cluster = device.endpoints[1].in_clusters[SINOPE_MANUFACTURER_CLUSTER_ID]
+    manu_cluster.manufacturer_id_override = 0x1234
+    attrs = manu_cluster.AttributeDefs
+    events = mock.MagicMock()
+    manu_cluster.add_listener(mock.Mock(spec=["zha_send_event"], zha_send_event=events))
+
+    with (
+        mock.patch.dict(
+            manu_cluster.MANUFACTURER_REPORTING,
+            {attrs.dev_status.id: (60, 86400, 1)},  # max_interval is an uint16
+        ),
+        mock.patch("zigpy.zcl.Cluster.request", mock.AsyncMock()) as request_mock,
+    ):
+        request_mock.return_value = _reporting_success()
+        await manu_cluster.configure_reporting_all()
+
+    sent = [
+        report.attrid for call in request_mock.mock_calls for report in call.args[3]
+    ]
+    assert attrs.dev_status.id not in sent
+    assert manu_cluster.reporting_state[attrs.dev_status.id] == ReportingState.FAILED
+    assert attrs.dev_status.name in events.call_args.args[1]["failed"]
+    assert {call.kwargs["manufacturer"] for call in request_mock.mock_calls} == {
+        0x1234
+    }
+
+
+async def test_sinope_reporting_state(zigpy_device_from_v2_quirk, sinope_store):
+    """Test that the reporting outcome of each attribute is persisted and exposed."""
+    device = zigpy_device_from_v2_quirk(SINOPE, "RM3500ZB")
+    manu_cluster = device.endpoints[1].in_clusters[SINOPE_MANUFACTURER_CLUSTER_ID]
+    attrs = manu_cluster.AttributeDefs
+
+    class Listener:
+        zha_send_event = mock.MagicMock()
+
+    cluster_listener = Listener()
+    manu_cluster.add_listener(cluster_listener)
+
+    def response(*args, **kwargs):
+        return [
+            [
+                foundation.ConfigureReportingResponseRecord(
+                    status=foundation.Status.UNSUPPORTED_ATTRIBUTE,
+                    direction=foundation.ReportingDirection.SendReports,
+                    attrid=attrs.cold_load_pickup_status.id,
+                ),
+                foundation.ConfigureReportingResponseRecord(
+                    status=foundation.Status.INVALID_VALUE,
+                    direction=foundation.ReportingDirection.SendReports,
+                    attrid=attrs.current_load.id,
+                ),
+            ]
+        ]
+
+    with mock.patch("zigpy.zcl.Cluster.request", side_effect=response) as request_mock:
+        await manu_cluster.configure_reporting_all()
+
+    sent = [
+        report.attrid for call in request_mock.mock_calls for report in call.args[3]
+    ]
+    assert sent.count(attrs.cold_load_pickup_status.id) == 1
+    assert sent.count(attrs.current_load.id) == 1 + REPORTING_RETRIES
+
+    state = manu_cluster.reporting_state
+    assert state[attrs.cold_load_pickup_status.id] == ReportingState.UNSUPPORTED
+    assert state[attrs.current_load.id] == ReportingState.FAILED
+    assert state[attrs.dev_status.id] == ReportingState.CONFIGURED
+    assert set(state) == set(manu_cluster.reporting_table)
+
+    assert cluster_listener.zha_send_event.call_count == 1
+    command, event_args = cluster_listener.zha_send_event.call_args.args
+    assert command == "reporting_state"
+    assert event_args["unsupported"] == [attrs.cold_load_pickup_status.name]
+    assert event_args["failed"] == [attrs.current_load.name]
+    assert attrs.dev_status.name in event_args["configured"]
+
+    await sinope_store.async_flush()
+    store = SinopeStore(sinope_store.path)
+    states = (await store.async_device(device))["reporting"][
+        f"1:0x{SINOPE_MANUFACTURER_CLUSTER_ID:04x}"
+    ]
+    assert states[f"0x{attrs.current_load.id:04x}"] == {
+        "state": "failed",
+        "config": list(manu_cluster.reporting_table[attrs.current_load.id]),
+    }
+    assert states[f"0x{attrs.cold_load_pickup_status.id:04x}"] == {
+        "state": "unsupported"
+    }
+
+    # unsupported attributes are never configured again, failed ones are
+    def request(*args, **kwargs):
+        if args[1] == foundation.GeneralCommand.Read_Reporting_Configuration:
+            return _read_reporting_response(manu_cluster)
+        return _reporting_success()
+
+    with mock.patch("zigpy.zcl.Cluster.request", side_effect=request) as request_mock:
+        await manu_cluster.configure_reporting_all()
+
+    configured = [
+        report.attrid
+        for call in request_mock.mock_calls
+        if call.args[1] == foundation.GeneralCommand.Configure_Reporting
+        for report in call.args[3]
+    ]
+    assert configured == [attrs.current_load.id]
+    assert manu_cluster.reporting_state[attrs.current_load.id] == (
+        ReportingState.CONFIGURED
+    )
+
+
+async def test_sinope_reporting_scheduler():
+    """Test that queued jobs are bounded and battery devices go first."""
+    scheduler = ReportingScheduler(2)
+    release = asyncio.Event()
+    order = []
+
+    async def blocker():
+        await release.wait()
+
+    def job(name):
+        async def run():
+            order.append(name)
+
+        return run
+
+    with mock.patch("zhaquirks.sinope._sinope_common.REPORTING_JOB_JITTER", 0):
+        tasks = [
+            asyncio.create_task(scheduler.run(ReportingScheduler.MAINS, blocker)),
+            asyncio.create_task(scheduler.run(ReportingScheduler.MAINS, blocker)),
+        ]
+        await asyncio.sleep(0.01)
+        tasks += [
+            asyncio.create_task(scheduler.run(ReportingScheduler.MAINS, job("m1"))),
+            asyncio.create_task(scheduler.run(ReportingScheduler.MAINS, job("m2"))),
+            asyncio.create_task(scheduler.run(ReportingScheduler.BATTERY, job("b"))),
+        ]
+        await asyncio.sleep(0.01)
+        assert scheduler.running == 2
+        assert scheduler.waiting == 3
+        assert order == []
+
+        release.set()
+        await asyncio.gather(*tasks)
+
+    assert order == ["b", "m1", "m2"]
+    assert scheduler.running == 0
+    assert scheduler.waiting == 0
+
+
+@pytest.mark.parametrize(
+    "model, battery",
+    [("WL4200", True), ("LM4110-ZB", True), ("VA4220ZB", True), ("TH1123ZB", False)],
+)
+def test_sinope_reporting_battery_powered(zigpy_device_from_v2_quirk, model, battery):
+    """Test the power source used to prioritize reporting configuration."""
+    device = zigpy_device_from_v2_quirk(SINOPE, model)
+    manu_cluster = device.endpoints[1].in_clusters[SINOPE_MANUFACTURER_CLUSTER_ID]
+
+    assert manu_cluster.battery_powered is battery
+
+
+def test_sinope_value_converter():
+    """Test the precomputed attribute converters."""
+
+    class Status(t.bitmap8):
+        Ok = 0x00
+        First = 0x01
+        Second = 0x02
+        Both = 0x03
+        Third = 0x08
+
+    converter = ValueConverter(Status, bitmap=True)
+
+    assert converter(None) is None
+    assert converter(Status.Ok) == "Ok"
+    assert converter(Status(0x03)) == "Both"
+    assert converter(0x0A) == "Second|Third"
+    assert converter(Status(0x14)) == "Other"
+    assert converter(0x13) == "Both|Other"
+    assert converter(0x1A) is converter(Status(0x1A)) == "Second|Third|Other"
+    assert converter.flags(0x0B) == ["First", "Second", "Third"]
+    assert converter(0xFF) == "First|Second|Third|Other"
+    assert converter.flag_converter("Third")(0x0A) is True
+    assert converter.flag_converter("Third")(0x02) is False
+    assert converter.flag_converter("Third")(None) is None
+
+    converter = ValueConverter({0x30: "Ok", 0x31: "Leak"})
+    assert converter(t.uint16_t(0x31)) == "Leak"
+    assert converter(t.uint16_t(0x33)) == "Unmapped(51)"
+    assert converter.flags(0x33) == []
+
+    class Level(t.enum8):
+        Low = 0x00
+        High = 0x01
+
+    class Limit(t.uint8_t):
+        Ok = 0x00
+        Reached = 0x01
+
+    for values in (Level, Limit):
+        converter = ValueConverter(values)
+        assert converter(values(1)) == converter(1)
+        assert converter(0xFF) == "Unmapped(255)"
+    assert ValueConverter(Limit).names == {0: "Ok", 1: "Reached"}
+
+
+@pytest.mark.parametrize(
+    "model, suffix, value, expected",
+    [
+        ("TH1123ZB", "status_floor_sensor", 0x60, True),
+        ("TH1123ZB", "status_temp_sensor", 0x20, False),
+        ("RM3500ZB", "dev_status_leak_cable", 0x41, True),
+        ("RM3500ZB", "dev_status_temp_cable", 0x40, False),
+        ("WL4210", "status_temp_sensor", 0x20, True),
+    ],
+)
+def test_sinope_status_flag_sensors(
+    zigpy_device_from_v2_quirk, model, suffix, value, expected
+):
+    """Test the disabled by default binary sensors of the device status flags."""
+    device = zigpy_device_from_v2_quirk(SINOPE, model)
+
+    entities = [
+        entity
+        for entities in device.exposes_metadata.values()
+        for entity in entities
+        if entity.unique_id_suffix == suffix
+    ]
+    assert len(entities) == 1
+    assert entities[0].initially_disabled
+    assert entities[0].attribute_converter(value) is expected
+
+
+def test_sinope_report_dedup(zigpy_device_from_v2_quirk):
+    """Test that repeated reports are dropped but heartbeats are forwarded."""
+    device = zigpy_device_from_v2_quirk(SINOPE, "TH1123ZB")
+    manu_cluster = device.endpoints[1].in_clusters[SINOPE_MANUFACTURER_CLUSTER_ID]
+    cluster_listener = ClusterListener(manu_cluster)
+    attrs = manu_cluster.AttributeDefs
+    temp_id = attrs.report_local_temperature.id
+    lock_id = attrs.keypad_lockout.id
+
+    window_patch = mock.patch("zhaquirks.sinope._sinope_common.DEDUP_WINDOW", 600)
+    time_patch = mock.patch("zhaquirks.sinope._sinope_common.time.monotonic")
+
+    with window_patch, time_patch as monotonic:
+        for now, attr_id, value in [
+            (0, temp_id, 2100),
+            (10, temp_id, 2100),  # dropped
+            (20, temp_id, 2150),
+            (30, temp_id, 2150),  # dropped
+            (30, lock_id, 0),
+            (40, lock_id, 0),  # not deduplicated
+            (20 + 300 * 0.9, temp_id, 2150),  # heartbeat
+        ]:
+            monotonic.return_value = now
+            manu_cluster.update_attribute(attr_id, value)
+
+    assert cluster_listener.attribute_updates == [
+        (temp_id, 2100),
+        (temp_id, 2150),
+        (lock_id, 0),
+        (lock_id, 0),
+        (temp_id, 2150),
+    ]
+
+    # disabled by default
+    manu_cluster.update_attribute(temp_id, 2150)
+    assert len(cluster_listener.attribute_updates) == 6
+
+
+def _write_record(attr_def, value) -> bytes:
+    return foundation.GENERAL_COMMANDS[
+        foundation.GeneralCommand.Write_Attributes_No_Response
+    ].schema(
+        [
+            foundation.Attribute(
+                attr_def.id,
+                foundation.TypeValue(attr_def.zcl_type, attr_def.type(value)),
+            )
+        ]
+    ).serialize()
+
+
+async def test_sinope_outdoor_temp_group_write(zigpy_device_from_v2_quirk):
+    """Test that the outdoor temperature is multicast to the thermostats group."""
+    thermostats = [
+        zigpy_device_from_v2_quirk(SINOPE, "TH1123ZB", ieee="01:2d:6f:00:0a:90:69:e8"),
+        zigpy_device_from_v2_quirk(SINOPE, "TH1124ZB", ieee="01:2d:6f:00:0a:90:69:e9"),
+    ]
+    app = thermostats[0].application
+    app.get_endpoint_id = mock.MagicMock(return_value=1)
+    app.groups = zigpy.group.Groups(app)
+    group = app.groups.add_group(0x0ABC, "Thermostats")
+    for device in thermostats:
+        group.add_member(device.endpoints[1])
+    manu_clusters = [
+        device.endpoints[1].in_clusters[SINOPE_MANUFACTURER_CLUSTER_ID]
+        for device in thermostats
+    ]
+    outdoor_temp = manu_clusters[0].AttributeDefs.outdoor_temp
+
+    def _writes():
+        return [
+            call.args[0]
+            for call in app.send_packet.mock_calls
+            if call.args[0].dst.addr_mode == t.AddrMode.Group
+        ]
+
+    # not configured, the thermostat is written directly
+    with mock.patch.object(manu_clusters[0], "request", mock.AsyncMock()) as request:
+        await manu_clusters[0].write_attributes({"outdoor_temp": 250})
+    assert request.await_count == 1
+    assert _writes() == []
+
+    group_patch = mock.patch(
+        "zhaquirks.sinope.thermostat.OUTDOOR_TEMP_GROUP_ID", 0x0ABC
+    )
+    time_patch = mock.patch("zhaquirks.sinope._sinope_common.time.monotonic")
+
+    with group_patch, time_patch as monotonic:
+        monotonic.return_value = 1000
+        result = await manu_clusters[0].write_attributes({"outdoor_temp": -1250})
+        assert result[0][0].status == foundation.Status.SUCCESS
+
+        packets = _writes()
+        assert len(packets) == 1
+        assert packets[0].dst.address == 0x0ABC
+        hdr, args = foundation.ZCLHeader.deserialize(packets[0].data.serialize())
+        assert hdr.command_id == foundation.GeneralCommand.Write_Attributes_No_Response
+        assert hdr.manufacturer == thermostats[0].manufacturer_id
+        for cluster in manu_clusters:
+            assert cluster.get(outdoor_temp.id) == -1250
+        await asyncio.sleep(0)  # the refresh task waits for OUTDOOR_TEMP_REFRESH
+
+        # below the threshold, the thermostats keep the value sent
+        monotonic.return_value = 2000
+        await manu_clusters[1].write_attributes({outdoor_temp.id: -1240})
+        assert len(_writes()) == 1
+        assert manu_clusters[1].get(outdoor_temp.id) == -1250
+
+        # rate limited, only the latest value is sent
+        with mock.patch("zhaquirks.sinope._sinope_common.asyncio.sleep", mock.AsyncMock()):
+            await manu_clusters[0].write_attributes({"outdoor_temp": -500})
+            await manu_clusters[0].write_attributes({"outdoor_temp": 250})
+            await manu_clusters[0].write_attributes({"outdoor_temp": 0})
+            assert len(_writes()) == 2
+            assert manu_clusters[0].get(outdoor_temp.id) == -500
+            await outdoor_temp_writer._states[app][0x0ABC].task
+        assert len(_writes()) == 3
+        for cluster in manu_clusters:
+            assert cluster.get(outdoor_temp.id) == 0
+    outdoor_temp_writer._states[app][0x0ABC].refresh.cancel()
+
+    # the latest value is sent again until the group is removed
+    app.groups.add_group(0x0ABD, "Refreshed").add_member(thermostats[1].endpoints[1])
+    with (
+        mock.patch("zhaquirks.sinope.thermostat.OUTDOOR_TEMP_GROUP_ID", 0x0ABD),
+        mock.patch.object(outdoor_temp_writer, "refresh", 0.02),
+    ):
+        await manu_clusters[1].write_attributes({"outdoor_temp": 500})
+        await manu_clusters[1].write_attributes({"outdoor_temp": 510})
+        await asyncio.sleep(0.05)
+        app.groups.pop(0x0ABD)
+        await outdoor_temp_writer._states[app][0x0ABD].refresh
+    refreshed = [packet for packet in _writes() if packet.dst.address == 0x0ABD]
+    assert len(refreshed) >= 2
+    for packet in refreshed[1:]:
+        _, data = foundation.ZCLHeader.deserialize(packet.data.serialize())
+        assert data == _write_record(outdoor_temp, 510)
+    assert manu_clusters[1].get(outdoor_temp.id) == 510
+
+
+async def test_sinope_display_pusher(zigpy_device_from_v2_quirk):
+    """Test that display values are only written on change and kept alive."""
+    device = zigpy_device_from_v2_quirk(SINOPE, "TH1123ZB")
+    device.application.devices = {device.ieee: device}
+    manu_cluster = device.endpoints[1].in_clusters[SINOPE_MANUFACTURER_CLUSTER_ID]
+    attrs = manu_cluster.AttributeDefs
+    manu_cluster._update_attribute(attrs.outdoor_temp_timeout.id, 7200)
+    icon = manu_cluster.WeatherIcon
+    delays = []
+
+    async def _sleep(delay):
+        delays.append(delay)
+        if delays.count(delay) > 1:
+            raise asyncio.CancelledError
+
+    def _written(request):
+        return [
+            (attr.attrid, attr.value.value)
+            for call in request.mock_calls
+            for attr in call.args[3]
+        ]
+
+    success = [[foundation.WriteAttributesStatusRecord(foundation.Status.SUCCESS)]]
+    request_patch = mock.patch.object(
+        manu_cluster, "request", mock.AsyncMock(return_value=success)
+    )
+    with request_patch as request, mock.patch(
+        "zhaquirks.sinope._sinope_common.asyncio.sleep", _sleep
+    ):
+        for attribute, value in [
+            ("outdoor_temp", 1234),
+            ("outdoor_temp", 1240),  # same once rounded
+            ("outdoor_temp", 1290),
+            ("weather_icons", icon.Sun),
+            ("weather_icons", icon.Sun),
+        ]:
+            result = await manu_cluster.write_attributes({attribute: value})
+            assert result[0][0].status == foundation.Status.SUCCESS
+            assert manu_cluster.get(attribute) == value  # skipped writes too
+
+        # the exact value is written, rounding only detects changes
+        assert _written(request) == [
+            (attrs.outdoor_temp.id, 1234),
+            (attrs.outdoor_temp.id, 1290),
+            (attrs.weather_icons.id, icon.Sun),
+        ]
+        assert manu_cluster.get(attrs.outdoor_temp.id) == 1290
+
+        # refreshed before the timeout, unknown timeouts use the default
+        request.reset_mock()
+        for task in list(manu_cluster.display_pusher._tasks.values()):
+            with pytest.raises(asyncio.CancelledError):
+                await task
+        assert sorted(_written(request)) == [
+            (attrs.outdoor_temp.id, 1290),
+            (attrs.weather_icons.id, icon.Sun),
+        ]
+        assert sorted(set(delays)) == [3600 - 300, 7200 - 300]
+
+        # the keep-alive stops once the device is removed from the network
+        delays.clear()
+        await manu_cluster.write_attributes({"outdoor_temp": 1500})
+        device.application.devices = {}
+        await manu_cluster.display_pusher._tasks[attrs.outdoor_temp.id]
+        assert _written(request)[-1] == (attrs.outdoor_temp.id, 1500)
+    await asyncio.sleep(0)
+    assert not manu_cluster.display_pusher._tasks
+
+    # and is cancelled with the tasks of the device
+    with request_patch:
+        await manu_cluster.write_attributes({"outdoor_temp": 1600})
+    task = manu_cluster.display_pusher._tasks[attrs.outdoor_temp.id]
+    device.on_remove()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+
+async def test_sinope_clock_sync(zigpy_device_from_v2_quirk):
+    """Test that the device clock is only set when it drifted too much."""
+    device = zigpy_device_from_v2_quirk(SINOPE, "TH1123ZB")
+    manu_cluster = device.endpoints[1].in_clusters[SINOPE_MANUFACTURER_CLUSTER_ID]
+    clock_id = manu_cluster.AttributeDefs.secs_since_2k.id
+
+    class Listener:
+        zha_send_event = mock.MagicMock()
+
+    cluster_listener = Listener()
+    manu_cluster.add_listener(cluster_listener)
+
+    read_patch = mock.patch.object(manu_cluster, "read_attributes", mock.AsyncMock())
+    write_patch = mock.patch.object(manu_cluster, "write_attributes", mock.AsyncMock())
+    clock_patch = mock.patch(
+        "zhaquirks.sinope._sinope_common.secs_since_2k", return_value=800_000_000
+    )
+    with read_patch as read, write_patch as write, clock_patch:
+        read.return_value = ({clock_id: 800_000_010}, {})
+        assert await manu_cluster.sync_clock() == pytest.approx(10, abs=1)
+        assert write.await_count == 0
+
+        read.return_value = ({clock_id: 799_999_900}, {})
+        assert await manu_cluster.sync_clock() == pytest.approx(-100, abs=1)
+        write.assert_awaited_once_with({clock_id: 800_000_000})
+
+        read.return_value = ({}, {clock_id: foundation.Status.FAILURE})
+        assert await manu_cluster.sync_clock() is None
+
+    stats = manu_cluster.clock_stats
+    assert (stats.syncs, stats.corrections) == (2, 1)
+    assert stats.max_drift == pytest.approx(100, abs=1)
+    assert cluster_listener.zha_send_event.call_count == 2
+    assert cluster_listener.zha_send_event.call_args[0][0] == "clock_drift"
+    assert cluster_listener.zha_send_event.call_args[0][1]["corrections"] == 1
+
+
+async def test_sinope_clock_sync_after_announce(zigpy_device_from_v2_quirk):
+    """Test that a device announcing itself again gets its clock synced."""
+    device = zigpy_device_from_v2_quirk(SINOPE, "TH1123ZB")
+    manu_cluster = device.endpoints[1].in_clusters[SINOPE_MANUFACTURER_CLUSTER_ID]
+
+    sleep = mock.AsyncMock(side_effect=[None, asyncio.CancelledError()])
+    sync_patch = mock.patch.object(manu_cluster, "sync_clock", mock.AsyncMock())
+    with sync_patch as sync_clock, mock.patch(
+        "zhaquirks.sinope._sinope_common.asyncio.sleep", sleep
+    ):
+        device.zdo.handle_device_annce(None, device.nwk, device.ieee, 0)
+        with pytest.raises(asyncio.CancelledError):
+            await manu_cluster._clock_task
+
+    assert sync_clock.await_count == 1
+    first_delay, next_delay = (call.args[0] for call in sleep.mock_calls)
+    assert 0 <= first_delay <= 600
+    assert 86400 <= next_delay <= 86400 + 600
+
+
+def _read_response(cluster, values):
+    return [
+        [
+            foundation.ReadAttributeRecord(
+                attrid=attr_id,
+                status=foundation.Status.SUCCESS,
+                value=foundation.TypeValue(
+                    cluster.attributes[attr_id].zcl_type,
+                    cluster.attributes[attr_id].type(value),
+                ),
+            )
+            for attr_id, value in values.items()
+        ]
+    ]
+
+
+async def test_sinope_attribute_snapshot(zigpy_device_from_v2_quirk, sinope_store):
+    """Test that slow changing attributes are served from the persisted snapshot."""
+    device = zigpy_device_from_v2_quirk(SINOPE, "TH1123ZB")
+    manu_cluster = device.endpoints[1].in_clusters[SINOPE_MANUFACTURER_CLUSTER_ID]
+    attrs = manu_cluster.AttributeDefs
+    names = ["connected_load", "cycle_length", "setpoint"]
+    values = {
+        attrs.connected_load.id: 1500,
+        attrs.cycle_length.id: 900,
+        attrs.setpoint.id: 2100,
+    }
+
+    async def _read_raw(attr_ids, *args, **kwargs):
+        return _read_response(manu_cluster, {i: values[i] for i in attr_ids})
+
+    with mock.patch.object(manu_cluster, "read_attributes_raw", _read_raw):
+        success, failure = await manu_cluster.read_attributes(names)
+    assert success == dict(zip(names, [1500, 900, 2100]))
+    assert not failure
+
+    # after a restart only the live attribute is read from the device
+    await sinope_store.async_flush()
+    restarted_store = SinopeStore(sinope_store.path)
+    device = zigpy_device_from_v2_quirk(SINOPE, "TH1123ZB")
+    manu_cluster = device.endpoints[1].in_clusters[SINOPE_MANUFACTURER_CLUSTER_ID]
+    read_raw = mock.AsyncMock(side_effect=_read_raw)
+    store_patch = mock.patch("zhaquirks.sinope._sinope_common.STORE", restarted_store)
+    update_spy = mock.patch.object(
+        LoadSheddingMixin,
+        "_update_attribute",
+        autospec=True,
+        side_effect=LoadSheddingMixin._update_attribute,
+    )
+    with store_patch, mock.patch.object(manu_cluster, "read_attributes_raw", read_raw):
+        with update_spy as update:
+            success, _ = await manu_cluster.read_attributes(names, allow_cache=True)
+        assert success == dict(zip(names, [1500, 900, 2100]))
+        read_raw.assert_awaited_once_with([attrs.setpoint.id], manufacturer=None)
+        assert manu_cluster.get(attrs.cycle_length.id) == manu_cluster.CycleLength(900)
+        # the mixins before the snapshot in the MRO see the values it serves
+        assert mock.call(manu_cluster, attrs.connected_load.id, 1500) in (
+            update.mock_calls
+        )
+
+        # an explicit refresh always reads the device
+        read_raw.reset_mock()
+        success, _ = await manu_cluster.read_attributes(names[:2])
+        assert success == dict(zip(names, [1500, 900]))
+        read_raw.assert_awaited_once_with(
+            [attrs.connected_load.id, attrs.cycle_length.id], manufacturer=None
+        )
+
+        # expired values are still served but refreshed in the background
+        read_raw.reset_mock()
+        values[attrs.connected_load.id] = 2000
+        now = time.time() + 2 * 86400
+        with mock.patch("zhaquirks.sinope._sinope_common.time.time", return_value=now):
+            success, _ = await manu_cluster.read_attributes(names[:2], allow_cache=True)
+            assert success == dict(zip(names, [1500, 900]))
+            await manu_cluster._snapshot_refresh
+        assert read_raw.mock_calls == [
+            mock.call(
+                [attrs.connected_load.id, attrs.cycle_length.id], manufacturer=None
+            )
+        ]
+        assert manu_cluster.get(attrs.connected_load.id) == 2000
+
+        # reported values update the snapshot
+        manu_cluster.update_attribute(attrs.cycle_length.id, 600)
+        await manu_cluster._snapshot_save
+    await restarted_store.async_flush()
+    snapshot = SinopeStore(sinope_store.path)
+    doc = await snapshot.async_device(device)
+    assert doc["snapshot"]["1:0xff01"] == {
+        "0x0119": [2000, now],
+        "0x0281": [600, mock.ANY],
+    }
+
+
+async def test_sinope_attribute_volatility(zigpy_device_from_v2_quirk):
+    """Test that static attributes are only read again after a firmware update."""
+    device = zigpy_device_from_v2_quirk(SINOPE, "TH1300ZB")
+    basic = device.endpoints[1].add_input_cluster(Basic.cluster_id)
+    manu_cluster = device.endpoints[1].in_clusters[SINOPE_MANUFACTURER_CLUSTER_ID]
+    attrs = manu_cluster.AttributeDefs
+    assert manu_cluster.volatility(attrs.firmware_number.id) == Volatility.STATIC
+    assert manu_cluster.volatility(attrs.cycle_length.id) == Volatility.CONFIG
+    assert manu_cluster.volatility(attrs.floor_temperature.id) == Volatility.TELEMETRY
+
+    names = ["firmware_number", "connected_load", "floor_temperature"]
+    values = {
+        attrs.firmware_number.id: 12,
+        attrs.connected_load.id: 1500,
+        attrs.floor_temperature.id: 2400,
+    }
+
+    async def _read_raw(attr_ids, *args, **kwargs):
+        return _read_response(manu_cluster, {i: values[i] for i in attr_ids})
+
+    read_raw = mock.AsyncMock(side_effect=_read_raw)
+    with mock.patch.object(manu_cluster, "read_attributes_raw", read_raw):
+        basic.update_attribute(Basic.AttributeDefs.sw_build_id.id, "1.0.2")
+        await manu_cluster.read_attributes(names)
+        read_raw.reset_mock()
+
+        # static values are kept years later, telemetry is left to the zigpy cache
+        with mock.patch(
+            "zhaquirks.sinope._sinope_common.time.time", return_value=time.time() + 1e8
+        ):
+            await manu_cluster.read_attributes(names[::2], allow_cache=True)
+        read_raw.assert_not_awaited()
+        assert manu_cluster._snapshot.keys() >= {f"0x{attrs.firmware_number.id:04x}"}
+        assert f"0x{attrs.floor_temperature.id:04x}" not in manu_cluster._snapshot
+
+        # a new firmware version invalidates the static values only
+        values[attrs.firmware_number.id] = 13
+        basic.update_attribute(Basic.AttributeDefs.sw_build_id.id, "1.1.0")
+        success, _ = await manu_cluster.read_attributes(names[:2], allow_cache=True)
+        read_raw.assert_awaited_once_with([attrs.firmware_number.id], manufacturer=None)
+        assert success == {"firmware_number": 13, "connected_load": 1500}
+
+    # static attributes are never reported
+    volatility_patch = mock.patch.dict(
+        manu_cluster.ATTRIBUTE_VOLATILITY,
+        {attrs.keypad_lockout.id: Volatility.STATIC},
+    )
+    assert attrs.keypad_lockout.id in manu_cluster.reporting_table
+    with volatility_patch:
+        assert attrs.keypad_lockout.id not in manu_cluster.reporting_table
+
+
+async def test_sinope_read_attributes_bulk(zigpy_device_from_v2_quirk):
+    """Test that attributes are read in a few frames and failures are reported."""
+    device = zigpy_device_from_v2_quirk(SINOPE, "TH1300ZB")
+    manu_cluster = device.endpoints[1].in_clusters[SINOPE_MANUFACTURER_CLUSTER_ID]
+    attrs = manu_cluster.AttributeDefs
+    names = [
+        attr_def.name
+        for attr_def in manu_cluster.attributes.values()
+        if hasattr(attr_def.type, "_size")  # fixed size values
+    ]
+
+    async def _read_raw(attr_ids, manufacturer=None, **kwargs):
+        if attrs.setpoint.id in attr_ids:
+            raise asyncio.TimeoutError
+        records = _read_response(
+            manu_cluster,
+            {
+                attr_id: 0
+                for attr_id in attr_ids
+                if attr_id not in (attrs.gfci_status.id, attrs.floor_temperature.id)
+            },
+        )
+        records[0].append(
+            foundation.ReadAttributeRecord(
+                attrid=attrs.gfci_status.id,
+                status=foundation.Status.UNSUPPORTED_ATTRIBUTE,
+            )
+        )
+        return records
+
+    read_raw = mock.AsyncMock(side_effect=_read_raw)
+    with mock.patch.object(manu_cluster, "read_attributes_raw", read_raw):
+        success, failure = await manu_cluster.read_attributes_bulk(names)
+
+    requested = [attr_id for call in read_raw.mock_calls for attr_id in call.args[0]]
+    assert sorted(requested) == sorted(manu_cluster.find_attribute(n).id for n in names)
+    assert read_raw.await_count <= len(requested) / 6
+    for call in read_raw.mock_calls:
+        specific = {
+            manu_cluster.attributes[attr_id].is_manufacturer_specific
+            for attr_id in call.args[0]
+        }
+        assert len(specific) == 1
+
+    timed_out = next(
+        call.args[0]
+        for call in read_raw.mock_calls
+        if attrs.setpoint.id in call.args[0]
+    )
+    assert {name for name, status in failure.items()} == {
+        attrs.gfci_status.name,
+        attrs.floor_temperature.name,
+        *(manu_cluster.attributes[attr_id].name for attr_id in timed_out),
+    }
+    assert failure[attrs.gfci_status.name] == foundation.Status.UNSUPPORTED_ATTRIBUTE
+    assert failure[attrs.setpoint.name] == foundation.Status.FAILURE
+    assert attrs.gfci_status.id in manu_cluster.unsupported_attributes
+    assert success[attrs.keypad_lockout.name] == manu_cluster.KeypadLock(0)
+    assert len(success) + len(failure) == len(names)
+
+
+@pytest.mark.parametrize(
+    "model, present, absent",
+    (
+        ("TH1123ZB", ("current_load",), ("floor_temperature", "gfci_status")),
+        ("TH1400ZB", ("floor_temperature", "pump_protection_status"), ("gfci_status",)),
+        ("TH1134ZB-HC", ("balance_point", "display_language"), ("floor_limit_status",)),
+        ("HP6000ZB-GE", ("cool_lockout_temperature",), ("current_load",)),
+    ),
+)
+async def test_sinope_model_capabilities(
+    zigpy_device_from_v2_quirk, model, present, absent
+):
+    """Test that only the attributes of the model capabilities are exposed."""
+    device = zigpy_device_from_v2_quirk(SINOPE, model)
+    manu_cluster = device.endpoints[1].in_clusters[SINOPE_MANUFACTURER_CLUSTER_ID]
+
+    for name in present:
+        assert name in manu_cluster.attributes_by_name
+    for name in absent:
+        attr_def = getattr(manu_cluster.AttributeDefs, name)
+        assert name not in manu_cluster.attributes_by_name
+        assert attr_def.id not in manu_cluster.attributes
+        with pytest.raises(KeyError):
+            manu_cluster.find_attribute(name)
+    assert set(manu_cluster.reporting_table) <= set(manu_cluster.attributes)
+
+    # clusters of the same model share their attributes
+    other = zigpy_device_from_v2_quirk(SINOPE, model, ieee="01:02:03:04:05:06:07:08")
+    other_cluster = other.endpoints[1].in_clusters[SINOPE_MANUFACTURER_CLUSTER_ID]
+    assert other_cluster.attributes is manu_cluster.attributes
+
+
+async def test_sinope_discover_attributes(zigpy_device_from_v2_quirk, sinope_store):
+    """Test that discovered attributes are profiled against the AttributeDefs."""
+    device = zigpy_device_from_v2_quirk(SINOPE, "TH1123ZB")
+    manu_cluster = device.endpoints[1].in_clusters[SINOPE_MANUFACTURER_CLUSTER_ID]
+    attrs = manu_cluster.AttributeDefs
+    acl = foundation.AttributeAccessControl
+    discover_rsp = foundation.GENERAL_COMMANDS[
+        foundation.GeneralCommand.Discover_Attribute_Extended_rsp
+    ].schema
+
+    def _record(attr_id, datatype, access):
+        return foundation.DiscoverAttributesExtendedResponseRecord(
+            attrid=attr_id, datatype=datatype, acl=access
+        )
+
+    pages = [
+        discover_rsp(
+            discovery_complete=t.Bool.false,
+            extended_attr_info=[
+                _record(
+                    attrs.keypad_lockout.id, 0x30, acl.READ | acl.WRITE | acl.REPORT
+                ),
+                _record(attrs.firmware_number.id, 0x22, acl.READ),  # not uint16
+            ],
+        ),
+        discover_rsp(
+            discovery_complete=t.Bool.true,
+            extended_attr_info=[_record(0x0123, 0x20, acl.READ)],
+        ),
+    ]
+    general_command = mock.AsyncMock(side_effect=pages)
+
+    async def _read_raw(attr_ids, manufacturer=None, **kwargs):
+        return _read_response(manu_cluster, {attr_id: 1 for attr_id in attr_ids})
+
+    async def _configure(records, manufacturer=None):
+        manu_cluster._update_attribute(attrs.keypad_lockout.id, 0)
+        return [[foundation.ConfigureReportingResponseRecord()]]
+
+    configure = mock.AsyncMock(side_effect=_configure)
+    with (
+        mock.patch.object(manu_cluster, "general_command", general_command),
+        mock.patch.object(manu_cluster, "read_attributes_raw", _read_raw),
+        mock.patch.object(manu_cluster, "_configure_reporting", configure),
+    ):
+        attribute_map = await manu_cluster.discover_attributes(sample_time=0.01)
+
+    starts = [call.args[1] for call in general_command.mock_calls]
+    assert starts == [0, attrs.firmware_number.id + 1]
+    assert attribute_map["model"] == "TH1123ZB"
+    assert attribute_map["undefined"] == ["0x0123"]
+    assert attrs.setpoint.name in attribute_map["missing"]
+    assert attrs.keypad_lockout.name not in attribute_map["missing"]
+    assert attribute_map["type_mismatch"] == {
+        attrs.firmware_number.name: ["0x21", "0x22"]
+    }
+    keypad = attribute_map["attributes"][f"0x{attrs.keypad_lockout.id:04x}"]
+    assert keypad == {
+        "name": attrs.keypad_lockout.name,
+        "type": "0x30",
+        "access": "rwp",
+        "values": [1, 0],
+    }
+    assert attribute_map["attributes"]["0x0123"]["name"] is None
+
+    # reporting is sampled, then put back to the reporting table
+    sampled, restored = (call.args[0] for call in configure.mock_calls)
+    assert [(r.attrid, r.min_interval, r.max_interval) for r in sampled] == [
+        (attrs.keypad_lockout.id, 10, 300)
+    ]
+    assert [r.attrid for r in restored] == [attrs.keypad_lockout.id]
+
+    doc = await sinope_store.async_device(device)
+    assert doc["discovery"] == attribute_map
+
+
 async def test_sinope_light_device_triggers_def(zigpy_device_from_v2_quirk):
     """Test device automation triggers.
 
@@ -264,9 +1583,10 @@ async def test_sinope_light_device_triggers_def(zigpy_device_from_v2_quirk):
             assert type(val) is int, type(val)
 
 
-async def test_sinope_device_current_sum(zigpy_device_from_v2_quirk):
+async def test_sinope_device_current_sum(zigpy_device_from_v2_quirk, sinope_store):
     """Test that device current_summation_delivered is divided by 100."""
     device = zigpy_device_from_v2_quirk(SINOPE, "SW2500ZB")
+    await sinope_store.async_device(device)  # counter offsets are loaded
 
     dev_summ_cluster = device.endpoints[1].sinope_manufacturer_specific
     dev_summ_listener = ClusterListener(dev_summ_cluster)
@@ -286,6 +1606,498 @@ async def test_sinope_device_current_sum(zigpy_device_from_v2_quirk):
     assert dev_summ_listener.attribute_updates[1][1] == 2500  # not modified
 
 
+async def test_sinope_energy_accumulator(zigpy_device_from_v2_quirk, sinope_store):
+    """Test that energy counter resets and rollovers keep the total increasing."""
+    device = zigpy_device_from_v2_quirk(SINOPE, "RM3250ZB")
+    manu_cluster = device.endpoints[1].in_clusters[SINOPE_MANUFACTURER_CLUSTER_ID]
+    attr_id = manu_cluster.AttributeDefs.current_summation_delivered.id
+    listener = ClusterListener(manu_cluster)
+    events = mock.MagicMock()
+    manu_cluster.add_listener(mock.Mock(spec=["zha_send_event"], zha_send_event=events))
+
+    # reports are held until the counter offsets are loaded
+    manu_cluster.update_attribute(attr_id, 1000)
+    assert not listener.attribute_updates
+    await manu_cluster._energy_load
+
+    with mock.patch("zhaquirks.sinope._sinope_common.ENERGY_DELTA_INTERVAL", 0):
+        for value in (1500, 200, 2**32 - 100, 50):  # reset, then rollover
+            manu_cluster.update_attribute(attr_id, value)
+    totals = [value for _, value in listener.attribute_updates]
+    assert totals == [1000, 1500, 1700, 2**32 + 1400, 2**32 + 1550]
+    deltas = [call.args[1]["delta"] for call in events.mock_calls]
+    assert deltas == [500, 200, 2**32 - 300, 150]
+    assert events.mock_calls[-1].args == (
+        "energy_delta",
+        {
+            "attribute": "current_summation_delivered",
+            "delta": 150,
+            "total": 2**32 + 1550,
+            "interval": 0,
+        },
+    )
+
+    # the offset survives a restart
+    await manu_cluster._energy_save
+    await sinope_store.async_flush()
+    restarted_store = SinopeStore(sinope_store.path)
+    await restarted_store.async_device(device)
+    device = zigpy_device_from_v2_quirk(SINOPE, "RM3250ZB")
+    manu_cluster = device.endpoints[1].in_clusters[SINOPE_MANUFACTURER_CLUSTER_ID]
+    listener = ClusterListener(manu_cluster)
+    with mock.patch("zhaquirks.sinope._sinope_common.STORE", restarted_store):
+        manu_cluster.update_attribute(attr_id, 80)
+    assert listener.attribute_updates == [(attr_id, 2**32 + 1580)]
+
+
+async def test_sinope_demand_response(zigpy_device_from_v2_quirk):
+    """Test that a demand response event is rolled out and restored."""
+    devices = [
+        zigpy_device_from_v2_quirk(SINOPE, model, ieee=f"01:02:03:04:05:06:07:0{i}")
+        for i, model in enumerate(("TH1123ZB", "RM3500ZB", "SP2600ZB", "TH1300ZB"))
+    ]
+    clusters = [
+        device.endpoints[1].in_clusters[SINOPE_MANUFACTURER_CLUSTER_ID]
+        for device in devices
+    ]
+    written = []
+
+    def _simulate(cluster, ignored):
+        state = {}
+
+        async def _write(records, manufacturer=None, **kwargs):
+            written.append(cluster.endpoint.device.model)
+            for record in records:
+                if ignored and record.attrid in ignored:
+                    ignored.remove(record.attrid)
+                else:
+                    state[record.attrid] = record.value.value
+            return [[foundation.WriteAttributesStatusRecord(foundation.Status.SUCCESS)]]
+
+        async def _read_raw(attr_ids, manufacturer=None, **kwargs):
+            return _read_response(
+                cluster, {attr_id: state.get(attr_id, 50) for attr_id in attr_ids}
+            )
+
+        return (
+            mock.patch.object(cluster, "_write_attributes", _write),
+            mock.patch.object(cluster, "read_attributes_raw", _read_raw),
+        )
+
+    heater = clusters[1]
+    wt_time_on = heater.AttributeDefs.dr_wt_time_on.id
+    patches = [
+        patch
+        for cluster in clusters
+        for patch in _simulate(cluster, {wt_time_on} if cluster is heater else None)
+    ]
+    for patch in patches:
+        patch.start()
+    events = mock.MagicMock()
+    clusters[0].add_listener(mock.Mock(spec=["zha_send_event"], zha_send_event=events))
+
+    settings = {
+        "eco_max_pi_heating_demand": 75,
+        "dr_config_water_temp_min": 45,
+        "dr_wt_time_on": 120,
+    }
+    campaign = DemandResponseCampaign(clusters, 0, 0, settings)
+    with mock.patch("zhaquirks.sinope._sinope_common.DR_STAGGER", 0.001):
+        results = await campaign.apply()
+
+    # the water heater goes first, the plug does not take part
+    assert written[0] == "RM3500ZB"
+    assert "SP2600ZB" not in written
+    assert results[f"{devices[1].ieee}:1"] == {
+        "confirmed": ["dr_config_water_temp_min", "dr_wt_time_on"],
+        "failed": [],
+    }
+    assert written.count("RM3500ZB") == 2  # dr_wt_time_on was written again
+    assert results[f"{devices[0].ieee}:1"] == {
+        "confirmed": ["eco_delta_setpoint", "eco_max_pi_heating_demand"],
+        "failed": [],
+    }
+    assert clusters[0].get("eco_delta_setpoint") == 0  # DR logo shown
+    assert clusters[3].get("eco_max_pi_heating_demand") == 75
+    assert events.mock_calls[-1].args == (
+        "demand_response",
+        {
+            "state": "applied",
+            "confirmed": ["eco_delta_setpoint", "eco_max_pi_heating_demand"],
+            "failed": [],
+        },
+    )
+
+    await campaign.restore()
+    for patch in patches:
+        patch.stop()
+    assert clusters[0].get("eco_delta_setpoint") == -128  # DR logo stopped
+    assert clusters[0].get("eco_max_pi_heating_demand") == 50  # value read before
+    assert heater.get("dr_config_water_temp_min") == 50
+    assert events.mock_calls[-1].args[1]["state"] == "restored"
+
+
+def test_sinope_load_manager():
+    """Test that the load manager keeps the site under its ceiling in turn."""
+    manager = LoadManager(simulate=True)
+    for key in "abcd":
+        manager.update(key, watts=4000, drawing=True)
+    manager.update("e", watts=4000, drawing=False)
+    assert manager.tick(0) == []  # no ceiling
+
+    manager.ceiling = 10
+    changes = manager.tick(0)
+    assert [(entry.key, shed) for entry, shed in changes] == [
+        ("a", True),
+        ("b", True),
+    ]
+    assert manager.load == 8000
+    assert manager.tick(60) == []  # a shed device does not fit under the margin
+
+    # the shed devices are turned back on in turn
+    changes = manager.tick(900)
+    assert [(entry.key, shed) for entry, shed in changes] == [
+        ("a", False),
+        ("b", False),
+        ("c", True),
+        ("d", True),
+    ]
+    assert {key for key, row in manager.table.items() if row["shed"]} == {"c", "d"}
+    assert len(manager.history) == 6
+
+    # enough room to turn a device back on before its turn
+    manager.update("a", drawing=False)
+    changes = manager.tick(960)
+    assert [(entry.key, shed) for entry, shed in changes] == [("c", False)]
+
+
+async def test_sinope_load_shedding(zigpy_device_from_v2_quirk, sinope_store):
+    """Test that thermostats are fed to the load manager and shed."""
+    manager = LoadManager()
+    device = zigpy_device_from_v2_quirk(SINOPE, "TH1123ZB")
+    manu_cluster = device.endpoints[1].in_clusters[SINOPE_MANUFACTURER_CLUSTER_ID]
+    thermostat = device.endpoints[1].thermostat
+    cycle = thermostat.AttributeDefs.main_cycle_output
+    thermostat.update_attribute(cycle.id, CycleOutput.Min_15)
+    events = mock.MagicMock()
+    manu_cluster.add_listener(mock.Mock(spec=["zha_send_event"], zha_send_event=events))
+    write = mock.AsyncMock(
+        return_value=[
+            [foundation.WriteAttributesStatusRecord(foundation.Status.SUCCESS)]
+        ]
+    )
+
+    with (
+        mock.patch("zhaquirks.sinope._sinope_common.LOAD_MANAGER", manager),
+        mock.patch.object(thermostat, "_write_attributes", write),
+    ):
+        attrs = manu_cluster.AttributeDefs
+        manu_cluster.update_attribute(attrs.connected_load.id, 2500)
+        manu_cluster.update_attribute(attrs.current_load.id, 1)
+        assert manager.table == {
+            (str(device.ieee), 1): {"watts": 2500, "drawing": True, "shed": False}
+        }
+
+        manager.ceiling = 2
+        await manager.apply(manager.tick(0))
+        assert thermostat.get(cycle.id) == CycleOutput.Off
+        assert events.mock_calls[-1].args == ("load_shed", {"shed": True})
+
+        await manager.stop()
+        assert thermostat.get(cycle.id) == CycleOutput.Min_15
+        assert events.mock_calls[-1].args == ("load_shed", {"shed": False})
+
+        # a failed write leaves the device on
+        write.side_effect = asyncio.TimeoutError
+        manager.ceiling = 2
+        await manager.apply(manager.tick(0))
+        assert manager.table[(str(device.ieee), 1)]["shed"] is False
+        assert manu_cluster.load_holds == set()
+
+        # the cycle length read before shedding is restored after a restart
+        write.side_effect = None
+        thermostat.update_attribute(cycle.id, CycleOutput.Sec_15)
+        await manager.apply(manager.tick(0))
+        assert thermostat.get(cycle.id) == CycleOutput.Off
+        assert (await manu_cluster.load_state())["cycle"] == CycleOutput.Sec_15
+        assert (await manu_cluster.load_state())["holds"] == ["load_shed"]
+        manu_cluster.load_holds.clear()
+        manu_cluster._load_holds_recovery = None
+        manu_cluster.update_attribute(attrs.current_load.id, 0)
+        await manu_cluster._load_holds_recovery
+        assert thermostat.get(cycle.id) == CycleOutput.Sec_15
+        assert manu_cluster.load_holds == set()
+
+        # a failed restore keeps the cycle length for the next attempt
+        await manu_cluster.hold_load("load_shed", True)
+        write.side_effect = asyncio.TimeoutError
+        with pytest.raises(asyncio.TimeoutError):
+            await manu_cluster.hold_load("load_shed", False)
+        assert manu_cluster.load_holds == {"load_shed"}
+        assert thermostat.get(cycle.id) == CycleOutput.Off
+        write.side_effect = None
+        await manu_cluster.hold_load("load_shed", False)
+        assert thermostat.get(cycle.id) == CycleOutput.Sec_15
+        assert "cycle" not in await manu_cluster.load_state()
+
+        # nothing saved, nothing restored
+        await manu_cluster.load_shed(False)
+        assert thermostat.get(cycle.id) == CycleOutput.Sec_15
+
+        # an unknown cycle length is not shed
+        thermostat._attr_cache.pop(cycle.id)
+        read = mock.AsyncMock(return_value=({}, {}))
+        with mock.patch.object(thermostat, "read_attributes", read):
+            with pytest.raises(ValueError):
+                await manu_cluster.hold_load("load_shed", True)
+        assert thermostat.get(cycle.id) is None
+        assert manu_cluster.load_holds == set()
+
+    # only line voltage thermostats are managed
+    manager = LoadManager()
+    low_voltage = zigpy_device_from_v2_quirk(
+        SINOPE, "TH1300ZB", ieee="01:00:00:00:00:00:00:02"
+    )
+    manu_cluster = low_voltage.endpoints[1].in_clusters[SINOPE_MANUFACTURER_CLUSTER_ID]
+    with mock.patch("zhaquirks.sinope._sinope_common.LOAD_MANAGER", manager):
+        manu_cluster.update_attribute(attrs.connected_load.id, 2500)
+    assert manager.table == {}
+    with pytest.raises(TypeError):
+        LoadSheddingMixin()
+
+
+async def test_sinope_load_holds(zigpy_device_from_v2_quirk, sinope_store):
+    """Test that the load stays off until every hold is released."""
+    device = zigpy_device_from_v2_quirk(SINOPE, "RM3500ZB")
+    manu_cluster = device.endpoints[1].in_clusters[SINOPE_MANUFACTURER_CLUSTER_ID]
+    load_shed = mock.AsyncMock()
+
+    with mock.patch.object(manu_cluster, "load_shed", load_shed):
+        await manu_cluster.hold_load("cold_load", True)
+        await manu_cluster.hold_load("load_shed", True)
+        await manu_cluster.hold_load("load_shed", False)
+        assert [call.args for call in load_shed.mock_calls] == [(True,)]
+        await manu_cluster.hold_load("cold_load", False)
+        assert [call.args for call in load_shed.mock_calls] == [(True,), (False,)]
+
+        # a failed switch keeps the previous holds
+        load_shed.side_effect = asyncio.TimeoutError
+        with pytest.raises(asyncio.TimeoutError):
+            await manu_cluster.hold_load("load_shed", True)
+        assert manu_cluster.load_holds == set()
+
+
+async def test_sinope_cold_load_restore():
+    """Test that held loads are turned back on in waves after an outage."""
+    restore = ColdLoadRestore(wave_size=3, interval=0.01)
+    application = mock.Mock()
+    calls = []
+
+    def _actuator(key):
+        async def actuator(hold):
+            calls.append((key, hold))
+            if key == 7 and not hold:
+                raise asyncio.TimeoutError
+
+        return actuator
+
+    for key in range(8):
+        restore.hold(key, _actuator(key), application)
+    restore.hold(0, _actuator(0), application)  # already held
+    restore.fault(3)
+    assert restore.progress["pending"] == 7
+    assert restore.progress["remaining"] == pytest.approx(0.03)
+    await restore._task
+
+    held = [key for key, hold in calls if hold]
+    assert sorted(held) == list(range(8))
+    turned_on = [key for key, hold in calls if not hold]
+    assert sorted(turned_on) == list(range(8))  # 3 out of its wave
+    progress = restore.progress
+    assert progress["pending"] == 0
+    assert {key: progress[key] for key in restore.counts} == {
+        "held": 8,
+        "restored": 7,
+        "failed": 1,
+        "faulted": 1,
+    }
+    assert progress["elapsed"] >= 0.02  # three waves
+
+    # a load is not turned back on before its own pickup is over
+    calls.clear()
+    restore.hold(0, _actuator(0), application, delay=0.05)
+    restore.hold(1, _actuator(1), application)
+    assert restore.progress["remaining"] == pytest.approx(0.05, abs=0.01)
+    await asyncio.sleep(0.02)
+    assert (1, False) in calls and (0, False) not in calls
+    await restore._task
+    assert restore.progress["elapsed"] >= 0.05
+    assert (0, False) in calls
+
+
+async def test_sinope_cold_load_pickup(zigpy_device_from_v2_quirk):
+    """Test that water heaters in cold load pickup are held then restored."""
+    restore = ColdLoadRestore(interval=0.01)
+    device = zigpy_device_from_v2_quirk(SINOPE, "RM3500ZB")
+    manu_cluster = device.endpoints[1].in_clusters[SINOPE_MANUFACTURER_CLUSTER_ID]
+    attrs = manu_cluster.AttributeDefs
+    events = mock.MagicMock()
+    manu_cluster.add_listener(mock.Mock(spec=["zha_send_event"], zha_send_event=events))
+    load_shed = mock.AsyncMock()
+
+    with (
+        mock.patch("zhaquirks.sinope._sinope_common.COLD_LOAD", restore),
+        mock.patch.object(manu_cluster, "load_shed", load_shed),
+    ):
+        manu_cluster.update_attribute(
+            attrs.cold_load_pickup_status.id, manu_cluster.ColdStatus.Active
+        )
+        assert restore.progress["pending"] == 1
+        await restore._task
+    assert [call.args for call in load_shed.mock_calls] == [(True,), (False,)]
+    assert [call.args for call in events.mock_calls] == [
+        ("cold_load_pickup", {"held": True}),
+        ("cold_load_pickup", {"held": False}),
+    ]
+
+    # a disconnected sensor cable is not a fault, a fault releases the load
+    load_shed.reset_mock()
+    events.reset_mock()
+    with (
+        mock.patch("zhaquirks.sinope._sinope_common.COLD_LOAD", restore),
+        mock.patch.object(manu_cluster, "load_shed", load_shed),
+    ):
+        manu_cluster.update_attribute(attrs.dev_status.id, 0x40)
+        manu_cluster.update_attribute(
+            attrs.cold_load_pickup_status.id, manu_cluster.ColdStatus.Active
+        )
+        manu_cluster.update_attribute(attrs.dev_status.id, 0x60)
+        assert restore.progress["pending"] == 1
+        manu_cluster.update_attribute(attrs.dev_status.id, 0x61)
+        assert restore.progress["pending"] == 0
+        await asyncio.gather(*restore._faulted)
+    assert [call.args for call in load_shed.mock_calls] == [(True,), (False,)]
+    assert ("cold_load_fault", {"dev_status": 0x61}) in [
+        call.args for call in events.mock_calls
+    ]
+    assert restore.progress["faulted"] == 1
+    assert restore.progress["restored"] == 1
+
+    # a load already reporting a fault is not held
+    with mock.patch("zhaquirks.sinope._sinope_common.COLD_LOAD", restore):
+        manu_cluster.update_attribute(
+            attrs.cold_load_pickup_status.id, manu_cluster.ColdStatus.Off
+        )
+        manu_cluster.update_attribute(
+            attrs.cold_load_pickup_status.id, manu_cluster.ColdStatus.Active
+        )
+        assert restore.progress["pending"] == 0
+
+
+async def test_sinope_cold_load_resume(zigpy_device_from_v2_quirk, sinope_store):
+    """Test that a cold load hold kept over a restart waits for a wave again."""
+    restore = ColdLoadRestore(interval=0.01)
+    device = zigpy_device_from_v2_quirk(SINOPE, "RM3500ZB")
+    manu_cluster = device.endpoints[1].in_clusters[SINOPE_MANUFACTURER_CLUSTER_ID]
+    attrs = manu_cluster.AttributeDefs
+    load_shed = mock.AsyncMock()
+    read = mock.AsyncMock(return_value=({}, {}))
+
+    with (
+        mock.patch("zhaquirks.sinope._sinope_common.COLD_LOAD", restore),
+        mock.patch.object(manu_cluster, "load_shed", load_shed),
+        mock.patch.object(manu_cluster, "read_attributes", read),
+    ):
+        manu_cluster.update_attribute(
+            attrs.cold_load_pickup_status.id, manu_cluster.ColdStatus.Active
+        )
+        await restore._pending[(str(device.ieee), 1)][1]
+        assert (await manu_cluster.load_state())["holds"] == ["cold_load"]
+        remaining = attrs.cold_load_pickup_remaining_time.id
+        assert read.mock_calls == [mock.call([remaining])]
+        restore._task.cancel()
+
+    # restart before the wave
+    restore = ColdLoadRestore(interval=0.01)
+    with (
+        mock.patch("zhaquirks.sinope._sinope_common.COLD_LOAD", restore),
+        mock.patch.object(manu_cluster, "load_shed", load_shed),
+    ):
+        manu_cluster.load_holds.clear()
+        manu_cluster._load_holds_recovery = None
+        manu_cluster.update_attribute(remaining, 0)
+        await manu_cluster._load_holds_recovery
+        assert manu_cluster.load_holds == {"cold_load"}
+        assert restore.progress["held"] == 1
+        await restore._task
+    assert [call.args for call in load_shed.mock_calls] == [(True,), (False,)]
+    assert manu_cluster.load_holds == set()
+
+
+async def test_sinope_fleet_energy(zigpy_device_from_v2_quirk, sinope_store, tmp_path):
+    """Test that energy totals are collected, rolled up and exported."""
+    fleet = FleetEnergy(capacity=8)
+    assert fleet.columns() == (array("d"), array("I"), array("d"))  # no memory yet
+    plug = zigpy_device_from_v2_quirk(
+        SINOPE, "SP2600ZB", ieee="01:00:00:00:00:00:00:01"
+    )
+    valve = zigpy_device_from_v2_quirk(
+        SINOPE, "VA4220ZB", ieee="01:00:00:00:00:00:00:02"
+    )
+    await sinope_store.async_device(plug)
+    await sinope_store.async_device(valve)
+    attr_id = Metering.AttributeDefs.current_summ_delivered.id
+
+    # plug in Wh, water volume of the valve is not energy
+    with (
+        mock.patch("zhaquirks.sinope._sinope_common.FLEET", fleet),
+        mock.patch("zhaquirks.sinope._sinope_common.time.time", return_value=900.0),
+    ):
+        plug.endpoints[1].smartenergy_metering.update_attribute(attr_id, 1000)
+        valve.endpoints[1].smartenergy_metering.update_attribute(attr_id, 30)
+    plug_circuit = ("01:00:00:00:00:00:00:01", 1, "current_summ_delivered", "SP2600ZB")
+    assert fleet.circuits == [plug_circuit]
+
+    # a second circuit, 1 kWh over 30 min then 2 kWh in the next 15 min
+    for timestamp, circuit, kwh in (
+        (900.0, ("b", 1, "e", "TH1123ZB"), 10.0),
+        (1800.0, plug_circuit, 1.5),
+        (2700.0, ("b", 1, "e", "TH1123ZB"), 11.0),
+        (3600.0, ("b", 1, "e", "TH1123ZB"), 13.0),
+    ):
+        fleet.record(circuit, timestamp, kwh)
+    rollup = fleet.rollup()
+    assert rollup["total_kwh"] == pytest.approx(3.5)
+    assert rollup["peak_kw"] == pytest.approx(8.0)  # 2 kWh in 15 min
+    assert rollup["peak_start"] == 2700
+    assert rollup["circuits"]["b:1:e"] == {
+        "model": "TH1123ZB",
+        "kwh": pytest.approx(3.0),
+        "peak_kw": pytest.approx(8.0),
+    }
+    plug_rollup = rollup["circuits"]["01:00:00:00:00:00:00:01:1:current_summ_delivered"]
+    assert plug_rollup["kwh"] == pytest.approx(0.5)
+    assert plug_rollup["peak_kw"] == pytest.approx(2.0)
+    assert fleet.rollup(start=2000)["total_kwh"] == pytest.approx(2.0)
+    assert await fleet.async_rollup() == rollup
+    assert len(fleet.columns()[0]) == fleet.size == 5
+
+    # the oldest samples are overwritten once the buffer is full
+    for i in range(5):
+        fleet.record(("b", 1, "e", "TH1123ZB"), 4500.0 + 900 * i, 14.0 + i)
+    times, _, kwh = fleet.columns()
+    assert fleet.size == 8
+    assert list(times) == [900.0 * i for i in range(2, 10)]
+    assert kwh[-1] == 18.0
+
+    path = tmp_path / "fleet.csv"
+    assert await fleet.async_export(str(path), start=4000) == 5
+    lines = path.read_text().splitlines()
+    assert lines[0] == ",".join(FleetEnergy.FIELDS)
+    assert lines[1] == "1970-01-01T01:15:00+00:00,b,1,e,TH1123ZB,14.0,"
+    assert lines[2].endswith(",15.0,1.0")
+
+
 @pytest.mark.parametrize("model", ["VA4220ZB", "LM4110-ZB"])
 async def test_sinope_device_battery_voltage(zigpy_device_from_v2_quirk, model):
     """Test that device battery voltage is divided by 10."""
@@ -10,73 +10,42 @@ import zigpy.profiles.zha as zha_p
 import zigpy.types as t
 from homeassistant.components.number import NumberDeviceClass
 from zhaquirks.sinope import SINOPE, SINOPE_MANUFACTURER_CLUSTER_ID
+from zhaquirks.sinope._sinope_common import (AttributeSnapshotMixin,
+                                             ClockSyncMixin,
+                                             DemandResponseMixin,
+                                             DisplayPusher,
+                                             EnergyAccumulatorMixin,
+                                             GroupAttributeWriter,
+                                             GroupWriteResult,
+                                             LoadSheddingMixin,
+                                             ModelCapabilityMixin,
+                                             SinopeReportingMixin,
+                                             ValueConverter, Volatility)
 from zigpy.quirks import CustomCluster
-from zigpy.quirks.v2 import EntityType, QuirkBuilder, SensorStateClass
+from zigpy.quirks.v2 import (BinarySensorDeviceClass, EntityType, QuirkBuilder,
+                             SensorStateClass)
 from zigpy.quirks.v2.homeassistant import PERCENTAGE, UnitOfTime
+from zigpy.zcl import foundation
 from zigpy.zcl.clusters.homeautomation import ElectricalMeasurement
 from zigpy.zcl.clusters.hvac import Thermostat, UserInterface
 from zigpy.zcl.foundation import (ZCL_CLUSTER_REVISION_ATTR, BaseAttributeDefs,
                                   ZCLAttributeDef)
 
-STATUS_MAP = {
-    0x00000000: "Ok",
-    0x00000020: "Floor_sensor",
-    0x00000040: "Temp_sensor",
-    0x00000060: "Both_sensor",
-}
+# Zigbee group of the thermostats displaying the outdoor temperature. When set,
+# writing outdoor_temp to any thermostat sends it once to the whole group. Changes
+# smaller than OUTDOOR_TEMP_THRESHOLD, in 0.01 °C, are not sent, writes are
+# OUTDOOR_TEMP_MIN_INTERVAL seconds apart, and the latest value is sent again after
+# OUTDOOR_TEMP_REFRESH seconds without a write.
+OUTDOOR_TEMP_GROUP_ID: int | None = None
+OUTDOOR_TEMP_THRESHOLD = 50
+OUTDOOR_TEMP_MIN_INTERVAL = 60
+OUTDOOR_TEMP_REFRESH = 1800
 
-FLOOR_MAP = {
-    0x00: "Ok",
-    0x01: "Low_reached",
-    0x02: "Max_reached",
-    0x03: "Max_air_reached",
-}
-
-
-def device_status_converter(value):
-    """Convert sensor_status value to name."""
-
-    if value is None:
-        return None
-    return STATUS_MAP.get(int(value), f"Unmapped({value})")
-
-
-def floor_status_converter(value):
-    """Convert sensor_status value to name."""
-
-    if value is None:
-        return None
-    return FLOOR_MAP.get(int(value), f"Unmapped({value})")
-
-
-class ManufacturerReportingMixin:
-    """Mixin to configure the attributes reporting in manufacturer cluster."""
-
-    MANUFACTURER_REPORTING = {
-        # attribut_id: (min_interval, max_interval, reportable_change)
-        0x0002: (10, 300, 1),  # keypad_lockout
-        0x012B: (10, 300, 25),  # current_setpoint
-        0x0070: (10, 43268, 1),  # current_load
-        0x010C: (10, 3600, 1),  # floor_limit_status
-        0x012D: (19, 300, 25),  # report_local_temperature
-        0x0115: (10, 3600, 1),  # gfci_status
-        0x0200: (10, 0, 1),  # status
-        # ... add other attributes
-    }
-
-    async def configure_reporting_all(self):
-        """Configure reporting of all configured attributes."""
-        for attr_id, (min_i, max_i, change) in self.MANUFACTURER_REPORTING.items():
-            try:
-                await self.configure_reporting(
-                    attribute=attr_id,
-                    min_interval=min_i,
-                    max_interval=max_i,
-                    reportable_change=change,
-                )
-                self.debug(f"Reporting configured for attr {hex(attr_id)}")
-            except Exception as e:
-                self.debug(f"Reporting configuration fail for attr {hex(attr_id)}: {e}")
+# Outdoor temperatures written to a single thermostat, in 0.01 °C, are only sent
+# when their value rounded to half a degree changes, and the exact value is written.
+# The temperature and the weather icon are written again shortly before
+# outdoor_temp_timeout and weather_icons_timeout run out.
+OUTDOOR_TEMP_RESOLUTION = 50
 
 
 class KeypadLock(t.enum8):
@@ -137,6 +106,10 @@ class LimitStatus(t.uint8_t):
     Max_air_reached = 0x03
 
 
+device_status_converter = ValueConverter(DeviceStatus, bitmap=True)
+floor_status_converter = ValueConverter(LimitStatus)
+
+
 class SensorType(t.enum8):
     """Temp sensor type values."""
 
@@ -292,7 +265,15 @@ class TempFormat(t.enum8):
     Fahrenheit = 0x01
 
 
-class SinopeTechnologiesManufacturerCluster(ManufacturerReportingMixin, CustomCluster):
+class SinopeTechnologiesManufacturerCluster(
+    ModelCapabilityMixin,
+    ClockSyncMixin,
+    DemandResponseMixin,
+    LoadSheddingMixin,
+    AttributeSnapshotMixin,
+    SinopeReportingMixin,
+    CustomCluster,
+):
     """SinopeTechnologiesManufacturerCluster manufacturer cluster."""
 
     KeypadLock: Final = KeypadLock
@@ -315,6 +296,143 @@ class SinopeTechnologiesManufacturerCluster(ManufacturerReportingMixin, CustomCl
     name: Final = "SinopeTechnologiesManufacturerCluster"
     ep_attribute: Final = "sinope_manufacturer_specific"
 
+    MANUFACTURER_REPORTING = {
+        # attribut_id: (min_interval, max_interval, reportable_change)
+        0x0002: (10, 300, 1),  # keypad_lockout
+        0x012B: (10, 300, 25),  # current_setpoint
+        0x0070: (10, 43268, 1),  # current_load
+        0x010C: (10, 3600, 1),  # floor_limit_status
+        0x012D: (19, 300, 25),  # report_local_temperature
+        0x0115: (10, 3600, 1),  # gfci_status
+        0x0200: (10, 0, 1),  # status
+        # ... add other attributes
+    }
+    REPORTING_PROFILES = {
+        # model: attributes of MANUFACTURER_REPORTING supported by the device
+        "TH1123ZB": (0x0002, 0x012B, 0x0070, 0x012D, 0x0200),
+        "TH1124ZB": (0x0002, 0x012B, 0x0070, 0x012D, 0x0200),
+        "TH1500ZB": (0x0002, 0x012B, 0x0070, 0x012D, 0x0200),
+        "OTH3600-GA-ZB": (0x0002, 0x012B, 0x0070, 0x012D, 0x0200),
+        "TH1123ZB-G2": (0x0002, 0x012B, 0x0070, 0x012D, 0x0200),
+        "TH1124ZB-G2": (0x0002, 0x012B, 0x0070, 0x012D, 0x0200),
+        "TH1134ZB-HC": (0x0002, 0x012B, 0x0070, 0x012D, 0x0200),
+        "TH1300ZB": (0x0002, 0x012B, 0x0070, 0x010C, 0x012D, 0x0115, 0x0200),
+        "TH1400ZB": (0x0002, 0x012B, 0x010C, 0x012D, 0x0200),
+        "HP6000ZB-GE": (0x0002, 0x012B, 0x012D, 0x0200),
+        "HP6000ZB-HS": (0x0002, 0x012B, 0x012D, 0x0200),
+        "HP6000ZB-MA": (0x0002, 0x012B, 0x012D, 0x0200),
+    }
+    CAPABILITY_ATTRIBUTES = {
+        # capability: attributes only found on the models having it
+        "load": (0x0070,),  # current_load
+        "floor": (
+            0x0105,  # air_floor_mode
+            0x0107,  # floor_temperature
+            0x0108,  # air_max_limit
+            0x0109,  # floor_min_setpoint
+            0x010A,  # floor_max_setpoint
+            0x010B,  # floor_sensor_type_param
+            0x010C,  # floor_limit_status
+        ),
+        "aux": (
+            0x0106,  # aux_output_mode
+            0x0118,  # aux_connected_load
+        ),
+        "pump": (
+            0x0128,  # pump_protection_status
+            0x012A,  # pump_protection_duration
+        ),
+        "gfci": (0x0115,),  # gfci_status
+        "heat_pump": (
+            0x0116,  # hvac_mode
+            0x0134,  # balance_point
+            0x0137,  # abs_min_heat_setpoint_limit
+            0x0139,  # heat_lockout_temperature
+            0x013A,  # cool_lockout_temperature
+            0x026D,  # min_cool_setpoint_limit
+            0x026E,  # max_cool_setpoint_limit
+            0x0282,  # cool_cycle_length
+        ),
+        "hc": (
+            0x0005,  # display_language
+            0x0267,  # hc_model_mac_addr
+        ),
+    }
+    MODEL_CAPABILITIES = {
+        # model: capabilities of the device, models not listed keep every attribute
+        "TH1123ZB": ("load",),
+        "TH1124ZB": ("load",),
+        "TH1500ZB": ("load",),
+        "OTH3600-GA-ZB": ("load",),
+        "TH1123ZB-G2": ("load",),
+        "TH1124ZB-G2": ("load",),
+        "TH1134ZB-HC": ("load", "aux", "heat_pump", "hc"),
+        "TH1300ZB": ("load", "floor", "aux", "pump", "gfci"),
+        "TH1400ZB": ("floor", "aux", "pump"),
+        "HP6000ZB-GE": ("heat_pump",),
+        "HP6000ZB-HS": ("heat_pump",),
+        "HP6000ZB-MA": ("heat_pump",),
+    }
+    DEDUP_ATTRIBUTES = frozenset(
+        {
+            0x012B,  # current_setpoint
+            0x012D,  # report_local_temperature
+        }
+    )
+    DR_ATTRIBUTES = {
+        # attribut_id: (value during the event, value after the event)
+        0x0071: (0, -128),  # eco_delta_setpoint, 0 shows the DR logo, -128 stops it
+        0x0072: (None, None),  # eco_max_pi_heating_demand
+        0x0073: (None, None),  # eco_safety_temperature_delta
+    }
+    DR_PRIORITY = 1
+    LOAD_CONNECTED = 0x0119  # connected_load
+    # line voltage models, whose heating output can be turned off with its cycle
+    LOAD_MODELS = frozenset(
+        {
+            "TH1123ZB",
+            "TH1124ZB",
+            "TH1500ZB",
+            "OTH3600-GA-ZB",
+            "TH1123ZB-G2",
+            "TH1124ZB-G2",
+        }
+    )
+    ATTRIBUTE_VOLATILITY = {
+        # attribut_id: volatility, attributes not listed are telemetry
+        0x0003: Volatility.STATIC,  # firmware_number
+        0x0004: Volatility.STATIC,  # firmware_version
+        0x0267: Volatility.STATIC,  # hc_model_mac_addr
+        0x0002: Volatility.CONFIG,  # keypad_lockout
+        0x0005: Volatility.CONFIG,  # display_language
+        0x0011: Volatility.CONFIG,  # outdoor_temp_timeout
+        0x0012: Volatility.CONFIG,  # config_2nd_display
+        0x0071: Volatility.CONFIG,  # eco_delta_setpoint
+        0x0072: Volatility.CONFIG,  # eco_max_pi_heating_demand
+        0x0073: Volatility.CONFIG,  # eco_safety_temperature_delta
+        0x0105: Volatility.CONFIG,  # air_floor_mode
+        0x0106: Volatility.CONFIG,  # aux_output_mode
+        0x0108: Volatility.CONFIG,  # air_max_limit
+        0x0109: Volatility.CONFIG,  # floor_min_setpoint
+        0x010A: Volatility.CONFIG,  # floor_max_setpoint
+        0x010B: Volatility.CONFIG,  # floor_sensor_type_param
+        0x0114: Volatility.CONFIG,  # time_format
+        0x0118: Volatility.CONFIG,  # aux_connected_load
+        0x0119: Volatility.CONFIG,  # connected_load
+        0x012A: Volatility.CONFIG,  # pump_protection_duration
+        0x0134: Volatility.CONFIG,  # balance_point
+        0x0136: Volatility.CONFIG,  # weather_icons_timeout
+        0x0137: Volatility.CONFIG,  # abs_min_heat_setpoint_limit
+        0x0139: Volatility.CONFIG,  # heat_lockout_temperature
+        0x013A: Volatility.CONFIG,  # cool_lockout_temperature
+        0x026B: Volatility.CONFIG,  # min_heat_setpoint_limit
+        0x026C: Volatility.CONFIG,  # max_heat_setpoint_limit
+        0x026D: Volatility.CONFIG,  # min_cool_setpoint_limit
+        0x026E: Volatility.CONFIG,  # max_cool_setpoint_limit
+        0x0281: Volatility.CONFIG,  # cycle_length
+        0x0282: Volatility.CONFIG,  # cool_cycle_length
+    }
+
     class AttributeDefs(BaseAttributeDefs):
         """Sinope Manufacturer Cluster Attributes."""
 
@@ -575,11 +693,97 @@ class SinopeTechnologiesManufacturerCluster(ManufacturerReportingMixin, CustomCl
         )
         cluster_revision: Final = ZCL_CLUSTER_REVISION_ATTR
 
+    def __init__(self, *args, **kwargs):
+        """Initialize the pusher of the values shown on the display."""
+        super().__init__(*args, **kwargs)
+        attrs = self.AttributeDefs
+        self.display_pusher = DisplayPusher(
+            self,
+            {
+                attrs.outdoor_temp.id: (
+                    attrs.outdoor_temp_timeout.id,
+                    OUTDOOR_TEMP_RESOLUTION,
+                ),
+                attrs.weather_icons.id: (attrs.weather_icons_timeout.id, 1),
+            },
+        )
+
     async def bind(self):
         """Bind the cluster and configure reporting."""
         await super().bind()
         await self.configure_reporting_all()
 
+    async def load_shed(self, shed: bool) -> None:
+        """Turn the heating output off, and back to its previous cycle length.
+
+        The cycle length read before shedding is kept in the store, so it is still
+        restored after a restart. A thermostat whose cycle length is unknown is not
+        shed, and is left as is when it is turned back on without one.
+        """
+        thermostat = self.endpoint.in_clusters[Thermostat.cluster_id]
+        attr_id = thermostat.AttributeDefs.main_cycle_output.id
+        state = await self.load_state()
+        if not shed:
+            cycle = state.get("cycle")
+            if cycle is None:
+                self.debug("No cycle length saved, not restoring the heating output")
+                return
+            await thermostat.write_attributes({attr_id: CycleOutput(cycle)})
+            del state["cycle"]  # kept for the next attempt if the write failed
+            await self.save_load_state()
+            return
+
+        cycle = thermostat.get(attr_id)
+        if cycle is None:
+            success, _ = await thermostat.read_attributes([attr_id])
+            cycle = success.get(attr_id)
+        if cycle is None:
+            raise ValueError("main_cycle_output unknown, not shedding")
+        if cycle != CycleOutput.Off:
+            state["cycle"] = int(cycle)
+        elif "cycle" not in state:
+            return  # turned off by the user, nothing to shed or restore
+        await self.save_load_state()
+        await thermostat.write_attributes({attr_id: CycleOutput.Off})
+
+    async def write_attributes(self, attributes, manufacturer=None, **kwargs):
+        """Push the outdoor temperature and weather icon shown on the display.
+
+        The outdoor temperature goes to the thermostats group when one is configured.
+        """
+        if len(attributes) != 1:
+            return await super().write_attributes(attributes, manufacturer, **kwargs)
+
+        (attribute, value), *_ = attributes.items()
+        attr_def = self.find_attribute(attribute)
+        if (
+            attr_def.id == self.AttributeDefs.outdoor_temp.id
+            and OUTDOOR_TEMP_GROUP_ID is not None
+        ):
+            device = self.endpoint.device
+            result = await outdoor_temp_writer.write(
+                device.application,
+                OUTDOOR_TEMP_GROUP_ID,
+                value,
+                self._manufacturer_id,
+            )
+            # the members of the group are updated with the values actually sent
+            if result is GroupWriteResult.SENT:
+                self._update_attribute(attr_def.id, value)
+            return [[foundation.WriteAttributesStatusRecord(foundation.Status.SUCCESS)]]
+        if attr_def.id in self.display_pusher.attributes:
+            return await self.display_pusher.push(attr_def.id, value, manufacturer)
+        return await super().write_attributes(attributes, manufacturer, **kwargs)
+
+
+outdoor_temp_writer = GroupAttributeWriter(
+    SinopeTechnologiesManufacturerCluster,
+    SinopeTechnologiesManufacturerCluster.AttributeDefs.outdoor_temp,
+    threshold=OUTDOOR_TEMP_THRESHOLD,
+    min_interval=OUTDOOR_TEMP_MIN_INTERVAL,
+    refresh=OUTDOOR_TEMP_REFRESH,
+)
+
 
 class SinopeTechnologiesThermostatCluster(CustomCluster, Thermostat):
     """SinopeTechnologiesThermostatCluster custom cluster."""
@@ -660,10 +864,15 @@ class SinopeTechnologiesThermostatCluster(CustomCluster, Thermostat):
 
 
 class SinopeTechnologiesElectricalMeasurementCluster(
-    CustomCluster, ElectricalMeasurement
+    EnergyAccumulatorMixin, CustomCluster, ElectricalMeasurement
 ):
     """SinopeTechnologiesElectricalMeasurementCluster custom cluster."""
 
+    ENERGY_COUNTERS = {
+        # attribut_id: divisor
+        0x0551: 1,  # current_summation_delivered
+    }
+
     class AttributeDefs(ElectricalMeasurement.AttributeDefs):
         """Sinope Manufacturer ElectricalMeasurement Cluster Attributes."""
 
@@ -770,6 +979,30 @@ sinope_base_quirk = (
         translation_key="status",
         fallback_name="Device status",
     )
+    .binary_sensor(  # Floor sensor fault
+        attribute_name=SinopeTechnologiesManufacturerCluster.AttributeDefs.status.name,
+        cluster_id=SinopeTechnologiesManufacturerCluster.cluster_id,
+        endpoint_id=1,
+        entity_type=EntityType.DIAGNOSTIC,
+        device_class=BinarySensorDeviceClass.PROBLEM,
+        initially_disabled=True,
+        attribute_converter=device_status_converter.flag_converter("Floor_sensor"),
+        unique_id_suffix="status_floor_sensor",
+        translation_key="floor_sensor_fault",
+        fallback_name="Floor sensor fault",
+    )
+    .binary_sensor(  # Temperature sensor fault
+        attribute_name=SinopeTechnologiesManufacturerCluster.AttributeDefs.status.name,
+        cluster_id=SinopeTechnologiesManufacturerCluster.cluster_id,
+        endpoint_id=1,
+        entity_type=EntityType.DIAGNOSTIC,
+        device_class=BinarySensorDeviceClass.PROBLEM,
+        initially_disabled=True,
+        attribute_converter=device_status_converter.flag_converter("Temp_sensor"),
+        unique_id_suffix="status_temp_sensor",
+        translation_key="temp_sensor_fault",
+        fallback_name="Temperature sensor fault",
+    )
     .skip_configuration()
 )
 